@@ -0,0 +1,37 @@
+"""Report how long it takes to build tic-tac-toe codes at large distances,
+and then to create their detectors. These codes build their checks and
+detectors without validating them, and only create their detectors (and
+work out detectors' Pauli products) if and when they're needed.
+"""
+import time
+
+from main.codes.tic_tac_toe.FloquetColourCode import FloquetColourCode
+from main.codes.tic_tac_toe.HoneycombCode import HoneycombCode
+from main.codes.tic_tac_toe.gauge.GaugeFloquetColourCode import \
+    GaugeFloquetColourCode
+from main.codes.tic_tac_toe.gauge.GaugeHoneycombCode import \
+    GaugeHoneycombCode
+
+
+def main():
+    codes = {
+        'HoneycombCode': HoneycombCode,
+        'FloquetColourCode': FloquetColourCode,
+        'GaugeHoneycombCode': lambda distance: GaugeHoneycombCode(
+            distance, [2, 2, 2]),
+        'GaugeFloquetColourCode': lambda distance: GaugeFloquetColourCode(
+            distance, [2, 2])}
+    print('code, distance, construction (s), creating detectors (s)')
+    for name, create_code in codes.items():
+        for distance in [16, 32, 48]:
+            start = time.perf_counter()
+            code = create_code(distance)
+            construction = time.perf_counter() - start
+            start = time.perf_counter()
+            _ = code.detector_schedule
+            detectors = time.perf_counter() - start
+            print(f'{name}, {distance}, {construction:.2f}, {detectors:.2f}')
+
+
+if __name__ == '__main__':
+    main()
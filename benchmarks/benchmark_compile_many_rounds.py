@@ -0,0 +1,47 @@
+"""Report how long compiling the circuits needed to find a gauge code's
+timelike distance takes - one for each number of rounds in
+timelike_distance_rounds - either compiling each circuit on its own, or
+compiling them all in a single pass with Compiler.compile_to_stims. Also
+checks the circuits come out the same either way.
+"""
+import time
+
+from main.codes.tic_tac_toe.gauge.create_timelike_distance_data import \
+    generate_circuit, generate_circuits, get_bulk_length, \
+    timelike_distance_rounds
+
+
+def main():
+    print('code, gauge factors, letter, rounds, independently (s), '
+          'single pass (s), identical')
+    for code_name, gauge_factors in [
+            ('GaugeHoneycombCode', (1, 1, 1)),
+            ('GaugeHoneycombCode', (2, 1, 3)),
+            ('GaugeFloquetColourCode', (1, 1)),
+            ('GaugeFloquetColourCode', (2, 3))]:
+        for letter in ['X', 'Z']:
+            rounds = timelike_distance_rounds(
+                get_bulk_length(code_name, gauge_factors))
+
+            start = time.perf_counter()
+            independent = {
+                r: generate_circuit(
+                    gauge_factors, r, 4, letter, 'phenomenological',
+                    code_name)
+                for r in rounds}
+            independently = time.perf_counter() - start
+
+            start = time.perf_counter()
+            shared = generate_circuits(
+                gauge_factors, rounds, 4, letter, 'phenomenological',
+                code_name)
+            single_pass = time.perf_counter() - start
+
+            print(
+                f'{code_name}, {gauge_factors}, {letter}, '
+                f'{rounds[0]}-{rounds[-1]}, {independently:.2f}, '
+                f'{single_pass:.2f}, {independent == shared}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,47 @@
+"""Report how much Circuit.compress saves on codes whose checks are
+extracted one at a time, leaving lots of idle time in the circuit."""
+import time
+
+from main.building_blocks.pauli import Pauli
+from main.building_blocks.pauli.PauliLetter import PauliLetter
+from main.codes.RotatedSurfaceCode import RotatedSurfaceCode
+from main.codes.tic_tac_toe.HoneycombCode import HoneycombCode
+from main.compiling.compilers.AncillaPerCheckCompiler import AncillaPerCheckCompiler
+from main.compiling.noise.models.SI1000 import SI1000
+from main.compiling.syndrome_extraction.controlled_gate_orderers.RotatedSurfaceCodeOrderer import \
+    RotatedSurfaceCodeOrderer
+from main.compiling.syndrome_extraction.extractors.ancilla_per_check.mixed.CxCyCzExtractor import CxCyCzExtractor
+from main.utils.enums import State
+
+
+def main():
+    noise_model = SI1000(0.001)
+    codes = [
+        ('rotated surface code', RotatedSurfaceCode(5),
+         RotatedSurfaceCodeOrderer(), 0, 5),
+        ('honeycomb code', HoneycombCode(4), None, 1, 12),
+        ('honeycomb code', HoneycombCode(8), None, 1, 24)]
+    print('code, distance, parallel, ticks, ticks saved, '
+          'idle locations saved, time (s)')
+    for name, code, orderer, logical_qubit, rounds in codes:
+        for parallelize in [True, False]:
+            compiler = AncillaPerCheckCompiler(
+                noise_model, CxCyCzExtractor(orderer, parallelize=parallelize))
+            data_qubits = code.data_qubits.values()
+            circuit = compiler.compile_to_circuit(
+                code=code,
+                total_rounds=rounds,
+                initial_states={qubit: State.Zero for qubit in data_qubits},
+                final_measurements=[
+                    Pauli(qubit, PauliLetter('Z')) for qubit in data_qubits],
+                observables=[code.logical_qubits[logical_qubit].z])
+            start = time.perf_counter()
+            _, savings = circuit.compress()
+            duration = time.perf_counter() - start
+            print(f"{name}, {code.distance}, {parallelize}, "
+                  f"{len(circuit.instructions)}, {savings['ticks']}, "
+                  f"{savings['idle_locations']}, {duration:.3f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,39 @@
+"""Compare the time taken to find the initial detectors of a code when the
+DetectorInitialiser replays the whole partial circuit into a fresh simulator
+every round, against when it simulates incrementally. The latter should grow
+linearly with the number of initial rounds, the former quadratically."""
+import time
+
+from main.codes.tic_tac_toe.gauge.GaugeHoneycombCode import GaugeHoneycombCode
+from main.compiling.compilers.AncillaPerCheckCompiler import AncillaPerCheckCompiler
+from main.compiling.compilers.DetectorInitialiser import DetectorInitialiser
+from main.compiling.noise.models import PhenomenologicalNoise
+from main.compiling.syndrome_extraction.extractors.ancilla_per_check.mixed.CxCyCzExtractor import CxCyCzExtractor
+from main.utils.enums import State
+
+
+def time_initialisation(code, incremental: bool):
+    compiler = AncillaPerCheckCompiler(
+        PhenomenologicalNoise(0.001, 0.001), CxCyCzExtractor())
+    compiler.add_ancilla_qubits(code)
+    initial_states = {qubit: State.Zero for qubit in code.data_qubits.values()}
+    initialiser = DetectorInitialiser(code, compiler, incremental=incremental)
+    start = time.perf_counter()
+    schedules = initialiser.get_initial_detectors(initial_states, None)
+    duration = time.perf_counter() - start
+    initial_rounds = sum(len(layer) for layer in schedules)
+    return initial_rounds, duration
+
+
+def main():
+    distance = 8
+    print('gauge factor, initial rounds, full replay (s), incremental (s)')
+    for gauge_factor in [1, 2, 4, 8, 16]:
+        code = GaugeHoneycombCode(distance, [gauge_factor] * 3)
+        rounds, full = time_initialisation(code, incremental=False)
+        _, incremental = time_initialisation(code, incremental=True)
+        print(f'{gauge_factor}, {rounds}, {full:.3f}, {incremental:.3f}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,74 @@
+"""Compare the time taken to add idling noise to a circuit when the
+initialised qubits are found by searching every qubit's history at every
+tick, against when they're found in a single sweep through the circuit."""
+import time
+
+from main.building_blocks.pauli import Pauli
+from main.building_blocks.pauli.PauliLetter import PauliLetter
+from main.codes.tic_tac_toe.HoneycombCode import HoneycombCode
+from main.compiling.Circuit import Circuit
+from main.compiling.compilers.AncillaPerCheckCompiler import AncillaPerCheckCompiler
+from main.compiling.noise.models import PhenomenologicalNoise
+from main.compiling.noise.noises.OneQubitNoise import OneQubitNoise
+from main.compiling.syndrome_extraction.extractors.ancilla_per_check.mixed.CxCyCzExtractor import CxCyCzExtractor
+from main.utils.enums import State
+
+
+def add_idling_noise_per_tick(circuit: Circuit, idling_noise: OneQubitNoise):
+    # How Circuit.add_idling_noise used to work - for each tick, ask each
+    # qubit whether it's initialised, sorting its history every time.
+    def is_initialised(tick, qubit):
+        inits = [t for t in sorted(circuit.init_ticks[qubit]) if t <= tick]
+        measures = [t for t in sorted(circuit.measure_ticks[qubit]) if t <= tick]
+        inits_max = inits[-1] if len(inits) > 0 else -1
+        measures_max = measures[-1] if len(measures) > 0 else -1
+        return inits_max > measures_max
+
+    for tick in sorted(circuit.instructions.keys()):
+        if tick % 2 == 0:
+            initialised = {
+                qubit for qubit in circuit.qubits
+                if is_initialised(tick, qubit)}
+            idle_qubits = circuit.get_idle_qubits(tick, initialised)
+            idle_qubits = sorted(idle_qubits, key=lambda qubit: qubit.coords)
+            for qubit in idle_qubits:
+                circuit.add_instruction(
+                    tick + 1, idling_noise.instruction([qubit]))
+
+
+def compile_circuit(distance: int, rounds: int) -> Circuit:
+    code = HoneycombCode(distance)
+    compiler = AncillaPerCheckCompiler(
+        PhenomenologicalNoise(0.001, 0.001), CxCyCzExtractor())
+    data_qubits = code.data_qubits.values()
+    initial_states = {qubit: State.Zero for qubit in data_qubits}
+    final_measurements = [
+        Pauli(qubit, PauliLetter('Z')) for qubit in data_qubits]
+    return compiler.compile_to_circuit(
+        code=code,
+        total_rounds=rounds,
+        initial_states=initial_states,
+        final_measurements=final_measurements,
+        observables=[code.logical_qubits[1].z])
+
+
+def main():
+    idling_noise = OneQubitNoise.uniform(0.001)
+    print('distance, rounds, ticks, qubits, per tick (s), sweep (s)')
+    for distance, rounds in [(4, 96), (8, 96), (8, 384), (12, 384)]:
+        circuit = compile_circuit(distance, rounds)
+        start = time.perf_counter()
+        add_idling_noise_per_tick(circuit, idling_noise)
+        per_tick = time.perf_counter() - start
+
+        circuit = compile_circuit(distance, rounds)
+        start = time.perf_counter()
+        circuit.add_idling_noise(idling_noise, None)
+        sweep = time.perf_counter() - start
+        ticks = max(circuit.instructions.keys()) + 1
+        print(f'{distance}, {rounds}, {ticks}, {len(circuit.qubits)}, '
+              f'{per_tick:.3f}, {sweep:.3f}')
+
+
+if __name__ == '__main__':
+    main()
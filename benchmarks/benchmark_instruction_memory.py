@@ -0,0 +1,46 @@
+"""Report how much memory compiled honeycomb code memory experiments retain
+before being translated into stim circuits, and how that compares with the
+number of instructions they contain. A circuit stores its instructions in an
+InstructionTable - flat arrays of ticks, opcodes, parameter ids and qubit
+ids - rather than as Instruction objects, keeping only measurements whole.
+This cuts the memory a compiled circuit retains to around a third of what
+it was with one (slotted) Instruction object per instruction.
+"""
+import gc
+import time
+import tracemalloc
+
+from main.codes.tic_tac_toe.HoneycombCode import HoneycombCode
+from main.compiling.compilers.AncillaPerCheckCompiler import AncillaPerCheckCompiler
+from main.compiling.noise.models import CircuitLevelNoise
+from main.utils.enums import State
+
+
+def main():
+    print('distance, rounds, compile time (s), retained (MiB), '
+          'instructions, retained per instruction (B)')
+    for distance in [4, 8, 12]:
+        for rounds in [60, 240]:
+            code = HoneycombCode(distance)
+            compiler = AncillaPerCheckCompiler(CircuitLevelNoise(*[0.001] * 5))
+            initial_states = {
+                qubit: State.Zero for qubit in code.data_qubits.values()}
+            gc.collect()
+            tracemalloc.start()
+            start = time.perf_counter()
+            circuit = compiler.compile_to_circuit(
+                code, rounds, initial_states,
+                observables=[code.logical_qubits[1].z])
+            duration = time.perf_counter() - start
+            gc.collect()
+            retained, _ = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+            instructions = len(circuit.instructions.opcodes)
+            print(
+                f'{distance}, {rounds}, {duration:.1f}, '
+                f'{retained / 2**20:.1f}, {instructions}, '
+                f'{retained / instructions:.0f}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,53 @@
+"""Report how long it takes to find which checks to multiply into the
+logical operators of Floquet colour codes and honeycomb codes at each
+round, comparing asking every check of the current type whether it
+intersects the operator (as was done before) against looking the checks
+up by the qubits in the operator's support (as
+TicTacToeLogicalOperator.intersecting_checks now does).
+"""
+import time
+
+from main.codes.tic_tac_toe.FloquetColourCode import FloquetColourCode
+from main.codes.tic_tac_toe.HoneycombCode import HoneycombCode
+
+
+def scan_all_checks(operator, round: int):
+    code = operator.logical_qubit.code
+    ungauged_round = operator.round_to_ungauged_round(round)
+    check_type = code.tic_tac_toe_route[
+        ungauged_round % code.schedule_length]
+    return [
+        check for check in code.checks_by_type[check_type]
+        if operator.intersects(check, round)]
+
+
+def main():
+    print('code, distance, rounds, scanning all checks (ms), '
+          'index lookup (ms), speed-up')
+    for code_class in [FloquetColourCode, HoneycombCode]:
+        for distance in [16, 24, 32]:
+            code = code_class(distance)
+            operator = code.logical_qubits[0].x
+            # Build up the operator's history first, so that only finding
+            # the intersecting checks is timed.
+            rounds = list(range(2 * code.schedule_length))
+            for round in rounds:
+                operator.at_round(round)
+
+            start = time.perf_counter()
+            for round in rounds:
+                scan_all_checks(operator, round)
+            scan = time.perf_counter() - start
+
+            start = time.perf_counter()
+            for round in rounds:
+                operator.intersecting_checks(round)
+            index = time.perf_counter() - start
+
+            print(
+                f'{code_class.__name__}, {distance}, {len(rounds)}, '
+                f'{1e3 * scan:.1f}, {1e3 * index:.1f}, {scan / index:.1f}x')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,53 @@
+"""Compare the time and peak memory taken to build a PymatchingDecoder when
+the matching graph is built via an intermediate networkx graph, against when
+it is built straight from arrays of edges extracted from the error model."""
+import time
+import tracemalloc
+import warnings
+
+import stim
+
+from main.decoding.PymatchingDecoder import PymatchingDecoder
+
+
+def build_decoder(dem: stim.DetectorErrorModel, use_networkx: bool):
+    with warnings.catch_warnings():
+        # Pymatching complains about the spandrel edges.
+        warnings.simplefilter('ignore')
+        return PymatchingDecoder(dem, use_networkx=use_networkx)
+
+
+def measure_construction(dem: stim.DetectorErrorModel, use_networkx: bool):
+    # Tracing memory allocations slows everything down, so time separately.
+    start = time.perf_counter()
+    build_decoder(dem, use_networkx)
+    duration = time.perf_counter() - start
+    tracemalloc.start()
+    build_decoder(dem, use_networkx)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return duration, peak / 2**20
+
+
+def main():
+    print('distance, rounds, edges, networkx (s), networkx (MiB), '
+          'arrays (s), arrays (MiB)')
+    for distance in [4, 8, 12, 16]:
+        rounds = 3 * distance
+        circuit = stim.Circuit.generated(
+            'surface_code:rotated_memory_x',
+            distance=distance,
+            rounds=rounds,
+            after_clifford_depolarization=0.001,
+            before_measure_flip_probability=0.001,
+            after_reset_flip_probability=0.001)
+        dem = circuit.detector_error_model(decompose_errors=True)
+        nx_time, nx_memory = measure_construction(dem, use_networkx=True)
+        array_time, array_memory = measure_construction(dem, use_networkx=False)
+        edges = PymatchingDecoder(dem).matcher.num_edges
+        print(f'{distance}, {rounds}, {edges}, {nx_time:.3f}, {nx_memory:.1f}, '
+              f'{array_time:.3f}, {array_memory:.1f}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,60 @@
+"""Report how long the Measurer spends on bookkeeping when honeycomb code
+memory experiments are compiled and then translated into stim circuits -
+i.e. noting down which checks are measured in which rounds and what they
+trigger, and looking this up again to assign measurement numbers and build
+detectors. The Measurer keys everything by the dense integer ids that
+checks and detectors are given when a code's schedules are set, rather
+than by the checks themselves, which are slow to hash and compare - so
+checks are hardly ever hashed or compared at all.
+"""
+import cProfile
+import pstats
+
+from main.codes.tic_tac_toe.HoneycombCode import HoneycombCode
+from main.compiling.compilers.AncillaPerCheckCompiler import AncillaPerCheckCompiler
+from main.compiling.noise.models import CircuitLevelNoise
+from main.utils.enums import State
+
+# The Measurer's entry points - time spent in these includes everything
+# they call, e.g. hashing the keys they look things up by.
+MEASURER_METHODS = [
+    'add_measurement', 'add_detectors', 'multiply_observable',
+    'measurement_triggers_to_stim']
+
+
+def main():
+    print('distance, rounds, total (s), measurer bookkeeping (s), '
+          'check hashes and comparisons')
+    for distance in [4, 8, 12]:
+        for rounds in [60, 240]:
+            code = HoneycombCode(distance)
+            compiler = AncillaPerCheckCompiler(CircuitLevelNoise(*[0.001] * 5))
+            initial_states = {
+                qubit: State.Zero for qubit in code.data_qubits.values()}
+            profile = cProfile.Profile()
+            profile.enable()
+            circuit = compiler.compile_to_circuit(
+                code, rounds, initial_states,
+                observables=[code.logical_qubits[1].z])
+            circuit.to_stim(None, track_progress=False)
+            profile.disable()
+            stats = pstats.Stats(profile).stats
+            total = sum(tottime for _, _, tottime, _, _ in stats.values())
+            bookkeeping = sum(
+                cumtime
+                for (filename, _, name), (_, _, _, cumtime, _)
+                in stats.items()
+                if filename.endswith('Measurer.py') and
+                name in MEASURER_METHODS)
+            check_calls = sum(
+                calls
+                for (filename, _, name), (_, calls, _, _, _) in stats.items()
+                if filename.endswith('Check.py') and
+                name in ['__hash__', '__eq__'])
+            print(
+                f'{distance}, {rounds}, {total:.2f}, {bookkeeping:.2f}, '
+                f'{check_calls}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,51 @@
+"""Report how long a 20-point noise sweep of honeycomb code memory
+experiments takes to compile, either compiling every point from scratch, or
+compiling a single noise template (Compiler.compile_noise_template) and
+instantiating it once per point.
+"""
+import time
+
+import numpy as np
+
+from main.codes.tic_tac_toe.HoneycombCode import HoneycombCode
+from main.compiling.compilers.AncillaPerCheckCompiler import AncillaPerCheckCompiler
+from main.compiling.noise.models import CircuitLevelNoise
+from main.utils.enums import State
+
+
+def main():
+    error_rates = np.geomspace(0.0005, 0.005, 20)
+    print('distance, rounds, compile each point (s), template (s), '
+          'instantiate every point (s)')
+    for distance in [4, 8, 12]:
+        for rounds in [60]:
+            code = HoneycombCode(distance)
+            initial_states = {
+                qubit: State.Zero for qubit in code.data_qubits.values()}
+            observables = [code.logical_qubits[1].z]
+
+            start = time.perf_counter()
+            for p in error_rates:
+                compiler = AncillaPerCheckCompiler(CircuitLevelNoise(*[p] * 5))
+                compiler.compile_to_stim(
+                    code, rounds, initial_states, observables=observables)
+            from_scratch = time.perf_counter() - start
+
+            start = time.perf_counter()
+            compiler = AncillaPerCheckCompiler(
+                CircuitLevelNoise(*[error_rates[0]] * 5))
+            template = compiler.compile_noise_template(
+                code, rounds, initial_states, observables=observables)
+            compiling_template = time.perf_counter() - start
+            start = time.perf_counter()
+            for p in error_rates:
+                template.instantiate(CircuitLevelNoise(*[p] * 5))
+            instantiating = time.perf_counter() - start
+
+            print(
+                f'{distance}, {rounds}, {from_scratch:.2f}, '
+                f'{compiling_template:.2f}, {instantiating:.2f}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,63 @@
+"""Report how long compiling honeycomb code memory experiments with native
+Pauli product measurements under the EM3 noise model, and translating them
+into stim circuits, spends building Pauli product measurement targets, when
+Circuit.product_measurement_targets does and doesn't remember the targets
+it built for each check.
+"""
+import time
+
+from main.codes.tic_tac_toe.HoneycombCode import HoneycombCode
+from main.compiling.Circuit import Circuit
+from main.compiling.compilers.NativePauliProductMeasurementsCompiler import \
+    NativePauliProductMeasurementsCompiler
+from main.compiling.noise.models import EM3
+from main.utils.enums import State
+
+
+def main():
+    timings = []
+    product_measurement_targets = Circuit.product_measurement_targets
+
+    def timed_product_measurement_targets(circuit: Circuit, check):
+        start = time.perf_counter()
+        targets = product_measurement_targets(circuit, check)
+        timings[-1] += time.perf_counter() - start
+        return targets
+
+    def uncached_product_measurement_targets(circuit: Circuit, check):
+        circuit._product_measurement_targets.clear()
+        return timed_product_measurement_targets(circuit, check)
+
+    print('distance, rounds, total (s), uncached targets (s), '
+          'cached targets (s), speed-up')
+    for distance in [4, 8]:
+        for rounds in [1000, 4000]:
+            totals = []
+            for targeter in [
+                    uncached_product_measurement_targets,
+                    timed_product_measurement_targets]:
+                Circuit.product_measurement_targets = targeter
+                code = HoneycombCode(distance)
+                compiler = NativePauliProductMeasurementsCompiler(EM3(0.001))
+                initial_states = {
+                    qubit: State.Zero for qubit in code.data_qubits.values()}
+                timings.append(0)
+                start = time.perf_counter()
+                circuit = compiler.compile_to_circuit(
+                    code, rounds, initial_states,
+                    observables=[code.logical_qubits[1].x])
+                circuit.to_stim(
+                    compiler.noise_model.idling,
+                    compiler.noise_model.resonator_idle,
+                    track_progress=False)
+                totals.append(time.perf_counter() - start)
+            uncached, cached = timings[-2:]
+            print(
+                f'{distance}, {rounds}, {totals[-1]:.2f}, {uncached:.2f}, '
+                f'{cached:.2f}, {uncached / cached:.1f}x')
+
+    Circuit.product_measurement_targets = product_measurement_targets
+
+
+if __name__ == '__main__':
+    main()
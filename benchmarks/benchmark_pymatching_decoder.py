@@ -0,0 +1,65 @@
+"""Compare the throughput of PymatchingDecoder.decode_samples, which loops
+over shots in Python, against decode_batch, which hands the whole batch to
+pymatching at once, with and without bit-packed samples."""
+import time
+import warnings
+
+import numpy as np
+
+from main.building_blocks.pauli import Pauli
+from main.building_blocks.pauli.PauliLetter import PauliLetter
+from main.codes.RotatedSurfaceCode import RotatedSurfaceCode
+from main.compiling.compilers.AncillaPerCheckCompiler import AncillaPerCheckCompiler
+from main.compiling.noise.models import PhenomenologicalNoise
+from main.compiling.syndrome_extraction.controlled_gate_orderers.RotatedSurfaceCodeOrderer import \
+    RotatedSurfaceCodeOrderer
+from main.compiling.syndrome_extraction.extractors.ancilla_per_check.pure.CnotCssExtractor import CnotCssExtractor
+from main.decoding.PymatchingDecoder import PymatchingDecoder
+from main.utils.enums import State
+
+
+def time_decoding(decode, samples):
+    start = time.perf_counter()
+    predictions = decode(samples)
+    duration = time.perf_counter() - start
+    return predictions, duration
+
+
+def main():
+    shots = 20_000
+    print('distance, shots/s (loop), shots/s (batch), shots/s (batch, bit-packed)')
+    for distance in [3, 5, 7]:
+        code = RotatedSurfaceCode(distance)
+        compiler = AncillaPerCheckCompiler(
+            PhenomenologicalNoise(0.005, 0.005),
+            CnotCssExtractor(RotatedSurfaceCodeOrderer()))
+        data_qubits = code.data_qubits.values()
+        initial_states = {qubit: State.Zero for qubit in data_qubits}
+        final_measurements = [
+            Pauli(qubit, PauliLetter('Z')) for qubit in data_qubits]
+        circuit = compiler.compile_to_stim(
+            code=code,
+            total_rounds=distance,
+            initial_states=initial_states,
+            final_measurements=final_measurements,
+            observables=[code.logical_qubits[0].z])
+        with warnings.catch_warnings():
+            # Pymatching complains about the spandrel edges.
+            warnings.simplefilter('ignore')
+            decoder = PymatchingDecoder(
+                circuit.detector_error_model(decompose_errors=True))
+        sampler = circuit.compile_detector_sampler(seed=0)
+        samples = sampler.sample(shots)
+        packed = sampler.sample(shots, bit_packed=True)
+
+        loop, loop_time = time_decoding(decoder.decode_samples, samples)
+        batch, batch_time = time_decoding(decoder.decode_batch, samples)
+        _, packed_time = time_decoding(
+            lambda s: decoder.decode_batch(s, bit_packed=True), packed)
+        assert np.array_equal(loop, batch)
+        print(f'{distance}, {shots / loop_time:.0f}, '
+              f'{shots / batch_time:.0f}, {shots / packed_time:.0f}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,51 @@
+"""Compare the time and peak memory taken to compile a honeycomb code memory
+experiment to stim, with the bulk of the circuit unrolled versus emitted as a
+single REPEAT block, as the number of rounds grows."""
+import time
+import tracemalloc
+
+from main.codes.tic_tac_toe.HoneycombCode import HoneycombCode
+from main.compiling.compilers.AncillaPerCheckCompiler import AncillaPerCheckCompiler
+from main.compiling.noise.models.SI1000 import SI1000
+from main.compiling.syndrome_extraction.extractors.ancilla_per_check.mixed.CxCyCzExtractor import CxCyCzExtractor
+from main.utils.enums import State
+
+
+def compile_circuit(rounds: int, use_repeat_block: bool):
+    code = HoneycombCode(4)
+    compiler = AncillaPerCheckCompiler(SI1000(0.001), CxCyCzExtractor())
+    return compiler.compile_to_stim(
+        code=code,
+        total_rounds=rounds,
+        initial_states={
+            qubit: State.Zero for qubit in code.data_qubits.values()},
+        observables=[code.logical_qubits[1].z],
+        use_repeat_block=use_repeat_block)
+
+
+def main():
+    results = []
+    for rounds in [48, 192, 768]:
+        for use_repeat_block in [False, True]:
+            start = time.perf_counter()
+            circuit = compile_circuit(rounds, use_repeat_block)
+            duration = time.perf_counter() - start
+            # Measure memory in a separate run, since tracing slows
+            # everything down.
+            tracemalloc.start()
+            compile_circuit(rounds, use_repeat_block)
+            _, peak = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+            results.append((
+                rounds, use_repeat_block, duration, peak / 2**20,
+                len(circuit)))
+
+    print('rounds, repeat block, time (s), peak memory (MiB), '
+          'top-level stim instructions')
+    for rounds, use_repeat_block, duration, peak, length in results:
+        print(f"{rounds}, {use_repeat_block}, {duration:.2f}, {peak:.1f}, "
+              f"{length}")
+
+
+if __name__ == '__main__':
+    main()
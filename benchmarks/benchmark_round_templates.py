@@ -0,0 +1,72 @@
+"""Report how long compiling honeycomb code memory experiments takes with and
+without round templates (Compiler.use_round_templates). With templates, the
+syndrome extractor only runs for the first round of each relative round;
+every later round is stamped out as copies of the instructions it compiled.
+Also reports the time spent per round extracting checks either way, next to
+the time it takes just to copy that many instructions, which is the least
+stamping could cost.
+"""
+import gc
+import time
+
+from main.codes.tic_tac_toe.HoneycombCode import HoneycombCode
+from main.compiling.compilers.AncillaPerCheckCompiler import AncillaPerCheckCompiler
+from main.compiling.compilers.Compiler import Compiler
+from main.compiling.compilers.NativePauliProductMeasurementsCompiler import \
+    NativePauliProductMeasurementsCompiler
+from main.compiling.noise.models import CircuitLevelNoise
+from main.utils.enums import State
+
+
+def main():
+    timings = []
+    extract_checks = Compiler.extract_checks
+
+    def timed_extract_checks(compiler, *args):
+        start = time.perf_counter()
+        result = extract_checks(compiler, *args)
+        timings[-1] += time.perf_counter() - start
+        return result
+
+    Compiler.extract_checks = timed_extract_checks
+
+    print('compiler, distance, rounds, templates, compile (s), '
+          'per round (ms), copying per round (ms)')
+    for compiler_class in [
+            AncillaPerCheckCompiler, NativePauliProductMeasurementsCompiler]:
+        for distance in [8, 12]:
+            rounds = 240
+            for use_round_templates in [False, True]:
+                code = HoneycombCode(distance)
+                compiler = compiler_class(CircuitLevelNoise(*[0.001] * 5))
+                compiler.use_round_templates = use_round_templates
+                initial_states = {
+                    qubit: State.Zero for qubit in code.data_qubits.values()}
+                gc.collect()
+                timings.append(0)
+                start = time.perf_counter()
+                circuit = compiler.compile_to_circuit(
+                    code, rounds, initial_states,
+                    observables=[code.logical_qubits[1].z])
+                duration = time.perf_counter() - start
+
+                # The cheapest stamping could possibly be: copying every
+                # instruction in the circuit.
+                instructions = [
+                    circuit.instructions.instruction(index)
+                    for index in circuit.instructions.indices()]
+                start = time.perf_counter()
+                _ = [instruction.copy() for instruction in instructions]
+                copying = time.perf_counter() - start
+
+                print(
+                    f'{compiler_class.__name__}, {distance}, {rounds}, '
+                    f'{use_round_templates}, {duration:.2f}, '
+                    f'{1000 * timings[-1] / rounds:.2f}, '
+                    f'{1000 * copying / rounds:.2f}')
+
+    Compiler.extract_checks = extract_checks
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,57 @@
+"""Report how long translating honeycomb code memory experiments into stim
+circuits takes, and how much of that is spent grouping each tick's
+instructions by gate (Circuit.split_instructions_according_to_gate).
+"""
+import time
+
+from main.codes.tic_tac_toe.HoneycombCode import HoneycombCode
+from main.compiling.Circuit import Circuit
+from main.compiling.compilers.AncillaPerCheckCompiler import AncillaPerCheckCompiler
+from main.compiling.compilers.NativePauliProductMeasurementsCompiler import \
+    NativePauliProductMeasurementsCompiler
+from main.compiling.noise.models import CircuitLevelNoise
+from main.utils.enums import State
+
+
+def main():
+    # Compiling also splits instructions (to find initial detectors), so
+    # start with somewhere to put those timings too.
+    timings = [0]
+    split_instructions_according_to_gate = \
+        Circuit.split_instructions_according_to_gate
+
+    def timed_split_instructions_according_to_gate(circuit, *args):
+        start = time.perf_counter()
+        result = split_instructions_according_to_gate(circuit, *args)
+        timings[-1] += time.perf_counter() - start
+        return result
+
+    Circuit.split_instructions_according_to_gate = \
+        timed_split_instructions_according_to_gate
+
+    print('compiler, distance, rounds, to_stim (s), splitting (s)')
+    for compiler_class in [
+            AncillaPerCheckCompiler, NativePauliProductMeasurementsCompiler]:
+        for distance in [8, 12]:
+            for rounds in [60, 240]:
+                code = HoneycombCode(distance)
+                compiler = compiler_class(CircuitLevelNoise(*[0.001] * 5))
+                initial_states = {
+                    qubit: State.Zero for qubit in code.data_qubits.values()}
+                circuit = compiler.compile_to_circuit(
+                    code, rounds, initial_states,
+                    observables=[code.logical_qubits[1].z])
+                timings.append(0)
+                start = time.perf_counter()
+                circuit.to_stim(None, None, track_progress=False)
+                duration = time.perf_counter() - start
+                print(
+                    f'{compiler_class.__name__}, {distance}, {rounds}, '
+                    f'{duration:.2f}, {timings[-1]:.2f}')
+
+    Circuit.split_instructions_according_to_gate = \
+        split_instructions_according_to_gate
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,69 @@
+"""Report how long getting the detector error models for a 20-point noise
+sweep of honeycomb code memory experiments takes, either asking stim for
+each point's model afresh, or working out a single structural detector error
+model (StructuralDetectorErrorModel) and instantiating it once per point.
+Also reports the largest relative difference between the probability of any
+error mechanism in an instantiated model and in the fresh one, across the
+sweep.
+"""
+import time
+
+import numpy as np
+
+from main.codes.tic_tac_toe.HoneycombCode import HoneycombCode
+from main.compiling.StructuralDetectorErrorModel import \
+    StructuralDetectorErrorModel
+from main.compiling.compilers.AncillaPerCheckCompiler import AncillaPerCheckCompiler
+from main.compiling.compilers.NativePauliProductMeasurementsCompiler import \
+    NativePauliProductMeasurementsCompiler
+from main.compiling.noise.models import EM3, SI1000
+from main.utils.enums import State
+
+
+def main():
+    error_rates = np.geomspace(0.0005, 0.005, 20)
+    # As sinter uses to get a detector error model for pymatching.
+    kwargs = {'decompose_errors': True, 'approximate_disjoint_errors': True}
+    print('compiler, distance, rounds, fresh models (s), structural model (s), '
+          'instantiate every point (s), max relative error')
+    for compiler_class, noise_model in [
+            (AncillaPerCheckCompiler, SI1000),
+            (NativePauliProductMeasurementsCompiler, EM3)]:
+        for distance in [4, 8, 12]:
+            rounds = 60
+            code = HoneycombCode(distance)
+            initial_states = {
+                qubit: State.Zero for qubit in code.data_qubits.values()}
+            template = compiler_class(
+                noise_model(error_rates[0])).compile_noise_template(
+                code, rounds, initial_states,
+                observables=[code.logical_qubits[1].z])
+            circuits = [
+                template.instantiate(noise_model(p)) for p in error_rates]
+
+            start = time.perf_counter()
+            fresh = [
+                circuit.detector_error_model(**kwargs)
+                for circuit in circuits]
+            fresh_models = time.perf_counter() - start
+
+            start = time.perf_counter()
+            structural = StructuralDetectorErrorModel.from_noise_template(
+                template, **kwargs)
+            structural_model = time.perf_counter() - start
+            start = time.perf_counter()
+            instantiated = [
+                structural.instantiate(noise_model(p)) for p in error_rates]
+            instantiating = time.perf_counter() - start
+
+            error = max(
+                StructuralDetectorErrorModel.max_relative_error(model, expected)
+                for model, expected in zip(instantiated, fresh))
+            print(
+                f'{compiler_class.__name__}, {distance}, {rounds}, '
+                f'{fresh_models:.2f}, {structural_model:.2f}, '
+                f'{instantiating:.2f}, {error:.1e}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,60 @@
+"""Report how long it takes to find the number of rounds a stability
+experiment on a gauge Floquet colour code needs to reach a given timelike
+distance - both by stepping through the number of rounds one at a time,
+reading the precalculated distance data from disk at each step (as was
+done before), and by solving for it directly from the cached data (as
+get_number_of_rounds_for_timelike_distance now does).
+"""
+import json
+import time
+from pathlib import Path
+
+from main.codes.tic_tac_toe.gauge import GaugeTicTacToeCode
+from main.codes.tic_tac_toe.gauge.GaugeFloquetColourCode import \
+    GaugeFloquetColourCode
+
+
+def uncached_linear_search(
+        code: GaugeFloquetColourCode, desired_distance: int,
+        noise_model: str) -> int:
+    path = Path(GaugeTicTacToeCode.__file__).parent / \
+        'timelike_distance_data' / \
+        code.timelike_distance_data_files[noise_model]
+
+    def distance(n_rounds, letter):
+        with path.open('r') as openfile:
+            data = json.load(openfile)
+        return code.distance_from_timelike_distance_dict(
+            n_rounds, letter, data)
+
+    n_rounds = len(code.tic_tac_toe_route)
+    while min(distance(n_rounds, 'X'), distance(n_rounds, 'Z')) < \
+            desired_distance:
+        n_rounds += 1
+    return n_rounds
+
+
+def main():
+    code = GaugeFloquetColourCode(4, [2, 3])
+    noise_model = 'circuit_level_noise'
+    repeats = 1000
+    print('desired distance, rounds, linear search (ms), '
+          f'direct solve (us, mean of {repeats})')
+    for desired_distance in [5, 50, 500, 5000]:
+        start = time.perf_counter()
+        linear = uncached_linear_search(code, desired_distance, noise_model)
+        linear_time = time.perf_counter() - start
+
+        start = time.perf_counter()
+        for _ in range(repeats):
+            rounds, _, _ = code.get_number_of_rounds_for_timelike_distance(
+                desired_distance, noise_model=noise_model)
+        direct_time = (time.perf_counter() - start) / repeats
+        assert rounds == linear
+
+        print(f'{desired_distance}, {rounds}, {1e3 * linear_time:.1f}, '
+              f'{1e6 * direct_time:.1f}')
+
+
+if __name__ == '__main__':
+    main()
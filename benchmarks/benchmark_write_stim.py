@@ -0,0 +1,61 @@
+"""Report the peak memory used, and time taken, to compile honeycomb code
+memory experiments and then either build the whole stim circuit in memory
+(Circuit.to_stim) or stream it to a gzip-compressed file tick by tick
+(Circuit.write_stim, freeing instructions as it goes). Each run happens in
+a fresh process, so that peak memory can be measured.
+"""
+import multiprocessing
+import os
+import resource
+import tempfile
+import time
+
+from main.codes.tic_tac_toe.HoneycombCode import HoneycombCode
+from main.compiling.compilers.AncillaPerCheckCompiler import AncillaPerCheckCompiler
+from main.compiling.noise.models import CircuitLevelNoise
+from main.utils.enums import State
+
+
+def run(distance: int, rounds: int, stream: bool, path: str, results):
+    code = HoneycombCode(distance)
+    compiler = AncillaPerCheckCompiler(CircuitLevelNoise(*[0.001] * 5))
+    initial_states = {
+        qubit: State.Zero for qubit in code.data_qubits.values()}
+    circuit = compiler.compile_to_circuit(
+        code, rounds, initial_states, observables=[code.logical_qubits[1].z])
+    start = time.perf_counter()
+    if stream:
+        circuit.write_stim(path, None, free_instructions=True)
+    else:
+        stim_circuit = circuit.to_stim(None, track_progress=False)
+    # Peak resident memory of this process, in KiB on Linux.
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    results.put((time.perf_counter() - start, peak))
+
+
+def main():
+    context = multiprocessing.get_context('spawn')
+    print('distance, rounds, to_stim (s), to_stim peak (MiB), '
+          'write_stim (s), write_stim peak (MiB), file size (MiB)')
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, 'circuit.stim.gz')
+        for distance, rounds in [(8, 240), (12, 240), (12, 960)]:
+            timings = []
+            for stream in [False, True]:
+                results = context.Queue()
+                process = context.Process(
+                    target=run,
+                    args=(distance, rounds, stream, path, results))
+                process.start()
+                timings.append(results.get())
+                process.join()
+            (to_stim, to_stim_peak), (write_stim, write_stim_peak) = timings
+            print(
+                f'{distance}, {rounds}, {to_stim:.1f}, '
+                f'{to_stim_peak / 1024:.0f}, {write_stim:.1f}, '
+                f'{write_stim_peak / 1024:.0f}, '
+                f'{os.path.getsize(path) / 2**20:.1f}')
+
+
+if __name__ == '__main__':
+    main()
@@ -1,87 +1,55 @@
-from datetime import datetime
-from pathlib import Path
-from typing import Callable
-
 import sinter
+import stim
 from matplotlib import pyplot as plt
 
 from main.building_blocks.pauli.Pauli import Pauli
 from main.building_blocks.pauli.PauliLetter import PauliLetter
 from main.codes.tic_tac_toe.FloquetColourCode import FloquetColourCode
-from main.codes.tic_tac_toe.HoneycombCode import HoneycombCode
-from main.codes.tic_tac_toe.TicTacToeCode import TicTacToeCode
 from main.compiling.compilers.AncillaPerCheckCompiler import AncillaPerCheckCompiler
 from main.compiling.noise.models import CircuitLevelNoise
-from main.compiling.noise.models.PhenomenologicalNoise import PhenomenologicalNoise
 from main.compiling.syndrome_extraction.controlled_gate_orderers.TrivialOrderer import TrivialOrderer
-from main.compiling.syndrome_extraction.extractors.ancilla_per_check.UniformAncillaBasisExtractor import \
-    UniformAncillaBasisExtractor
 from main.compiling.syndrome_extraction.extractors.ancilla_per_check.mixed.CxCyCzExtractor import CxCyCzExtractor
+from main.sweeps import Sweep
 from main.utils.enums import State
 from main.utils.utils import output_path
 
 
-def tic_tac_toe_phenom_tasks(constructor: Callable[[int], TicTacToeCode]):
-    tasks = []
-    syndrome_extractor = CxCyCzExtractor(TrivialOrderer())
-    error_rates = [0.001, 0.0015, 0.002, 0.0035, 0.003]
-    distances = [4, 8, 12]
-    for error_rate in error_rates:
-        print(f'Error rate: {error_rate}')
-        for distance in distances:
-            print(f'Distance: {distance}')
-            tasks.append(tic_tac_toe_phenom_task(
-                constructor, distance, error_rate, syndrome_extractor))
-    return tasks
-
-
-def tic_tac_toe_phenom_task(
-        constructor: Callable[[int], TicTacToeCode],
-        distance: int, error_rate: float, syndrome_extractor: UniformAncillaBasisExtractor):
-    noise_model = CircuitLevelNoise(error_rate, error_rate, error_rate, error_rate, error_rate)
-    compiler = AncillaPerCheckCompiler(noise_model, syndrome_extractor)
+def tic_tac_toe_circuit(distance: int, error_rate: float) -> stim.Circuit:
+    # An X-basis memory experiment. Lives at module level so that the sweep
+    # can compile it in other processes.
+    noise_model = CircuitLevelNoise(
+        error_rate, error_rate, error_rate, error_rate, error_rate)
+    compiler = AncillaPerCheckCompiler(
+        noise_model, CxCyCzExtractor(TrivialOrderer()))
 
-    code = constructor(distance)
+    code = FloquetColourCode(distance)
     data_qubits = list(code.data_qubits.values())
     initial_states = {qubit: State.Plus for qubit in data_qubits}
     final_measurements = [Pauli(qubit, PauliLetter('X')) for qubit in data_qubits]
     observables = [code.logical_qubits[1].x]
-    circuit = compiler.compile_to_stim(
+    return compiler.compile_to_stim(
         code=code,
-        layers=distance,
+        total_rounds=12,
         initial_states=initial_states,
         final_measurements=final_measurements,
         observables=observables)
-    return sinter.Task(
-        circuit=circuit,
-        json_metadata={
-            'distance': distance,
-            'error_rate': error_rate})
 
 
 def main():
-    # Collect the samples (takes a few minutes).
-    tasks = tic_tac_toe_phenom_tasks(FloquetColourCode)
-    samples = sinter.collect(
-        tasks=tasks,
-        hint_num_tasks=len(tasks),
+    # Collect the samples (takes a few minutes). Circuits are compiled in
+    # parallel while sinter samples. Results always go to the same file, so
+    # re-running picks up where a previous run left off - delete the file
+    # to start again from scratch.
+    sweep = Sweep(tic_tac_toe_circuit, {
+        'distance': [4, 8, 12],
+        'error_rate': [0.001, 0.0015, 0.002, 0.0035, 0.003]})
+    filename = f'{output_path()}/FloquetColourCode'
+    samples = sweep.run(
+        f'{filename}.csv',
         num_workers=4,
         max_shots=1000,
         max_errors=100,
-        decoders=['pymatching'],
-        print_progress=True
-    )
-
-    # Save samples as CSV data.
-    filename = 'FloquetColourCode'
-    now = datetime.now().strftime('%Y%m%d_%H%M%S')
-    filename = f'{output_path()}/{filename}_{now}'
-    Path(Path(filename).parent).mkdir(parents=True, exist_ok=True)
-
-    with open(f'{filename}.csv', 'w') as file:
-        file.write(sinter.CSV_HEADER)
-        for sample in samples:
-            file.write(sample.to_csv_line())
+        print_progress=True)
 
     # Render a matplotlib plot of the data.
     fig, ax = plt.subplots(1, 1)
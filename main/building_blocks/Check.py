@@ -9,9 +9,17 @@ from main.utils.utils import coords_mid, coords_length, coords_minus, xor
 
 
 class Check(NiceRepr):
+    # A dense integer id, unique amongst the checks of the code this check
+    # belongs to, given to it when the code's schedules are set. Lets the
+    # Measurer key things on integers rather than hashing checks. None if
+    # the check isn't part of a code (e.g. one built to measure the data
+    # qubits at the end of a circuit).
+    check_id: Union[int, None] = None
+
     def __init__(
             self, paulis: Union[List[Pauli], Dict[Coordinates, Pauli]],
-            anchor: Coordinates = None, colour: Colour = None):
+            anchor: Coordinates = None, colour: Colour = None,
+            validate: bool = True):
         """A Pauli operator to measure.
         
         A check is a Pauli operator that is actually measured as part of
@@ -36,34 +44,47 @@ class Check(NiceRepr):
             colour:
                 If it exists, the colour assigned to this check - e.g. in the
                 colour code, each plaquette (i.e. check) gets a colour.
+            validate:
+                Whether to check that the given Paulis and anchor really do
+                make up a valid check. Code builders that know their checks
+                are valid can turn this off, since it's a large part of the
+                cost of building big codes. Defaults to True.
         """
-        self._assert_check_non_empty(paulis)
+        if validate:
+            self._assert_check_non_empty(paulis)
         if isinstance(paulis, dict):
-            self._assert_anchor_is_given(anchor, paulis)
-            self._assert_pauli_coords_valid(paulis.values())
-            self._assert_anchor_dim_matches_pauli_dims(
-                anchor, list(paulis.values()))
-            self._assert_offset_coords_valid(paulis)
-            self._assert_anchor_dim_matches_offset_dims(
-                anchor, paulis)
-            self._assert_qubits_unique(paulis.values())
+            if validate:
+                self._assert_anchor_is_given(anchor, paulis)
+                self._assert_pauli_coords_valid(paulis.values())
+                self._assert_anchor_dim_matches_pauli_dims(
+                    anchor, list(paulis.values()))
+                self._assert_offset_coords_valid(paulis)
+                self._assert_anchor_dim_matches_offset_dims(
+                    anchor, paulis)
+                self._assert_qubits_unique(paulis.values())
         else:
-            self._assert_qubits_unique(paulis)
-            self._assert_pauli_coords_valid(paulis)
+            if validate:
+                self._assert_qubits_unique(paulis)
+                self._assert_pauli_coords_valid(paulis)
             # Auto-create dictionary for paulis
             if anchor is None:
                 anchor = coords_mid(*[pauli.qubit.coords for pauli in paulis])
-            else:
+            elif validate:
                 self._assert_anchor_dim_matches_pauli_dims(anchor, paulis)
             paulis = {
                 coords_minus(pauli.qubit.coords, anchor): pauli
                 for pauli in paulis}
 
-        self.product = PauliProduct(list(paulis.values()))
-        self._assert_is_hermitian(self.product, paulis)
-        self._assert_is_not_identity_up_to_sign(self.product, paulis)
-
         self.paulis = paulis
+        # The product is only worked out when it's first needed.
+        self._product = None
+        # Checks are hashed a lot (e.g. when building detectors and
+        # compiling), so keep hold of the frozen set of Paulis used to do so.
+        self._frozen_paulis = None
+        if validate:
+            self._assert_is_hermitian(self.product, paulis)
+            self._assert_is_not_identity_up_to_sign(self.product, paulis)
+
         self.anchor = anchor
         self.colour = colour
         self.weight = len(paulis)
@@ -73,6 +94,12 @@ class Check(NiceRepr):
 
         super().__init__(['product.word', 'anchor', 'colour', 'paulis'])
 
+    @property
+    def product(self) -> PauliProduct:
+        if self._product is None:
+            self._product = PauliProduct(list(self.paulis.values()))
+        return self._product
+
     @property
     def dimension(self):
         return coords_length(self.anchor)
@@ -203,7 +230,23 @@ class Check(NiceRepr):
             self.anchor == other.anchor and \
             self.colour == other.colour
 
-    def __hash__(self):
-        paulis = frozenset(self.paulis.items())
-        return hash((paulis, self.anchor, self.colour))
+    def __getstate__(self):
+        # The frozen Paulis hash the qubits, which are hashed by id, so
+        # mustn't outlive them - e.g. a deep copy, or a check sent to
+        # another process, has new qubits.
+        state = dict(self.__dict__)
+        state['_frozen_paulis'] = None
+        return state
 
+    def __setstate__(self, state: Dict[str, Any]):
+        self.__dict__.update(state)
+        self._frozen_paulis = None
+
+    def __hash__(self):
+        # Frozen sets remember their own hashes, so this is much quicker the
+        # second time around. Rebuild it if the Paulis have been replaced.
+        if self._frozen_paulis is None or \
+                self._frozen_paulis[0] is not self.paulis:
+            self._frozen_paulis = (
+                self.paulis, frozenset(self.paulis.items()))
+        return hash((self._frozen_paulis[1], self.anchor, self.colour))
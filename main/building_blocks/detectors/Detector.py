@@ -1,8 +1,10 @@
-from typing import List, Tuple
+from typing import List, Tuple, Union
 
 from main.building_blocks.Check import Check
 from main.building_blocks.Qubit import Coordinates
 from main.building_blocks.pauli.PauliProduct import PauliProduct
+from main.building_blocks.pauli.SymplecticPauliProduct import \
+    SymplecticPauliProduct
 from main.utils.NiceRepr import NiceRepr
 from main.utils.utils import modulo_duplicates, coords_mid
 
@@ -13,11 +15,14 @@ TimedCheck = Tuple[int, Check]
 class Detector(NiceRepr):
     """A set of checks whose measurement outcomes' product should be
     deterministic in the absence of any noise."""
+    # Dense integer id, given when a code's schedules are set (see
+    # Code.set_schedules) - None for detectors that aren't part of a code.
+    detector_id: Union[int, None] = None
 
     def __init__(
             self,
             timed_checks: List[TimedCheck], end: int,
-            anchor: Coordinates = None):
+            anchor: Coordinates = None, validate: bool = True):
         """Detector constructor
 
         Args:
@@ -33,12 +38,19 @@ class Detector(NiceRepr):
                 Coordinates at which to 'anchor' this stabilizer. If None,
                 defaults to the midpoint of the anchors of all checks
                 involved.
+            validate:
+                Whether to check that the given timed checks make up a
+                valid detector. Code builders that know their detectors
+                are valid can turn this off. Defaults to True.
         """
-        self._assert_timed_checks_valid(timed_checks)
+        if validate:
+            self._assert_timed_checks_valid(timed_checks)
 
         self.timed_checks = timed_checks
         self.final_checks = [check for t, check in self.timed_checks if t == 0]
-        self.product = self.timed_checks_product(self.timed_checks)
+        # The product is only worked out when it's first needed - nothing
+        # needs it when building or compiling a code.
+        self._product = None
 
         if anchor is None:
             check_anchors = [check.anchor for _, check in self.timed_checks]
@@ -57,6 +69,12 @@ class Detector(NiceRepr):
 
         super().__init__(['product.word', 'end', 'timed_checks'])
 
+    @property
+    def product(self) -> PauliProduct:
+        if self._product is None:
+            self._product = self.timed_checks_product(self.timed_checks)
+        return self._product
+
     @staticmethod
     def timed_checks_product(timed_checks: List[TimedCheck]):
         # Pauli multiplication is not commutative so order matters.
@@ -69,8 +87,10 @@ class Detector(NiceRepr):
         paulis = [
             pauli for (_, check) in timed_checks
             for pauli in check.paulis.values()]
-        product = PauliProduct(paulis)
-        return product
+        # Multiplying symplectically is much faster than composing the
+        # Paulis one qubit at a time, and leaves exactly one Pauli per qubit.
+        product = SymplecticPauliProduct.from_paulis(paulis)
+        return product.to_pauli_product()
 
     @staticmethod
     def _assert_timed_checks_valid(timed_checks: List[TimedCheck]):
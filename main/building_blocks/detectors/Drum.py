@@ -3,12 +3,13 @@ from typing import List, Tuple
 
 from main.building_blocks.Qubit import Coordinates
 from main.building_blocks.detectors.Detector import Detector, TimedCheck
+from main.building_blocks.pauli.PauliProduct import PauliProduct
 
 
 class Drum(Detector):
     def __init__(
             self, floor: List[TimedCheck], lid: List[TimedCheck], end: int,
-            anchor: Coordinates = None):
+            anchor: Coordinates = None, validate: bool = True):
         """Detector with a drum shape.
 
         Specific type of Detector, where the same Pauli product (up to +/-
@@ -29,17 +30,26 @@ class Drum(Detector):
             anchor: 
                 Coordinates at which to 'anchor' this drum. If None, defaults 
                 to the midpoint of the anchors of all checks involved.
+            validate:
+                Whether to check that the floor and lid really do measure
+                the same Pauli product (up to sign), and that the drum is
+                otherwise valid. Code builders that know their drums are
+                valid can turn this off, in which case the floor and lid
+                products are only worked out when first needed. Defaults to
+                True.
         """
-        self._assert_lid_valid(lid)
-        self._assert_floor_valid(floor)
+        if validate:
+            self._assert_lid_valid(lid)
+            self._assert_floor_valid(floor)
 
-        super().__init__(floor + lid, end, anchor)
+        super().__init__(floor + lid, end, anchor, validate)
         self.floor = floor
         self.lid = lid
 
-        self.floor_product = self.timed_checks_product(self.floor)
-        self.lid_product = self.timed_checks_product(self.lid)
-        if not self.floor_product.equal_up_to_sign(self.lid_product):
+        self._floor_product = None
+        self._lid_product = None
+        if validate and \
+                not self.floor_product.equal_up_to_sign(self.lid_product):
             raise ValueError(
                 f"Can't create a Drum where the floor and lid don't compare "
                 f"the same two Pauli products at different timesteps (up to "
@@ -63,6 +73,18 @@ class Drum(Detector):
         self.repr_keys = [
             'floor_product.word', 'lid_product.word', 'end', 'floor', 'lid']
 
+    @property
+    def floor_product(self) -> PauliProduct:
+        if self._floor_product is None:
+            self._floor_product = self.timed_checks_product(self.floor)
+        return self._floor_product
+
+    @property
+    def lid_product(self) -> PauliProduct:
+        if self._lid_product is None:
+            self._lid_product = self.timed_checks_product(self.lid)
+        return self._lid_product
+
     def has_open_lid(
             self, round: int, schedule_length: int
     ) -> Tuple[bool, List[TimedCheck]]:
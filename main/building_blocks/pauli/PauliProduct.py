@@ -65,10 +65,10 @@ class PauliProduct(NiceRepr):
     @property
     def is_hermitian(self):
         if self._is_hermitian is None:
-            # It's Hermitian iff it's self-adjoint. And since it's unitary, this is
-            # equivalent to saying it's self-inverse.
-            product_with_itself = PauliProduct(self.paulis + self.paulis)
-            self._is_hermitian = product_with_itself.is_identity
+            # There's exactly one Pauli per qubit, and these are all
+            # Hermitian and commute with one another, so the product is
+            # Hermitian iff its overall sign is real.
+            self._is_hermitian = self.word.sign in [1, -1]
         return self._is_hermitian
 
     @staticmethod
@@ -0,0 +1,30 @@
+from typing import Dict, Iterable, List
+
+from main.building_blocks.Qubit import Qubit
+
+
+class QubitIndex:
+    def __init__(self, qubits: Iterable[Qubit] = ()):
+        """Assigns each qubit a position in the X and Z bit vectors of a
+        SymplecticPauliProduct. Products can only be multiplied or compared
+        if they use the same index.
+
+        Args:
+            qubits: qubits to index straight away. More can be added later,
+                and are indexed in the order in which they're first seen.
+        """
+        self.indices: Dict[Qubit, int] = {}
+        self.qubits: List[Qubit] = []
+        for qubit in qubits:
+            self.index(qubit)
+
+    def index(self, qubit: Qubit) -> int:
+        index = self.indices.get(qubit)
+        if index is None:
+            index = len(self.qubits)
+            self.indices[qubit] = index
+            self.qubits.append(qubit)
+        return index
+
+    def __len__(self):
+        return len(self.qubits)
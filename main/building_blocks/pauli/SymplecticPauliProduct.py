@@ -0,0 +1,183 @@
+from __future__ import annotations
+
+from typing import Iterable, List
+
+from main.building_blocks.pauli.Pauli import Pauli
+from main.building_blocks.pauli.PauliLetter import PauliLetter, \
+    multiplication_table
+from main.building_blocks.pauli.PauliProduct import PauliProduct
+from main.building_blocks.pauli.QubitIndex import QubitIndex
+
+# Powers of i, and the exponent of each.
+signs = [1, 1j, -1, -1j]
+sign_exponents = {sign: exponent for exponent, sign in enumerate(signs)}
+# Each letter as a pair of X and Z bits.
+letter_bits = {'I': (0, 0), 'X': (1, 0), 'Y': (1, 1), 'Z': (0, 1)}
+bits_letters = {bits: letter for letter, bits in letter_bits.items()}
+# The exponent of i picked up when multiplying one letter on the right by
+# another, e.g. XY = iZ.
+phase_exponents = {
+    letters: sign_exponents[sign]
+    for letters, (sign, _) in multiplication_table.items()}
+# Paulis are built from a small number of possible letters, so share them.
+pauli_letters = {
+    (letter, sign): PauliLetter(letter, sign)
+    for letter in letter_bits for sign in signs}
+
+
+def popcount(bits: int) -> int:
+    return bin(bits).count('1')
+
+
+class SymplecticPauliProduct:
+    def __init__(
+            self, xs: int, zs: int, sign_exponent: int, index: QubitIndex):
+        """A tensor product of Paulis, stored as a pair of bit vectors. Bit
+        k of xs (resp. zs) is set if the Pauli on qubit k of the index has
+        an X (resp. Z) component, so that X, Y and Z are (1, 0), (1, 1)
+        and (0, 1) respectively. The overall sign of the product is
+        i**sign_exponent.
+
+        Bit vectors are Python ints, so multiplication, commutation checks
+        and comparisons each take a handful of operations on whole vectors,
+        rather than work per qubit. This makes it faster than
+        PauliProduct for multiplying lots of Paulis together - e.g. when
+        finding a detector's product. Use to_pauli_product to convert back.
+
+        Args:
+            xs: the X bit vector.
+            zs: the Z bit vector.
+            sign_exponent: the product's sign is i to the power of this.
+            index: assigns each qubit its position in the bit vectors.
+        """
+        self.xs = xs
+        self.zs = zs
+        self.sign_exponent = sign_exponent % 4
+        self.index = index
+
+    @classmethod
+    def identity(cls, index: QubitIndex) -> SymplecticPauliProduct:
+        return cls(0, 0, 0, index)
+
+    @classmethod
+    def from_paulis(
+            cls, paulis: Iterable[Pauli], index: QubitIndex = None
+    ) -> SymplecticPauliProduct:
+        """Multiplies the given Paulis together, in the order they're
+        given - i.e. the leftmost is the last to be applied, as when
+        writing Paulis algebraically (and as in PauliProduct).
+
+        Args:
+            paulis: the Paulis to multiply together.
+            index: the qubit index to use. Any qubits not already in it are
+                added to it. Defaults to a new index.
+        """
+        if index is None:
+            index = QubitIndex()
+        # Equivalent to repeatedly calling multiply_by_pauli, but this is
+        # the hot path when building detectors, so is inlined.
+        xs, zs, sign_exponent = 0, 0, 0
+        for pauli in paulis:
+            bit = 1 << index.index(pauli.qubit)
+            letter = pauli.letter
+            current = bits_letters[(
+                1 if xs & bit else 0, 1 if zs & bit else 0)]
+            sign_exponent += \
+                phase_exponents[(current, letter.letter)] + \
+                sign_exponents[letter.sign]
+            x, z = letter_bits[letter.letter]
+            if x:
+                xs ^= bit
+            if z:
+                zs ^= bit
+        return cls(xs, zs, sign_exponent, index)
+
+    @property
+    def sign(self) -> complex:
+        return signs[self.sign_exponent]
+
+    @property
+    def is_identity(self) -> bool:
+        return self.xs == 0 and self.zs == 0 and self.sign_exponent == 0
+
+    @property
+    def is_hermitian(self) -> bool:
+        # Each Pauli is Hermitian, so the product is iff its sign is real.
+        return self.sign_exponent % 2 == 0
+
+    def multiply_by_pauli(self, pauli: Pauli):
+        """Multiplies this product on the right by a single Pauli, in
+        place. Much cheaper than multiplying by a whole product."""
+        bit = 1 << self.index.index(pauli.qubit)
+        current = bits_letters[(
+            1 if self.xs & bit else 0, 1 if self.zs & bit else 0)]
+        self.sign_exponent = (
+            self.sign_exponent +
+            phase_exponents[(current, pauli.letter.letter)] +
+            sign_exponents[pauli.letter.sign]) % 4
+        x, z = letter_bits[pauli.letter.letter]
+        if x:
+            self.xs ^= bit
+        if z:
+            self.zs ^= bit
+
+    def __mul__(self, other: SymplecticPauliProduct) -> SymplecticPauliProduct:
+        self._assert_same_index(other)
+        # Split each vector into which qubits hold an X, Y or Z, then count
+        # the qubits whose products pick up a factor of i or -i.
+        x1 = self.xs & ~self.zs
+        y1 = self.xs & self.zs
+        z1 = self.zs & ~self.xs
+        x2 = other.xs & ~other.zs
+        y2 = other.xs & other.zs
+        z2 = other.zs & ~other.xs
+        plus_i = (x1 & y2) | (y1 & z2) | (z1 & x2)
+        minus_i = (x1 & z2) | (y1 & x2) | (z1 & y2)
+        sign_exponent = \
+            self.sign_exponent + other.sign_exponent + \
+            popcount(plus_i) - popcount(minus_i)
+        return SymplecticPauliProduct(
+            self.xs ^ other.xs, self.zs ^ other.zs, sign_exponent, self.index)
+
+    def commutes_with(self, other: SymplecticPauliProduct) -> bool:
+        self._assert_same_index(other)
+        anticommuting = (self.xs & other.zs) ^ (self.zs & other.xs)
+        return popcount(anticommuting) % 2 == 0
+
+    def equal_up_to_sign(self, other: SymplecticPauliProduct) -> bool:
+        self._assert_same_index(other)
+        return self.xs == other.xs and self.zs == other.zs
+
+    def paulis(self) -> List[Pauli]:
+        """The Paulis making up this product, in the order their qubits
+        appear in the index. Every qubit in the index gets a Pauli, even if
+        it's the identity, and the product's sign is put on the first."""
+        xs, zs = self.xs, self.zs
+        paulis = []
+        for qubit in self.index.qubits:
+            letter = bits_letters[(xs & 1, zs & 1)]
+            sign = 1 if paulis else self.sign
+            paulis.append(Pauli(qubit, pauli_letters[(letter, sign)]))
+            xs >>= 1
+            zs >>= 1
+        return paulis
+
+    def to_pauli_product(self) -> PauliProduct:
+        return PauliProduct(self.paulis())
+
+    def _assert_same_index(self, other: SymplecticPauliProduct):
+        if self.index is not other.index:
+            raise ValueError(
+                "Can't combine symplectic Pauli products that use different "
+                "qubit indexes.")
+
+    def __eq__(self, other):
+        return \
+            type(other) == type(self) and \
+            self.index is other.index and \
+            self.xs == other.xs and \
+            self.zs == other.zs and \
+            self.sign_exponent == other.sign_exponent
+
+    def __hash__(self):
+        return hash((self.xs, self.zs, self.sign_exponent))
@@ -1,6 +1,6 @@
 from __future__ import annotations
 
-from typing import Dict, Any, List, Set, Union
+from typing import Dict, Any, Iterable, List, Set, Union, Callable
 from typing import TYPE_CHECKING
 
 from main.building_blocks.detectors.Drum import Drum
@@ -74,10 +74,17 @@ class Code:
         # schedules to be set later.
         self.final_check_schedule: List[List[Check]] = [[]]
         self.check_schedule: List[List[Check]] = [[]]
+        # If set, a function to call to create the detector schedule the
+        # first time it's needed.
+        self._create_detector_schedule: \
+            Callable[[], List[List[Drum]]] = None
         self.detector_schedule: List[List[Drum]] = [[]]
         self.schedule_length: int = 1
         self.checks: Set[Check] = set()
         self.detectors: Set[Drum] = set()
+        # Dense integer ids given to the checks, so that the Measurer can
+        # key things on these rather than on the checks themselves.
+        self._check_ids: Dict[Check, int] = {}
         if check_schedule is not None:
             self.set_schedules(check_schedule, detector_schedule)
 
@@ -88,7 +95,8 @@ class Code:
 
     def set_schedules(
             self, check_schedule: List[List[Check]],
-            detector_schedule: List[List[Drum]] = None):
+            detector_schedule: Union[
+                List[List[Drum]], Callable[[], List[List[Drum]]]] = None):
         """
         Set the code's check schedule and detector schedule.
         TODO - this design (calling this method later after partially
@@ -107,6 +115,11 @@ class Code:
                     If left as None, and `check_schedule` has length 1,
                 then we assume this is a stabilizer code and auto-build the
                 detectors.
+                    Can also be a function that creates the detector
+                schedule, in which case it's only called (and the detectors
+                it creates only validated) when the detector schedule or
+                set of detectors is first needed. Useful for big codes
+                whose detectors might never be used.
         """
         self._assert_check_schedule_valid(check_schedule)
 
@@ -117,6 +130,9 @@ class Code:
             check
             for round in check_schedule
             for check in round)
+        self._check_ids = {}
+        self._assign_check_ids(
+            check for round in check_schedule for check in round)
 
         if len(self.check_schedule) == 1 and detector_schedule is None:
             # Default case: stabilizer code! Each detector is made of one
@@ -130,6 +146,9 @@ class Code:
                     else None
                 drum = Drum([(-1, check)], [(0, check)], 0, anchor)
                 self.detector_schedule[0].append(drum)
+        elif callable(detector_schedule):
+            self._create_detector_schedule = detector_schedule
+            return
         else:
             # If the length of the schedule is more than 1, force the user to
             # manually define the detectors.
@@ -140,10 +159,56 @@ class Code:
             self.detector_schedule = detector_schedule
 
         # Also save all detectors in an unstructured set, for convenience.
-        self.detectors = set(
-            detector
-            for round in self.detector_schedule
-            for detector in round)
+        self.detectors = self._assign_detector_ids(self.detector_schedule)
+
+    def _assign_check_ids(self, checks: Iterable[Check]):
+        # Give each check a dense integer id, with equal checks getting the
+        # same one. Hashing the checks here also means their hashes are
+        # cached before they're used during compilation.
+        for check in checks:
+            check.check_id = self._check_ids.setdefault(
+                check, len(self._check_ids))
+
+    def _assign_detector_ids(
+            self, detector_schedule: List[List[Drum]]) -> Set[Drum]:
+        # Give each detector a dense integer id, and make sure all the
+        # checks they compare have ids too. Returns the set of detectors.
+        detector_ids = {}
+        for round in detector_schedule:
+            for detector in round:
+                if detector not in detector_ids:
+                    detector.detector_id = len(detector_ids)
+                    detector_ids[detector] = detector.detector_id
+                    self._assign_check_ids(
+                        check for _, check in detector.timed_checks)
+        return set(detector_ids)
+
+    @property
+    def detector_schedule(self) -> List[List[Drum]]:
+        if self._create_detector_schedule is not None:
+            self._create_detectors()
+        return self._detector_schedule
+
+    @detector_schedule.setter
+    def detector_schedule(self, detector_schedule: List[List[Drum]]):
+        self._create_detector_schedule = None
+        self._detector_schedule = detector_schedule
+
+    @property
+    def detectors(self) -> Set[Drum]:
+        if self._create_detector_schedule is not None:
+            self._create_detectors()
+        return self._detectors
+
+    @detectors.setter
+    def detectors(self, detectors: Set[Drum]):
+        self._detectors = detectors
+
+    def _create_detectors(self):
+        detector_schedule = self._create_detector_schedule()
+        self._assert_detector_schedule_valid(detector_schedule)
+        self.detector_schedule = detector_schedule
+        self.detectors = self._assign_detector_ids(detector_schedule)
 
     @property
     def dimension(self) -> int:
@@ -5,6 +5,7 @@ from main.building_blocks.Check import Check
 from main.building_blocks.detectors.Drum import Drum
 from main.building_blocks.pauli.Pauli import Pauli
 from main.building_blocks.pauli.PauliLetter import PauliLetter
+from main.building_blocks.Qubit import Qubit
 from main.codes.ToricHexagonalCode import ToricHexagonalCode
 from main.codes.tic_tac_toe.detectors.TicTacToeDrumBlueprint import TicTacToeDrumBlueprint
 from main.codes.tic_tac_toe.logical.TicTacToeLogicalQubit import TicTacToeLogicalQubit
@@ -41,17 +42,18 @@ class TicTacToeCode(ToricHexagonalCode):
         assert self.is_good_code(tic_tac_toe_route)
         self.tic_tac_toe_route = tic_tac_toe_route
         self.checks_by_type, self.borders = self.create_checks()
+        self.check_indices_by_qubit = self.index_checks_by_qubit(
+            self.checks_by_type)
         stabilizers, relearned = self.find_stabilized_plaquettes()
         self.detector_blueprints = self.plan_detectors(stabilizers, relearned)
-        schedule_length = len(self.tic_tac_toe_route)
-        detector_schedule = self.create_detectors(
-            self.detector_blueprints, schedule_length)
 
         check_schedule = [
             self.checks_by_type[(colour, pauli_letter)]
             for colour, pauli_letter in tic_tac_toe_route]
 
-        self.set_schedules(check_schedule, detector_schedule)
+        # Detectors are only created once they're first needed - e.g. gauge
+        # codes build an ungauged code but never use its detectors.
+        self.set_schedules(check_schedule, self.create_detector_schedule)
         self.logical_qubits = self.get_init_logical_qubits()
         self.final_check_schedule = None
 
@@ -101,6 +103,10 @@ class TicTacToeCode(ToricHexagonalCode):
         # repeated across all plaquettes, we will create exactly all the
         # checks in the code.
 
+        # The lattice is translation invariant, so the edges around every
+        # plaquette are just translations of those around one at the origin.
+        border_template = self.get_border_template()
+
         # Keep track of which checks form borders of which plaquettes.
         # This will be necessary when defining the detectors of the code
         # (the checks we want to multiply together to detect errors).
@@ -125,35 +131,73 @@ class TicTacToeCode(ToricHexagonalCode):
                 anchors = self.colourful_plaquette_anchors[plaquette_colour]
                 for anchor in anchors:
                     self.add_checks_around_plaquette(
-                        anchor, edge_colour, pauli_letters, checks, borders)
+                        anchor, edge_colour, pauli_letters, checks, borders,
+                        border_template)
 
         return checks, borders
 
-    def add_checks_around_plaquette(
-            self, anchor, edge_colour, pauli_letters, checks, borders):
-        """Add checks of one colour around the border of a single plaquette.
+    def get_border_template(self) -> List[Tuple[
+            Coordinates, Coordinates, Coordinates, Coordinates, Coordinates]]:
+        """For each of the three edges (u, v) that a plaquette anchored at
+        the origin is responsible for creating, returns the coordinates of
+        u, v and the edge's midpoint, plus the offsets of u and v from the
+        midpoint (which are the keys of the check's Paulis).
         """
-        corners = self.get_neighbour_coords(anchor)
+        origin = (0, 0)
+        corners = self.get_neighbour_coords(origin)
+        template = []
         for j in range(3):
             u, v = corners[2 * j], corners[2 * j + 1]
             midpoint = coords_mid(u, v)
+            template.append((
+                u, v, midpoint,
+                coords_minus(u, midpoint), coords_minus(v, midpoint)))
+        return template
+
+    @staticmethod
+    def index_checks_by_qubit(
+            checks_by_type: Dict[TicTacToeSquare, List[Check]]
+    ) -> Dict[TicTacToeSquare, Dict[Qubit, List[int]]]:
+        """For each type of check, maps each qubit to the positions in
+        checks_by_type of the checks of that type that act on it. This lets
+        us find the checks touching a given set of qubits (e.g. a logical
+        operator) without looking at every check of that type.
+        """
+        index = {}
+        for check_type, checks in checks_by_type.items():
+            by_qubit = defaultdict(list)
+            for i, check in enumerate(checks):
+                for pauli in check.paulis.values():
+                    by_qubit[pauli.qubit].append(i)
+            index[check_type] = dict(by_qubit)
+        return index
+
+    def add_checks_around_plaquette(
+            self, anchor, edge_colour, pauli_letters, checks, borders,
+            border_template):
+        """Add checks of one colour around the border of a single plaquette.
+        """
+        x, y = anchor
+        for u, v, midpoint, u_offset, v_offset in border_template:
             # The edge (u, v) is a colours[i+1]-check, shared
             # between this plaquette of colour colours[i] and a
             # neighbouring one of colour colours[i+2]. The
             # neighbouring plaquette has its anchor along the line
             # between this plaquette's anchor and mid(u,v).
-            diff = (midpoint[0] - anchor[0], midpoint[1] - anchor[1])
+            check_anchor = self.wrap_coords((x + midpoint[0], y + midpoint[1]))
             neighbour_anchor = self.wrap_coords(
-                (midpoint[0] + diff[0], midpoint[1] + diff[1]))
-            qubit_u = self.data_qubits[self.wrap_coords(u)]
-            qubit_v = self.data_qubits[self.wrap_coords(v)]
+                (x + 2 * midpoint[0], y + 2 * midpoint[1]))
+            qubit_u = self.data_qubits[self.wrap_coords((x + u[0], y + u[1]))]
+            qubit_v = self.data_qubits[self.wrap_coords((x + v[0], y + v[1]))]
 
             for letter in pauli_letters:
                 # Create the check object and note which plaquettes it borders
                 paulis = {
-                    (coords_minus(u, midpoint)): Pauli(qubit_u, letter),
-                    (coords_minus(v, midpoint)): Pauli(qubit_v, letter)}
-                check = Check(paulis, self.wrap_coords(midpoint), edge_colour)
+                    u_offset: Pauli(qubit_u, letter),
+                    v_offset: Pauli(qubit_v, letter)}
+                # We know these checks are valid, so skip validating them.
+                check = Check(
+                    paulis, check_anchor, edge_colour, validate=False)
                 checks[(edge_colour, letter)].append(check)
                 borders[anchor][(edge_colour, letter)].append(check)
                 borders[neighbour_anchor][(edge_colour, letter)].append(check)
@@ -361,6 +405,10 @@ class TicTacToeCode(ToricHexagonalCode):
 
         return detector_blueprints
 
+    def create_detector_schedule(self) -> List[List[Drum]]:
+        return self.create_detectors(
+            self.detector_blueprints, len(self.tic_tac_toe_route))
+
     def create_detectors(
             self,
             detector_blueprints: Dict[Colour, List[TicTacToeDrumBlueprint]],
@@ -386,7 +434,8 @@ class TicTacToeCode(ToricHexagonalCode):
                                 lid.extend((t, check) for check in checks)
                             drum_anchor = embed_coords(anchor, 3)
                             detector = Drum(
-                                floor, lid, blueprint.learned, drum_anchor)
+                                floor, lid, blueprint.learned, drum_anchor,
+                                validate=False)
                             detectors[blueprint.learned].append(detector)
         return detectors
 
@@ -1,5 +1,3 @@
-import json
-from pathlib import Path
 from typing import List, Literal, Tuple, Union
 
 from main.building_blocks.detectors.Drum import Drum
@@ -16,6 +14,11 @@ from main.building_blocks.pauli.PauliLetter import PauliLetter
 
 
 class GaugeFloquetColourCode(GaugeTicTacToeCode):
+    timelike_distance_data_files = {
+        'phenomenological_noise': 'fcc_graphlike_td_data_phenomenological.json',
+        'circuit_level_noise': 'fcc_graphlike_td_data_circuit_level_depolarizing.json',
+        'EM3': 'fcc_graphlike_td_data_EM3.json'}
+
     def __init__(self, distance: Union[int, List[int]], gauge_factors: List[int]):
         self.x_gf, self.z_gf = gauge_factors
         self.tic_tac_toe_route = self.create_tic_tac_toe_route()
@@ -179,7 +182,7 @@ class GaugeFloquetColourCode(GaugeTicTacToeCode):
     def get_number_of_rounds_for_timelike_distance(self,
                                                    desired_distance: int,
                                                    graphlike: bool = False,
-                                                   noise_model: str = "phenomenological") -> Tuple[int, int, int]:
+                                                   noise_model: str = "phenomenological_noise") -> Tuple[int, int, int]:
         """Get the minimal number of rounds needed to perform a stability experiment
 
         This method assumes a phenmenological noise model is used. The number of rounds
@@ -197,85 +200,20 @@ class GaugeFloquetColourCode(GaugeTicTacToeCode):
                 - The distance of the z-stability experiment with the given number of rounds
 
         """
-        n_rounds = len(self.tic_tac_toe_route)
+        n_rounds = self.get_minimum_rounds_for_timelike_distance(
+            desired_distance, ['X', 'Z'], noise_model)
         distance_x = self.get_timelike_distance(
             n_rounds, 'X', noise_model)
-
         distance_z = self.get_timelike_distance(
             n_rounds, 'Z', noise_model)
-
-        while min(distance_x, distance_z) < desired_distance:
-            n_rounds += 1
-            distance_x = self.get_timelike_distance(
-                n_rounds, 'X', noise_model)
-
-            distance_z = self.get_timelike_distance(
-                n_rounds, 'Z', noise_model)
-
         return n_rounds, distance_x, distance_z
 
-    def get_boundary_and_bulk_layers(self, n_rounds):
-        bulk_length = 6 * (self.gauge_factors[0] + self.gauge_factors[1])
-        bulk_layers = n_rounds//bulk_length
-        boundary_layers = n_rounds % bulk_length
-        return boundary_layers, bulk_layers - 1
+    def get_bulk_length(self) -> int:
+        return 6 * (self.gauge_factors[0] + self.gauge_factors[1])
 
-    def distance_from_timelike_distance_dict(self, n_rounds: int, pauli_letter: Literal['X', 'Z'], timelike_distance_dict: dict) -> int:
-        """ Returns the timelike distance of the code using precalculated data.
-
-        Args:
-            n_rounds (int): The number of measurement rounds.
-            pauli_letter (Literal['X', 'Z']): The type of stability experiment ('X' or 'Z').
-            timelike_distance_dict (dict): The precalculated data.
-
-        Returns:
-            int: The timelike distance of the code.
-        """
-        # the distance is calculated in two steps, the distance of the boundary layers
-        # and the distance of the bulk layers. This is done so that the distance for
-        # any number of rounds can be calculated, because the bulk layers are repeated.
-        boundary_layers, bulk_layers = self.get_boundary_and_bulk_layers(
-            n_rounds)
-        td_boundary = timelike_distance_dict[pauli_letter][
-            f"({self.gauge_factors[0]}, {self.gauge_factors[1]})"]['td_boundary'][str(boundary_layers)]
-        td_bulk = timelike_distance_dict[pauli_letter][f"({self.gauge_factors[0]}, {self.gauge_factors[1]})"
-                                                       ]['td_bulk'] * bulk_layers
-        return td_boundary + td_bulk
+    def get_timelike_distance_data_key(self) -> str:
+        return f"({self.gauge_factors[0]}, {self.gauge_factors[1]})"
 
     def get_number_of_rounds_for_single_timelike_distance(self, desired_distance: int, pauli_letter: Literal['X', 'Z'], graphlike=False, noise_model="phenomenological_noise") -> int:
-        n_rounds = len(self.tic_tac_toe_route)
-
-        distance_func = self.get_timelike_distance
-
-        distance = distance_func(n_rounds, pauli_letter, noise_model)
-
-        while distance < desired_distance:
-            n_rounds += 1
-            distance = distance_func(n_rounds, pauli_letter, noise_model)
-        return n_rounds
-
-    def get_timelike_distance(self, n_rounds: int, pauli_letter: Literal['X', 'Z'], noise_model) -> int:
-        """ Returns the distance of the code if one decodes using a matching decoder.
-
-        Args:
-            n_rounds (int): The number of measurement rounds.
-            pauli_letter (Literal['X', 'Z']): The type of stability experiment ('X' or 'Z').
-
-        Returns:
-            int: The timelike distance of the code.
-        """
-
-        if noise_model == "phenomenological_noise":
-            p = Path(__file__).parent / 'timelike_distance_data' / \
-                'fcc_graphlike_td_data_phenomenological.json'
-
-        elif noise_model == "circuit_level_noise":
-            p = Path(__file__).parent / 'timelike_distance_data' / \
-                'fcc_graphlike_td_data_circuit_level_depolarizing.json'
-
-        elif noise_model == "EM3":
-            p = Path(__file__).parent / 'timelike_distance_data' / \
-                'fcc_graphlike_td_data_EM3.json'
-        with p.open('r') as openfile:
-            timelike_distance_dict = json.load(openfile)
-        return (self.distance_from_timelike_distance_dict(n_rounds, pauli_letter, timelike_distance_dict))
+        return self.get_minimum_rounds_for_timelike_distance(
+            desired_distance, [pauli_letter], noise_model)
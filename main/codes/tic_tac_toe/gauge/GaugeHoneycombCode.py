@@ -1,6 +1,4 @@
-import json
 from typing import List, Literal, Tuple, Union
-from pathlib import Path
 
 from main.building_blocks.detectors.Drum import Drum
 from main.building_blocks.pauli import Pauli
@@ -15,6 +13,11 @@ from main.utils.Colour import Red, Green, Blue
 
 
 class GaugeHoneycombCode(GaugeTicTacToeCode):
+    timelike_distance_data_files = {
+        'phenomenological_noise': 'hcc_graphlike_td_data_phenomenological.json',
+        'circuit_level_noise': 'hcc_graphlike_td_data_circuit_level_depolarizing.json',
+        'EM3': 'hcc_graphlike_td_data_EM3.json'}
+
     def __init__(self, distance: Union[int, List[int]],
                  gauge_factors: List[int]):
         """A gauge-fixed honeycomb code.
@@ -126,69 +129,15 @@ class GaugeHoneycombCode(GaugeTicTacToeCode):
                              for qubit in self.data_qubits.values()]
         return (final_measurement)
 
-    def get_boundary_and_bulk_layers(self, n_rounds):
-        bulk_length = 4 * sum(self.gauge_factors)
-        bulk_layers = n_rounds//bulk_length
-        boundary_layers = n_rounds % bulk_length
-        return boundary_layers, bulk_layers - 1
-
-    def distance_from_timelike_distance_dict(self, n_rounds: int, pauli_letter: Literal['X', 'Z'], timelike_distance_dict: dict) -> int:
-        """ Returns the timelike distance of the code using precalculated data.
+    def get_bulk_length(self) -> int:
+        return 4 * sum(self.gauge_factors)
 
-        Args:
-            n_rounds (int): The number of measurement rounds.
-            pauli_letter (Literal['X', 'Z']): The type of stability experiment ('X' or 'Z').
-            timelike_distance_dict (dict): The precalculated data.
-
-        Returns:
-            int: The timelike distance of the code.
-        """
-        # the distance is calculated in two steps, the distance of the boundary layers
-        # and the distance of the bulk layers. This is done so that the distance for
-        # any number of rounds can be calculated, because the bulk layers are repeated.
-        boundary_layers, bulk_layers = self.get_boundary_and_bulk_layers(
-            n_rounds)
-        td_boundary = timelike_distance_dict[pauli_letter][
-            f"({self.gauge_factors[0]}, {self.gauge_factors[1]}, {self.gauge_factors[2]})"]['td_boundary'][str(boundary_layers)]
-        td_bulk = timelike_distance_dict[pauli_letter][f"({self.gauge_factors[0]}, {self.gauge_factors[1]}, {self.gauge_factors[2]})"
-                                                       ]['td_bulk'] * bulk_layers
-        return td_boundary + td_bulk
-
-    def get_timelike_distance(self, n_rounds: int, pauli_letter: Literal['X', 'Z'], noise_model) -> int:
-        """ Returns the distance of the code if one decodes using a matching decoder.
-
-        Args:
-            n_rounds (int): The number of measurement rounds.
-            pauli_letter (Literal['X', 'Z']): The type of stability experiment ('X' or 'Z').
-
-        Returns:
-            int: The timelike distance of the code.
-        """
-
-        if noise_model == "phenomenological_noise":
-            p = Path(__file__).parent / 'timelike_distance_data' / \
-                'hcc_graphlike_td_data_phenomenological.json'
-        elif noise_model == "circuit_level_noise":
-            p = Path(__file__).parent / 'timelike_distance_data' / \
-                'hcc_graphlike_td_data_circuit_level_depolarizing.json'
-        elif noise_model == "EM3":
-            p = Path(__file__).parent / 'timelike_distance_data' / \
-                'hcc_graphlike_td_data_EM3.json'
-        with p.open('r') as openfile:
-            timelike_distance_dict = json.load(openfile)
-        return (self.distance_from_timelike_distance_dict(n_rounds, pauli_letter, timelike_distance_dict))
+    def get_timelike_distance_data_key(self) -> str:
+        return f"({self.gauge_factors[0]}, {self.gauge_factors[1]}, {self.gauge_factors[2]})"
 
     def get_number_of_rounds_for_single_timelike_distance(self, desired_distance: int, pauli_letter: Literal['X', 'Z'], noise_model="phenomenological_noise") -> int:
-        n_rounds = len(self.tic_tac_toe_route)
-
-        distance = self.get_timelike_distance(
-            n_rounds, pauli_letter, noise_model)
-
-        while distance < desired_distance:
-            n_rounds += 1
-            distance = self.get_timelike_distance(
-                n_rounds, pauli_letter, noise_model)
-        return n_rounds
+        return self.get_minimum_rounds_for_timelike_distance(
+            desired_distance, [pauli_letter], noise_model)
 
     def get_number_of_rounds_for_timelike_distance(self, desired_distance: int, noise_model="phenomenological_noise") -> Tuple[int, int, int]:
         """Get the minimal number of rounds needed to perform a stability experiment 
@@ -208,18 +157,10 @@ class GaugeHoneycombCode(GaugeTicTacToeCode):
                 - The distance of the x-stability experiment with the given number of rounds
                 - The distance of the z-stability experiment with the given number of rounds
         """
-        n_rounds = len(self.tic_tac_toe_route)
-
+        n_rounds = self.get_minimum_rounds_for_timelike_distance(
+            desired_distance, ['X', 'Z'], noise_model)
         distance_x = self.get_timelike_distance(
             n_rounds, 'X', noise_model)
         distance_z = self.get_timelike_distance(
             n_rounds, 'Z', noise_model)
-
-        while min(distance_x, distance_z) < desired_distance:
-            n_rounds += 1
-            distance_x = self.get_timelike_distance(
-                n_rounds, 'X', noise_model)
-            distance_z = self.get_timelike_distance(
-                n_rounds, 'Z', noise_model)
-
         return n_rounds, distance_x, distance_z
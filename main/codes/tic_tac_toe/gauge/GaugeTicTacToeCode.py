@@ -1,5 +1,8 @@
+import json
 from abc import ABC, abstractmethod
-from typing import List, Tuple, Union
+from functools import lru_cache
+from pathlib import Path
+from typing import Dict, Iterable, List, Tuple, Union
 
 from main.building_blocks.detectors.Drum import Drum
 from main.codes.ToricHexagonalCode import ToricHexagonalCode
@@ -7,7 +10,22 @@ from main.codes.tic_tac_toe.TicTacToeCode import TicTacToeCode
 from typing import Literal
 
 
+@lru_cache(maxsize=None)
+def load_timelike_distance_data(filename: str) -> dict:
+    """Loads one of the files of precalculated timelike distances in the
+    timelike_distance_data folder. Each file is only read once per process,
+    so the returned dict is shared, and must not be modified.
+    """
+    path = Path(__file__).parent / 'timelike_distance_data' / filename
+    with path.open('r') as openfile:
+        return json.load(openfile)
+
+
 class GaugeTicTacToeCode(ABC, ToricHexagonalCode):
+    # The files of precalculated timelike distance data for this code, by
+    # noise model. To be filled in by subclasses.
+    timelike_distance_data_files: Dict[str, str] = {}
+
     def __init__(self, distance: Union[int, List[int]], gauge_factors: List[int]):
         # NOTE - haven't figured out a general way of repeating measurements
         # for any tic-tac-toe code. Have only done this for honeycomb code
@@ -51,24 +69,9 @@ class GaugeTicTacToeCode(ABC, ToricHexagonalCode):
                 check_schedule.append(
                     self.ungauged_code.check_schedule[gf_index])
 
-        # Create the small detectors
-        detector_schedule: List[List[Drum]] = [
-            [] for _ in range(self.schedule_length)]
-
-        for ungauged_round, checks in enumerate(self.ungauged_code.check_schedule):
-            for check in checks:
-                for g in range(gauge_factors[ungauged_round]-1):
-                    gauged_round = sum(gauge_factors[:ungauged_round]) + g + 1
-                    detector = Drum([(-1, check)], [(0, check)], gauged_round)
-                    detector_schedule[gauged_round].append(detector)
-
-        # Create the plaquette detectors
-        plaquette_detector_schedule = self.get_plaquette_detector_schedule()
-        for round, detectors in enumerate(plaquette_detector_schedule):
-            detector_schedule[round].extend(detectors)
-
-        # Put it all together
-        self.set_schedules(check_schedule, detector_schedule)
+        # Put it all together. Detectors are only created once they're
+        # first needed.
+        self.set_schedules(check_schedule, self.create_detector_schedule)
 
         # Tell the logical operators about the gauge factor.
         self.logical_qubits = self.ungauged_code.logical_qubits
@@ -83,6 +86,27 @@ class GaugeTicTacToeCode(ABC, ToricHexagonalCode):
 
         self.final_check_schedule = None
 
+    def create_detector_schedule(self) -> List[List[Drum]]:
+        # Create the small detectors
+        detector_schedule: List[List[Drum]] = [
+            [] for _ in range(self.schedule_length)]
+
+        for ungauged_round, checks in enumerate(self.ungauged_code.check_schedule):
+            for check in checks:
+                for g in range(self.gauge_factors[ungauged_round]-1):
+                    gauged_round = sum(self.gauge_factors[:ungauged_round]) + g + 1
+                    detector = Drum(
+                        [(-1, check)], [(0, check)], gauged_round,
+                        validate=False)
+                    detector_schedule[gauged_round].append(detector)
+
+        # Create the plaquette detectors
+        plaquette_detector_schedule = self.get_plaquette_detector_schedule()
+        for round, detectors in enumerate(plaquette_detector_schedule):
+            detector_schedule[round].extend(detectors)
+
+        return detector_schedule
+
     @abstractmethod
     def get_ungauged_code(self, distance: int) -> TicTacToeCode:
         pass
@@ -91,6 +115,125 @@ class GaugeTicTacToeCode(ABC, ToricHexagonalCode):
     def get_plaquette_detector_schedule(self) -> List[List[Drum]]:
         pass
 
+    @abstractmethod
+    def get_bulk_length(self) -> int:
+        """The number of rounds after which the timelike distance of a
+        stability experiment on this code grows by a fixed amount.
+        """
+        pass
+
+    @abstractmethod
+    def get_timelike_distance_data_key(self) -> str:
+        """The key under which this code's gauge factors are stored in the
+        timelike distance data files."""
+        pass
+
+    def get_boundary_and_bulk_layers(self, n_rounds: int) -> Tuple[int, int]:
+        bulk_length = self.get_bulk_length()
+        bulk_layers = n_rounds // bulk_length
+        boundary_layers = n_rounds % bulk_length
+        return boundary_layers, bulk_layers - 1
+
+    def load_timelike_distance_data(self, noise_model: str) -> dict:
+        if noise_model not in self.timelike_distance_data_files:
+            raise ValueError(
+                f"No timelike distance data for noise model {noise_model}. "
+                f"Available noise models are "
+                f"{list(self.timelike_distance_data_files)}.")
+        return load_timelike_distance_data(
+            self.timelike_distance_data_files[noise_model])
+
+    def distance_from_timelike_distance_dict(self, n_rounds: int, pauli_letter: Literal['X', 'Z'], timelike_distance_dict: dict) -> int:
+        """ Returns the timelike distance of the code using precalculated data.
+
+        Args:
+            n_rounds (int): The number of measurement rounds.
+            pauli_letter (Literal['X', 'Z']): The type of stability experiment ('X' or 'Z').
+            timelike_distance_dict (dict): The precalculated data.
+
+        Returns:
+            int: The timelike distance of the code.
+        """
+        # the distance is calculated in two steps, the distance of the boundary layers
+        # and the distance of the bulk layers. This is done so that the distance for
+        # any number of rounds can be calculated, because the bulk layers are repeated.
+        boundary_layers, bulk_layers = self.get_boundary_and_bulk_layers(
+            n_rounds)
+        data = timelike_distance_dict[pauli_letter][
+            self.get_timelike_distance_data_key()]
+        td_boundary = data['td_boundary'][str(boundary_layers)]
+        td_bulk = data['td_bulk'] * bulk_layers
+        return td_boundary + td_bulk
+
+    def get_timelike_distance(self, n_rounds: int, pauli_letter: Literal['X', 'Z'], noise_model) -> int:
+        """ Returns the distance of the code if one decodes using a matching decoder.
+
+        Args:
+            n_rounds (int): The number of measurement rounds.
+            pauli_letter (Literal['X', 'Z']): The type of stability experiment ('X' or 'Z').
+            noise_model (str): The noise model the distance data was calculated for.
+
+        Returns:
+            int: The timelike distance of the code.
+        """
+        timelike_distance_dict = self.load_timelike_distance_data(noise_model)
+        return self.distance_from_timelike_distance_dict(
+            n_rounds, pauli_letter, timelike_distance_dict)
+
+    def get_minimum_rounds_for_timelike_distance(
+            self, desired_distance: int, pauli_letters: Iterable[Literal['X', 'Z']], noise_model: str) -> int:
+        """Returns the minimum number of rounds (no fewer than the length of
+        the code's tic-tac-toe route) for which stability experiments for
+        all the given letters have at least the desired timelike distance.
+
+        Rather than trying each number of rounds in turn, this works out
+        the answer directly from the bulk/boundary decomposition of the
+        distance. Write the number of rounds as m * bulk_length + b, with
+        0 <= b < bulk_length. For fixed b, the distance is
+        td_boundary[b] + td_bulk * (m - 1), which never decreases as m
+        grows, so the smallest valid m for each b can be solved for. The
+        answer is then the smallest over all b.
+
+        Args:
+            desired_distance: The desired distance for the stability experiment.
+            pauli_letters: The types of stability experiment that must all reach this distance.
+            noise_model: The noise model the distance data was calculated for.
+
+        Returns:
+            int: The minimum number of rounds.
+        """
+        bulk_length = self.get_bulk_length()
+        min_rounds = len(self.tic_tac_toe_route)
+        timelike_distance_dict = self.load_timelike_distance_data(noise_model)
+        data = [
+            timelike_distance_dict[letter][self.get_timelike_distance_data_key()]
+            for letter in pauli_letters]
+
+        best = None
+        for boundary_layers in range(bulk_length):
+            # The fewest whole bulks such that we're at or above min_rounds.
+            layers = max(-((boundary_layers - min_rounds) // bulk_length), 0)
+            for letter_data in data:
+                td_boundary = letter_data['td_boundary'][str(boundary_layers)]
+                td_bulk = letter_data['td_bulk']
+                shortfall = desired_distance - td_boundary + td_bulk
+                if td_bulk > 0:
+                    layers = max(layers, -(-shortfall // td_bulk))
+                elif shortfall > 0:
+                    # Adding more bulk never helps.
+                    layers = None
+                    break
+            if layers is not None:
+                n_rounds = layers * bulk_length + boundary_layers
+                if best is None or n_rounds < best:
+                    best = n_rounds
+        if best is None:
+            raise ValueError(
+                f"No number of rounds gives a timelike distance of at least "
+                f"{desired_distance}, since the distance doesn't grow with "
+                f"the number of rounds.")
+        return best
+
     @abstractmethod
     def get_number_of_rounds_for_single_timelike_distance(self, desired_distance: int, pauli_letter: Literal['X', 'Z'], graphlike=False) -> int:
         pass
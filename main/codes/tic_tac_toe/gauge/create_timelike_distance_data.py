@@ -2,6 +2,9 @@
 
 import argparse
 import itertools
+import os
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from main.compiling.CompilationCache import CompilationCache
 from main.codes.tic_tac_toe.gauge.GaugeHoneycombCode import GaugeHoneycombCode
 from main.codes.tic_tac_toe.gauge.GaugeFloquetColourCode import GaugeFloquetColourCode
 from main.building_blocks.detectors.Stabilizer import Stabilizer
@@ -11,7 +14,7 @@ from main.compiling.noise.models import EM3, PhenomenologicalNoise
 from main.compiling.noise.models.standard_depolarizing_noise import StandardDepolarizingNoise
 from main.compiling.syndrome_extraction.extractors import NativePauliProductMeasurementsExtractor
 from main.compiling.syndrome_extraction.extractors.ancilla_per_check.mixed.CxCyCzExtractor import CxCyCzExtractor
-from typing import List, Literal
+from typing import Dict, List, Literal, Tuple
 import stim
 import json
 
@@ -22,7 +25,8 @@ def generate_circuit(gauge_factors: List[int],
                      observable_type: str = 'X',
                      noise_model_type: Literal['phenomenological',
                                                'circuit_level_noise', 'EM3', 'pure_Z'] = 'phenomenological',
-                     code_name: str = 'GaugeHoneycombCode'
+                     code_name: str = 'GaugeHoneycombCode',
+                     cache: CompilationCache = None
                      ) -> stim.Circuit:
     """Generates a quantum error correction circuit for the GaugeHoneycomb code.
 
@@ -30,10 +34,44 @@ def generate_circuit(gauge_factors: List[int],
         rounds (int): The number of rounds for the circuit.
         distance (int): The distance of the GaugeHoneycomb code.
         observable_type (str): The type of logical observable ('X' or 'Z'). Defaults to 'X'.
+        cache (CompilationCache): If given, circuits are looked up in (and
+            stored in) this cache rather than always being compiled.
 
     Returns:
         Any: The compiled stim circuit.
     """
+    return _compile_circuits(
+        gauge_factors, [rounds], distance, observable_type, noise_model_type,
+        code_name, cache)[rounds]
+
+
+def generate_circuits(gauge_factors: List[int],
+                      rounds: List[int],
+                      distance: int,
+                      observable_type: str = 'X',
+                      noise_model_type: Literal['phenomenological',
+                                                'circuit_level_noise', 'EM3', 'pure_Z'] = 'phenomenological',
+                      code_name: str = 'GaugeHoneycombCode',
+                      ) -> Dict[int, stim.Circuit]:
+    """Generates the same circuits as generate_circuit for several numbers
+    of rounds at once, compiling the rounds they have in common only once
+    (see Compiler.compile_to_stims).
+
+    Args are as for generate_circuit, except:
+        rounds (List[int]): The numbers of rounds to generate circuits for.
+
+    Returns:
+        The compiled stim circuit for each number of rounds.
+    """
+    return _compile_circuits(
+        gauge_factors, rounds, distance, observable_type, noise_model_type,
+        code_name, None)
+
+
+def _compile_circuits(gauge_factors, rounds, distance, observable_type,
+                      noise_model_type, code_name, cache):
+    # Only ever given a cache for a single number of rounds, which is
+    # compiled on its own.
     if code_name == 'GaugeHoneycombCode':
         code = GaugeHoneycombCode(distance, gauge_factors)
     elif code_name == 'GaugeFloquetColourCode':
@@ -48,15 +86,17 @@ def generate_circuit(gauge_factors: List[int],
             initial_stabilizers = [Stabilizer([(0, check)], 0)
                                    for check in code.check_schedule[code.gauge_factors[0]]]
 
-        final_measurements = code.get_possible_final_measurement(
-            code.logical_qubits[1].z, rounds)
+        final_measurements = {
+            r: code.get_possible_final_measurement(code.logical_qubits[1].z, r)
+            for r in rounds}
 
     elif observable_type == 'Z':
         logical_observables = [code.z_stability_operator]
         initial_stabilizers = [Stabilizer([(0, check)], 0)
                                for check in code.check_schedule[0]]
-        final_measurements = code.get_possible_final_measurement(
-            code.logical_qubits[1].x, rounds)
+        final_measurements = {
+            r: code.get_possible_final_measurement(code.logical_qubits[1].x, r)
+            for r in rounds}
 
     if noise_model_type == 'phenomenological':
         noise_model = PhenomenologicalNoise(
@@ -78,14 +118,23 @@ def generate_circuit(gauge_factors: List[int],
             syndrome_extractor=CxCyCzExtractor()
         )
 
-    stim_circuit = compiler.compile_to_stim(
+    if cache is not None or len(rounds) == 1:
+        rounds, = rounds
+        return {rounds: compiler.compile_to_stim(
+            code=code,
+            total_rounds=rounds,
+            initial_stabilizers=initial_stabilizers,
+            observables=logical_observables,
+            final_measurements=final_measurements[rounds],
+            cache=cache
+        )}
+    return compiler.compile_to_stims(
         code=code,
         total_rounds=rounds,
         initial_stabilizers=initial_stabilizers,
         observables=logical_observables,
-        final_measurements=final_measurements
+        final_measurements=final_measurements,
     )
-    return stim_circuit
 
 
 def get_graphlike_distance(circuit: stim.Circuit) -> int:
@@ -94,31 +143,61 @@ def get_graphlike_distance(circuit: stim.Circuit) -> int:
 
 
 def get_td_bulk_and_boundary(noise_model, gauge_factors, bulk_length, letter: Literal['X', 'Z'], graphlike, code_name) -> int:
-    td_boundary = dict()
     print(noise_model, 'noise model')
-    for i in range(bulk_length):
+    distances = get_distances(
+        gauge_factors, timelike_distance_rounds(bulk_length), letter,
+        noise_model, graphlike, code_name)
+    return td_bulk_and_boundary(distances, bulk_length)
 
-        circ_1 = generate_circuit(
-            gauge_factors, bulk_length+i, 4, letter, noise_model, code_name)
 
-        circ_2 = generate_circuit(
-            gauge_factors, 2*bulk_length+i, 4, letter, noise_model, code_name)
+def timelike_distance_rounds(bulk_length: int) -> List[int]:
+    """The numbers of rounds for which a circuit's distance is needed to
+    find the timelike distance in the bulk and at the boundary.
+    """
+    return [bulk_length + i for i in range(bulk_length)] + [2*bulk_length]
 
-        if graphlike == True:
 
-            d_1 = get_graphlike_distance(circ_1)
-            print(d_1, 'd_1', bulk_length+i)
+def td_bulk_and_boundary(distances: Dict[int, int], bulk_length: int):
+    """Works out the timelike distance in the bulk and at the boundary from
+    the distances of circuits with different numbers of rounds.
 
-            d_2 = get_graphlike_distance(circ_2)
-        else:
-            d_1 = get_hyper_edge_distance(circ_1)
-            d_2 = get_hyper_edge_distance(circ_2)
+    Args:
+        distances: the distance of the circuit, keyed by its number of
+            rounds. Should contain every value in
+            timelike_distance_rounds(bulk_length).
+        bulk_length: the number of rounds after which the timelike
+            distance increases by td_bulk.
+    """
+    td_bulk = distances[2*bulk_length] - distances[bulk_length]
+    td_boundary = {i: distances[bulk_length + i] for i in range(bulk_length)}
+    return (td_bulk, td_boundary)
 
-        if i == 0:
-            td_bulk = d_2 - d_1
-        td_boundary[i] = d_1
 
-    return (td_bulk, td_boundary)
+def get_distance(gauge_factors, rounds, letter, noise_model, graphlike, code_name, cache_dir=None) -> int:
+    cache = None if cache_dir is None else CompilationCache(cache_dir)
+    circuit = generate_circuit(
+        gauge_factors, rounds, 4, letter, noise_model, code_name, cache)
+    return get_circuit_distance(circuit, rounds, graphlike)
+
+
+def get_distances(gauge_factors, rounds, letter, noise_model, graphlike, code_name) -> Dict[int, int]:
+    """As get_distance, but for several numbers of rounds at once, compiling
+    every circuit in a single pass (see generate_circuits).
+    """
+    circuits = generate_circuits(
+        gauge_factors, rounds, 4, letter, noise_model, code_name)
+    return {
+        rounds: get_circuit_distance(circuit, rounds, graphlike)
+        for rounds, circuit in circuits.items()}
+
+
+def get_circuit_distance(circuit: stim.Circuit, rounds, graphlike) -> int:
+    if graphlike == True:
+        distance = get_graphlike_distance(circuit)
+        print(distance, 'distance', rounds)
+    else:
+        distance = get_hyper_edge_distance(circuit)
+    return distance
 
 
 def get_hyper_edge_distance(circuit: stim.Circuit) -> int:
@@ -132,28 +211,109 @@ def get_hyper_edge_distance(circuit: stim.Circuit) -> int:
     return len(logical_errors)
 
 
-def generate_data(noise_model, code, graphlike=True):
+def get_bulk_length(code, gauge_factors) -> int:
+    if code == "GaugeFloquetColourCode":
+        return 6*(gauge_factors[0] + gauge_factors[1])
+    elif code == "GaugeHoneycombCode":
+        return 4 * (gauge_factors[0] + gauge_factors[1] + gauge_factors[2])
+
+
+def get_gauge_factor_combinations(code) -> List[Tuple[int, ...]]:
+    if code == 'GaugeHoneycombCode':
+        return list(itertools.product([1, 2, 3], repeat=3))
+    elif code == 'GaugeFloquetColourCode':
+        return list(itertools.product([1, 2, 3], repeat=2))
+
+
+def checkpoint_key(gauge_factors, letter, rounds) -> str:
+    return f"{letter} {gauge_factors} {rounds}"
+
+
+def load_checkpoint(checkpoint_path) -> Dict[str, int]:
+    if checkpoint_path is None or not os.path.exists(checkpoint_path):
+        return dict()
+    with open(checkpoint_path) as file:
+        return json.load(file)
+
+
+def save_checkpoint(checkpoint_path, distances: Dict[str, int]):
+    # Write to a temporary file first so that an interrupted write can't
+    # corrupt the checkpoint.
+    temporary_path = f"{checkpoint_path}.tmp"
+    with open(temporary_path, "w") as file:
+        json.dump(distances, file, indent=4)
+    os.replace(temporary_path, checkpoint_path)
+
+
+def generate_data(noise_model, code, graphlike=True, workers=1, checkpoint_path=None, cache_dir=None):
+    """Generates timelike distance data for every combination of gauge
+    factors and logical letter.
+
+    Every circuit distance needed is an independent job; these are run in
+    a pool of worker processes. Each distance found is saved to the
+    checkpoint file (if given) straight away, and any distances already in
+    it aren't recomputed, so an interrupted run can carry on where it left
+    off.
+
+    Args:
+        noise_model: the name of the noise model - see generate_circuit.
+        code: the name of the code - see generate_circuit.
+        graphlike: whether to find graphlike distances, or distances
+            allowing hyperedges.
+        workers: number of processes to compute distances in.
+        checkpoint_path: JSON file in which to save distances as they're
+            found.
+        cache_dir: if given, compiled circuits are cached in this directory.
+
+    Returns:
+        A dict of timelike distance data, keyed first by letter then by
+        gauge factors.
+    """
+    gauge_factor_combinations = get_gauge_factor_combinations(code)
+    jobs = [
+        (gauge_factors, letter, rounds)
+        for gauge_factors in gauge_factor_combinations
+        for letter in ["X", "Z"]
+        for rounds in timelike_distance_rounds(
+            get_bulk_length(code, gauge_factors))]
+
+    distances = load_checkpoint(checkpoint_path)
+    remaining = [
+        job for job in jobs if checkpoint_key(*job) not in distances]
+    # Biggest circuits first, so that the slowest jobs don't hold up the
+    # end of the run.
+    remaining.sort(key=lambda job: job[2], reverse=True)
+
+    def record(job, distance):
+        distances[checkpoint_key(*job)] = distance
+        if checkpoint_path is not None:
+            save_checkpoint(checkpoint_path, distances)
+
+    if workers == 1:
+        for gauge_factors, letter, rounds in remaining:
+            record((gauge_factors, letter, rounds), get_distance(
+                gauge_factors, rounds, letter, noise_model, graphlike,
+                code, cache_dir))
+    else:
+        with ProcessPoolExecutor(workers) as executor:
+            futures = {
+                executor.submit(
+                    get_distance, gauge_factors, rounds, letter, noise_model,
+                    graphlike, code, cache_dir): (gauge_factors, letter, rounds)
+                for gauge_factors, letter, rounds in remaining}
+            for future in as_completed(futures):
+                record(futures[future], future.result())
+
     timelike_distance_dict = dict()
     timelike_distance_dict["X"] = dict()
     timelike_distance_dict["Z"] = dict()
-    if code == 'GaugeHoneycombCode':
-        gauge_factor_combinations = itertools.product([1, 2, 3], repeat=3)
-    elif code == 'GaugeFloquetColourCode':
-        gauge_factor_combinations = itertools.product([1, 2, 3], repeat=2)
     for gauge_factors in gauge_factor_combinations:
         for letter in ["X", "Z"]:
-            if code == "GaugeFloquetColourCode":
-
-                bulk_length = 6*(gauge_factors[0] + gauge_factors[1])
-            elif code == "GaugeHoneycombCode":
-                bulk_length = 4 * \
-                    (gauge_factors[0] + gauge_factors[1] + gauge_factors[2])
-            td_bulk, td_boundary = get_td_bulk_and_boundary(noise_model,
-                                                            gauge_factors,
-                                                            bulk_length,
-                                                            letter,
-                                                            graphlike,
-                                                            code)
+            bulk_length = get_bulk_length(code, gauge_factors)
+            td_bulk, td_boundary = td_bulk_and_boundary(
+                {rounds: distances[checkpoint_key(gauge_factors, letter, rounds)]
+                 for rounds in timelike_distance_rounds(bulk_length)},
+                bulk_length)
 
             timelike_distance_dict[letter][str(gauge_factors)] = dict()
             timelike_distance_dict[letter][str(
@@ -163,13 +323,15 @@ def generate_data(noise_model, code, graphlike=True):
     return (timelike_distance_dict)
 
 
-def main(code, noise_model, graphlike):
-
+def main(code, noise_model, graphlike, workers=1, cache_dir=None):
+    file_prefix = "fcc" if code == "GaugeFloquetColourCode" else "hcc"
+    output_path = f"./new_timelike_distance_data/{file_prefix}_{'graphlike' if graphlike else 'non_graphlike'}_td_data_{noise_model}.json"
+    os.makedirs(os.path.dirname(output_path), exist_ok=True)
     timelike_distance_dict = generate_data(
-        noise_model, code, graphlike)
+        noise_model, code, graphlike, workers,
+        checkpoint_path=f"{output_path}.checkpoint", cache_dir=cache_dir)
     json_object = json.dumps(timelike_distance_dict, indent=4)
-    file_prefix = "fcc" if code == "GaugeFloquetColourCode" else "hcc"
-    with open(f"./new_timelike_distance_data/{file_prefix}_{'graphlike' if graphlike else 'non_graphlike'}_td_data_{noise_model}.json", "w") as outfile:
+    with open(output_path, "w") as outfile:
         outfile.write(json_object)
 
 
@@ -178,9 +340,13 @@ if __name__ == "__main__":
     parser.add_argument('--code', type=str, required=True)
     parser.add_argument('--noise_model', type=str, required=True)
     parser.add_argument('--graphlike', type=int, required=True)
+    parser.add_argument('--workers', type=int, default=os.cpu_count())
+    parser.add_argument('--cache_dir', type=str, default=None)
     args = parser.parse_args()
     main(
         args.code,
         args.noise_model,
-        bool(args.graphlike)
+        bool(args.graphlike),
+        args.workers,
+        args.cache_dir
     )
@@ -1,6 +1,7 @@
 from __future__ import annotations
 
-from typing import List, TYPE_CHECKING
+import math
+from typing import Dict, List, Tuple, TYPE_CHECKING, Union
 
 from main.building_blocks.Check import Check
 from main.building_blocks.logical.LogicalOperator import LogicalOperator
@@ -21,9 +22,18 @@ class TicTacToeLogicalOperator(LogicalOperator):
             gauge_factors: List[int] = 1):
         """
         A logical operator specifically for a TicTacToeCode. Here the
-        logical operator may move around without repeating, so we won't
-        generate its constituent Paulis at every round upfront. Instead,
-        we'll build a dict of its values at different rounds as we go.
+        logical operator may move around for a while before repeating, so
+        we won't generate its constituent Paulis at every round upfront.
+        Instead, we'll build a dict of its values at different rounds as we
+        go, along with the checks multiplied into it at each round.
+
+        How the operator changes at each round depends only on its current
+        Paulis and the round's position in the code's schedule. So as soon
+        as it has the same Paulis at the same position in the schedule as
+        at some earlier round, it must be periodic from then on. Once this
+        happens we stop storing new rounds, and instead look up later
+        rounds modulo the period - so memory use stays flat however many
+        rounds are asked about.
 
         Args:
             initial_paulis:
@@ -56,17 +66,51 @@ class TicTacToeLogicalOperator(LogicalOperator):
         # tic-tac-toe code to have a gauge factor > 1 (only specific
         # examples of HCC and FCC), we do things the hacky way.
         self._at_round = {-1: initial_paulis}
+        self._checks_at_round: Dict[int, List[Check]] = {}
         self.last_updated = -1
+        # Once the operator is found to be periodic, rounds from
+        # period_start onwards repeat every `period` rounds.
+        self.period_start: Union[int, None] = None
+        self.period: Union[int, None] = None
+        # Rounds seen so far, by schedule position and Paulis, for finding
+        # the period. No longer needed once it's found.
+        self._seen: Union[Dict[Tuple[int, Tuple[Pauli, ...]], int], None] = None
         super().__init__([])
 
     def at_round(self, round: int):
+        round = self.reduce_round(round)
         if round not in self._at_round:
             # If there's nothing stored yet for this round, figure out what
-            # the logical at this point should be.
-            for r in range(self.last_updated + 1, round + 1):
-                self.update(r)
+            # the logical at this point should be. Stop early if we find
+            # the period on the way, since then this round is equivalent to
+            # one we've already stored.
+            while self.last_updated < round and self.period is None:
+                self.update(self.last_updated + 1)
+            round = self.reduce_round(round)
         return self._at_round[round]
 
+    def reduce_round(self, round: int) -> int:
+        """Maps a round to the earliest round known to be equivalent to it.
+        Before the period has been found, this is just the round itself.
+        Both the operator's Paulis and the checks multiplied in are the
+        same at equivalent rounds."""
+        if self.period is not None and round > self.period_start + self.period:
+            round = self.period_start + 1 + \
+                (round - self.period_start - 1) % self.period
+        return round
+
+    def schedule_position(self, round: int) -> int:
+        """How the operator changes at a given round depends only on the
+        round's position in the schedule, which this returns. Positions
+        repeat after every complete gauged schedule in which the ungauged
+        round has also cycled back round the tic-tac-toe route (and back
+        to the same parity, since the logical qubit alternates between
+        rows and columns)."""
+        code = self.logical_qubit.code
+        period = sum(self.gauge_factors) * math.lcm(
+            len(code.tic_tac_toe_route), code.schedule_length, 2)
+        return round % period
+
     def round_to_ungauged_round(self, round: int):
         """ Converts a round to an ungauged round.
 
@@ -104,6 +148,12 @@ class TicTacToeLogicalOperator(LogicalOperator):
             checks_multiplied_in:
                 Checks with which the logical operator has been multiplied.
         """
+        # Make sure we know the operator at all earlier rounds first.
+        self.at_round(round - 1)
+        reduced_round = self.reduce_round(round)
+        if reduced_round in self._checks_at_round:
+            return self._checks_at_round[reduced_round]
+
         # Again, hacky way to include the gauge factor stuff.
         ungauged_round = self.round_to_ungauged_round(round)
         prev_ungauged_round = self.round_to_ungauged_round(round - 1)
@@ -123,19 +173,28 @@ class TicTacToeLogicalOperator(LogicalOperator):
             # Nothing to be done! All stays the same.
             self._at_round[round] = self.at_round(round-1)
             checks_multiplied_in = []
+        self._checks_at_round[round] = checks_multiplied_in
+        self.last_updated = max(self.last_updated, round)
+        self._look_for_period(round)
 
         return checks_multiplied_in
 
-    def multiply_by_checks(self, round: int):
-        # Again, hacky way to include the gauge factor stuff.
-        ungauged_round = self.round_to_ungauged_round(round)
+    def _look_for_period(self, round: int):
+        if self.period is not None:
+            return
+        if self._seen is None:
+            initial_paulis = tuple(self._at_round[-1])
+            self._seen = {(self.schedule_position(-1), initial_paulis): -1}
+        key = (self.schedule_position(round), tuple(self._at_round[round]))
+        if key in self._seen:
+            self.period_start = self._seen[key]
+            self.period = round - self.period_start
+            self._seen = None
+        else:
+            self._seen[key] = round
 
-        relative_round = ungauged_round % self.logical_qubit.code.schedule_length
-        check_type = self.logical_qubit.code.tic_tac_toe_route[relative_round]
-        checks = self.logical_qubit.code.checks_by_type[check_type]
-        intersecting_checks = [
-            check for check in checks
-            if self.intersects(check, round)]
+    def multiply_by_checks(self, round: int):
+        intersecting_checks = self.intersecting_checks(round)
         # Slightly different depending on whether operator is vertical or
         # horizontal - horizontal operators are multiplied by ALL
         # intersecting checks, whereas vertical ones are only multiplied by
@@ -153,10 +212,33 @@ class TicTacToeLogicalOperator(LogicalOperator):
             intersecting_paulis + self.at_round(round - 1),
             identities_removed=True)
         self._at_round[round] = new_paulis
-        self.last_updated = round
 
         return intersecting_checks
 
+    def intersecting_checks(self, round: int) -> List[Check]:
+        """Returns the checks measured at the given round that intersect
+        the operator as it was just before that round."""
+        # Again, hacky way to include the gauge factor stuff.
+        ungauged_round = self.round_to_ungauged_round(round)
+
+        code = self.logical_qubit.code
+        relative_round = ungauged_round % code.schedule_length
+        check_type = code.tic_tac_toe_route[relative_round]
+        checks = code.checks_by_type[check_type]
+        # Rather than asking every check of this type whether it intersects
+        # the operator, just look up the checks on the operator's support.
+        # It's possible for the Paulis that make up the operator to contain
+        # an identity Pauli with some sign - only consider checks that
+        # touch the operator at a non-identity Pauli to be intersecting.
+        # Keep the checks in their original order.
+        check_indices = code.check_indices_by_qubit[check_type]
+        intersecting_indices = {
+            i
+            for pauli in self.at_round(round - 1)
+            if pauli.letter.letter != 'I'
+            for i in check_indices.get(pauli.qubit, [])}
+        return [checks[i] for i in sorted(intersecting_indices)]
+
     def intersects(self, check: Check, round: int):
         # It's possible for the Paulis that make up the operator to
         # contain an identity Pauli with some sign - only consider checks
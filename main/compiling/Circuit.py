@@ -1,5 +1,11 @@
+from __future__ import annotations
+
+import copy
+import gzip
+from bisect import bisect_left
 from collections import defaultdict
-from typing import List, Dict, Tuple, Any, Iterable, Union
+from pathlib import Path
+from typing import List, Dict, Set, Tuple, Any, Iterable, Iterator, Union, TextIO, TYPE_CHECKING
 
 import stim
 import stimcirq
@@ -8,9 +14,13 @@ from alive_progress import alive_bar
 from main.building_blocks.Check import Check
 from main.building_blocks.Qubit import Qubit
 from main.compiling.Instruction import Instruction
+from main.compiling.InstructionTable import InstructionTable
 from main.compiling.Measurer import Measurer
 from main.compiling.noise.noises import OneQubitNoise
 from main.utils.types import Tick
+from main.utils.utils import stim_circuit_to_text
+if TYPE_CHECKING:
+    from main.compiling.RoundTemplate import RoundTemplate
 
 RepeatBlock = Union[Tuple[int, int, int], None]
 
@@ -33,17 +43,21 @@ class Circuit(object):
         e.g. noise arising because a single qubit gate was just performed,
         plus noise arising because we're about to perform a measurement.
         """
-        # The core of this class is a nested dictionary of instructions,
-        # keyed first by tick, then by qubit. Values are then lists of
-        # instructions acting on that qubit at that tick.
-        self.instructions: Dict[Tick, Dict[Qubit, List[Instruction]]] = defaultdict(
-            lambda: defaultdict(list)
-        )
+        # The core of this class is a table of instructions, stored in
+        # columns rather than as Instruction objects, to save memory. Looked
+        # up by tick, it gives a dictionary from each qubit to the list of
+        # instructions acting on it at that tick.
+        self.instructions = InstructionTable()
         # Maintain a set of all the qubits we've come across - used when
         # adding idle noise later.
         self.qubits = set()
         # Each qubit will ultimately be assigned an integer index in stim.
         self._qubit_indexes = {}
+        # Qubit indexes never change once assigned, so nor do the stim
+        # targets for measuring a check as a Pauli product. Remember them,
+        # keyed by the check's id (checks are slow to hash).
+        self._product_measurement_targets: \
+            Dict[int, Tuple[Check, List[stim.GateTarget]]] = {}
         # Track at which ticks qubits were initialised and measured, so we
         # say whether a qubit is currently initialised or not.
         self.init_ticks: Dict[Qubit, List[Tick]] = defaultdict(list)
@@ -53,6 +67,10 @@ class Circuit(object):
         self.repeat_blocks: Dict[int, RepeatBlock] = defaultdict(lambda: None)
         # Track which measurements tell us the value of which checks
         self.measurer = Measurer()
+        # Rounds of syndrome extraction recorded while compiling this
+        # circuit, keyed by relative round, so that later rounds can be
+        # stamped out as copies - see Compiler.extract_checks.
+        self.round_templates: Dict[int, RoundTemplate] = {}
         # Annoying extra hoops to jump through to get the targets for
         # Pauli product measurements.
         self.pauli_targeters = {
@@ -60,6 +78,33 @@ class Circuit(object):
             'Y': stim.target_y,
             'Z': stim.target_z}
 
+    def copy(self) -> Circuit:
+        """Copies this circuit, e.g. to take a snapshot of it part way
+        through compilation, which can then be finished off in different
+        ways (see Compiler.compile_to_circuits). The copy shares its
+        measurement Instructions with this circuit, but has its own Measurer, and
+        adding to (or compiling) one circuit leaves the other untouched.
+
+        Returns:
+            The copy.
+        """
+        copied = copy.copy(self)
+        copied.instructions = self.instructions.copy()
+        copied.qubits = set(self.qubits)
+        copied._qubit_indexes = dict(self._qubit_indexes)
+        copied._product_measurement_targets = \
+            dict(self._product_measurement_targets)
+        copied.init_ticks = defaultdict(list, {
+            qubit: list(ticks) for qubit, ticks in self.init_ticks.items()})
+        copied.measure_ticks = defaultdict(list, {
+            qubit: list(ticks) for qubit, ticks in self.measure_ticks.items()})
+        copied.shift_ticks = list(self.shift_ticks)
+        copied.repeat_blocks = defaultdict(
+            lambda: None, self.repeat_blocks)
+        copied.measurer = self.measurer.copy()
+        copied.round_templates = dict(self.round_templates)
+        return copied
+
     def to_cirq_string(self,
                        idling_noise: Union[OneQubitNoise, None] = None,
                        resonator_idling_noise: Union[OneQubitNoise, None] = None) -> str:
@@ -86,13 +131,16 @@ class Circuit(object):
         """
         if isinstance(instruction_names, str):
             instruction_names = [instruction_names]
-        occurrences = 0
-        for instructions_at_tick in self.instructions.values():
-            for instructions_on_qubit_at_tick in instructions_at_tick.values():
-                for instruction in instructions_on_qubit_at_tick:
-                    if instruction.name in instruction_names:
-                        occurrences += 1
-        return occurrences
+        table = self.instructions
+        opcodes = {
+            opcode for opcode, (name, _, _) in enumerate(table.opcode_keys)
+            if name in instruction_names}
+        starts = table.qubit_starts
+        # An instruction occurs once for every qubit it acts on.
+        return sum(
+            starts[index + 1] - starts[index]
+            for index in table.indices()
+            if table.opcodes[index] in opcodes)
 
     def qubit_index(self, qubit: Qubit) -> int:
         """Get the stim index corresponding to this qubit, or create one if it doesn't yet have one.
@@ -120,12 +168,61 @@ class Circuit(object):
         Returns:
             True if the qubit is initialised and false if not.
         """
-        inits = [t for t in sorted(self.init_ticks[qubit]) if t <= tick]
-        measures = [t for t in sorted(self.measure_ticks[qubit]) if t <= tick]
-        inits_max = inits[-1] if len(inits) > 0 else -1
-        measures_max = measures[-1] if len(measures) > 0 else -1
+        inits_max = max(
+            (t for t in self.init_ticks[qubit] if t <= tick), default=-1)
+        measures_max = max(
+            (t for t in self.measure_ticks[qubit] if t <= tick), default=-1)
         return inits_max > measures_max
 
+    def initialised_qubits_by_tick(
+            self, ticks: Iterable[Tick]) -> Iterator[Tuple[Tick, Set[Qubit]]]:
+        """For each of the given ticks, find the qubits that have been
+        initialised but not yet measured out. This agrees with
+        is_initialised, but finds the answer for all ticks in one sweep
+        through the circuit, rather than searching every qubit's history
+        at every tick.
+
+        Args:
+            ticks: Ticks at which to find the initialised qubits.
+
+        Yields:
+            Pairs (tick, qubits) in increasing tick order, where qubits is
+            the set of qubits initialised at that tick.
+        """
+        qubits = self.instructions.qubits
+        for tick, qubit_ids in self._initialised_qubit_ids_by_tick(ticks):
+            yield tick, {qubits[qubit_id] for qubit_id in qubit_ids}
+
+    def _initialised_qubit_ids_by_tick(
+            self, ticks: Iterable[Tick]) -> Iterator[Tuple[Tick, Set[int]]]:
+        # As initialised_qubits_by_tick, but gives the qubits' ids in the
+        # instruction table. The same set is updated in place as the sweep
+        # continues, so shouldn't be modified.
+        # An initialisation and a measurement at the same tick leave a
+        # qubit measured out, so order measurements after initialisations.
+        qubit_id = self.instructions.qubit_id
+        events = [
+            (tick, False, qubit_id(qubit))
+            for qubit, inits in self.init_ticks.items()
+            for tick in inits]
+        events.extend(
+            (tick, True, qubit_id(qubit))
+            for qubit, measures in self.measure_ticks.items()
+            for tick in measures)
+        events.sort(key=lambda event: event[:2])
+
+        initialised = set()
+        i = 0
+        for tick in sorted(ticks):
+            while i < len(events) and events[i][0] <= tick:
+                _, is_measurement, qubit_id = events[i]
+                if is_measurement:
+                    initialised.discard(qubit_id)
+                else:
+                    initialised.add(qubit_id)
+                i += 1
+            yield tick, initialised
+
     def initialise(self, tick: Tick, instruction: Instruction):
         """Initialise a qubit at a specific tick
 
@@ -182,7 +279,8 @@ class Circuit(object):
         # compiling detectors later.
         self.measurer.add_measurement(measurement, check, round)
 
-    def add_instruction(self, tick: int, instruction: Instruction):
+    def add_instruction(
+            self, tick: int, instruction: Instruction, validate: bool = True):
         """Adds an instruction to the Circuit
 
         Args:
@@ -190,6 +288,11 @@ class Circuit(object):
                 Tick at which the instruction should be added.
             instruction:
                 Instruction to be added to the circuit.
+            validate:
+                Whether to check that the instruction can be placed at this
+                tick. Only safe to turn off if this is already known - e.g.
+                when copying instructions that were checked when first
+                added. Defaults to True.
 
         Raises:
             ValueError:
@@ -203,6 +306,11 @@ class Circuit(object):
             initializing use Circuit.initialize.
         """
         # TODO - if instruction starts with 'R' or 'M', raise an error?
+        if not validate:
+            self.instructions.add(tick, instruction)
+            self.qubits.update(instruction.qubits)
+            return
+
         # Even ticks are for gates, odd ticks are for noise.
         if instruction.is_noise and tick % 2 == 0:
             raise ValueError(
@@ -215,30 +323,21 @@ class Circuit(object):
                 f"This really shouldn't have happened; it's probably a bug. "
                 f"Tried to place instruction {instruction} at tick {tick}")
 
-        for qubit in instruction.qubits:
-            instructions_on_qubit_at_tick = self.instructions[tick][qubit]
-            if len(instructions_on_qubit_at_tick) > 0:
-                # Only time a qubit can have multiple gates at the same tick
-                # is when they're all noise gates or all Pauli product
-                # measurements - check this isn't violated.
-                instructions = instructions_on_qubit_at_tick + [instruction]
-                all_noise = all([
-                    instruction.is_noise for instruction in instructions])
-                all_product_measurements = all([
-                    instruction.name == "MPP" for instruction in instructions])
-                if not (all_noise or all_product_measurements):
-                    # Can't add this instruction to the circuit!
-                    instructions_string = "\n".join([
-                        str(instruction) for instruction in instructions])
-                    raise ValueError(
-                        f"Tried to compile conflicting instructions on qubit "
-                        f"{qubit} at tick {tick}! "
-                        f"Instructions are:\n {instructions_string}")
-
-            # Otherwise, no problem - add this instruction to the circuit.
-            instructions_on_qubit_at_tick.append(instruction)
-            # Add this to the set of qubits we've come across in the circuit.
-            self.qubits.add(qubit)
+        qubit = self.instructions.clash(tick, instruction)
+        if qubit is not None:
+            # Can't add this instruction to the circuit!
+            instructions = self.instructions[tick][qubit] + [instruction]
+            instructions_string = "\n".join([
+                str(instruction) for instruction in instructions])
+            raise ValueError(
+                f"Tried to compile conflicting instructions on qubit "
+                f"{qubit} at tick {tick}! "
+                f"Instructions are:\n {instructions_string}")
+
+        # Otherwise, no problem - add this instruction to the circuit.
+        self.instructions.add(tick, instruction)
+        # Add its qubits to the set of qubits we've come across.
+        self.qubits.update(instruction.qubits)
 
     def add_repeat_block(self, start: Tick, end: Tick, repeats: int):
         # start inclusive, end exclusive.
@@ -267,14 +366,190 @@ class Circuit(object):
         for i in range(start, end):
             self.repeat_blocks[i] = (start, end, repeats)
 
-    def compress(self):
-        # Return a copy of this circuit with unnecessary idle time removed.
-        # TODO - implement!
-        raise NotImplementedError
+    def compress(self) -> Tuple[Circuit, Dict[str, int]]:
+        """Returns a copy of this circuit with unnecessary idle time removed.
+
+        Every instruction is moved as early as possible, subject to staying
+        after the instructions before it on the same qubits (and noise
+        staying at odd ticks, gates at even ticks). Each round (as marked by
+        end_round) and each repeat block is compressed separately, so that
+        coordinate shifts and repeat blocks still surround the same
+        instructions. Initialisations are then moved as late as possible
+        again, so that qubits don't sit initialised for longer than before.
+
+        Measurements of different qubits may end up in a different order,
+        but the Measurer works out detectors and observables from which
+        checks were measured in which rounds, not from the order of the
+        measurements, so these are unaffected. The copy shares its
+        measurement Instructions and its Measurer with this circuit.
+
+        Compression changes the amount of idle time in the circuit, so
+        should be done before idling noise is added.
+
+        Returns:
+            The compressed circuit, and a dictionary saying how many
+            ticks were saved ('ticks') and how many idle locations were
+            saved ('idle_locations') - i.e. how many fewer idling noise
+            instructions will be added when compiling to stim.
+        """
+        barriers = set(self.shift_ticks)
+        for block in self.repeat_blocks.values():
+            if block is not None:
+                start, end, _ = block
+                barriers.update([start - 1, end - 1])
+
+        # Place each instruction at the earliest tick we can. Instructions
+        # can't move earlier than the floor, which is raised every time we
+        # pass a barrier.
+        placements: List[Tuple[Tick, Instruction]] = []
+        # For each (qubit, tick) with a gate on it, the index of that gate
+        # in placements.
+        gate_indexes: Dict[Tuple[Qubit, Tick], int] = {}
+        ready: Dict[Qubit, Tick] = defaultdict(lambda: -1)
+        floor = -1
+        latest = -1
+        new_barriers: Dict[Tick, Tick] = {}
+        pending_barriers = sorted(barriers)
+        for tick in sorted(self.instructions):
+            while pending_barriers and pending_barriers[0] < tick:
+                new_barriers[pending_barriers.pop(0)] = latest
+                floor = latest
+            new_placements = []
+            for instruction in self._unique_instructions(tick):
+                new_tick = max(
+                    [floor] + [ready[qubit] for qubit in instruction.qubits]
+                ) + 1
+                if new_tick % 2 != tick % 2:
+                    new_tick += 1
+                if not instruction.is_noise:
+                    for qubit in instruction.qubits:
+                        gate_indexes[(qubit, tick)] = \
+                            len(placements) + len(new_placements)
+                new_placements.append((new_tick, instruction))
+            # Instructions at the same tick happen simultaneously, so only
+            # update the qubits' ready times once all are placed.
+            for new_tick, instruction in new_placements:
+                for qubit in instruction.qubits:
+                    ready[qubit] = max(ready[qubit], new_tick)
+                latest = max(latest, new_tick)
+            placements.extend(new_placements)
+        for barrier in pending_barriers:
+            new_barriers[barrier] = latest
+
+        initialisations = {
+            gate_indexes[(qubit, tick)]
+            for qubit, ticks in self.init_ticks.items()
+            for tick in ticks}
+        placements = self._delay_initialisations(
+            placements, initialisations, sorted(new_barriers.values()))
+
+        compressed = Circuit()
+        compressed._qubit_indexes = dict(self._qubit_indexes)
+        compressed._product_measurement_targets = \
+            dict(self._product_measurement_targets)
+        compressed.measurer = self.measurer
+        for new_tick, instruction in placements:
+            compressed.add_instruction(new_tick, instruction)
+        for qubit, ticks in self.init_ticks.items():
+            compressed.init_ticks[qubit] = [
+                placements[gate_indexes[(qubit, tick)]][0] for tick in ticks]
+        for qubit, ticks in self.measure_ticks.items():
+            compressed.measure_ticks[qubit] = [
+                placements[gate_indexes[(qubit, tick)]][0] for tick in ticks]
+        # A coordinate shift is only compiled if there are instructions at
+        # its tick.
+        compressed.shift_ticks = [
+            new_barriers[tick] for tick in self.shift_ticks
+            if tick in self.instructions]
+        repeat_blocks = {
+            tuple(block) for block in self.repeat_blocks.values()
+            if block is not None}
+        for start, end, repeats in sorted(repeat_blocks):
+            compressed.add_repeat_block(
+                new_barriers[start - 1] + 1,
+                new_barriers[end - 1] + 1,
+                repeats)
+
+        savings = {
+            'ticks': len(self.instructions) - len(compressed.instructions),
+            'idle_locations':
+                self.number_of_idle_locations() -
+                compressed.number_of_idle_locations()}
+        return compressed, savings
+
+    def _unique_instructions(self, tick: Tick) -> List[Instruction]:
+        # The instructions at this tick, in the same order as if we went
+        # through them qubit by qubit. Instructions on several qubits
+        # appear once per qubit, so keep just the first.
+        table = self.instructions
+        unique = {}
+        for indices in table.qubit_instructions(tick).values():
+            for index in indices:
+                unique[index] = None
+        return [table.instruction(index) for index in unique]
+
+    def _delay_initialisations(
+            self,
+            placements: List[Tuple[Tick, Instruction]],
+            initialisations: Set[int],
+            new_barriers: List[Tick],
+    ) -> List[Tuple[Tick, Instruction]]:
+        # Used by compress: moving instructions as early as possible also
+        # moves initialisations earlier, so that qubits would then sit idle
+        # (and noisy) til their next gate. Move each initialisation, plus
+        # any noise straight after it, as late as possible, without
+        # crossing the next gate on that qubit or the next barrier.
+        timelines: Dict[Qubit, List[int]] = defaultdict(list)
+        for i, (_, instruction) in enumerate(placements):
+            for qubit in instruction.qubits:
+                timelines[qubit].append(i)
+
+        placements = list(placements)
+        for qubit, timeline in timelines.items():
+            timeline.sort(key=lambda i: placements[i][0])
+            for position, i in enumerate(timeline):
+                if i not in initialisations:
+                    continue
+                # Find the next gate on this qubit.
+                next_position = position + 1
+                while next_position < len(timeline) and \
+                        placements[timeline[next_position]][1].is_noise:
+                    next_position += 1
+                group = timeline[position:next_position]
+                movable = all(
+                    placements[j][1].qubits == [qubit] for j in group)
+                if next_position == len(timeline) or not movable:
+                    continue
+                limit = placements[timeline[next_position]][0] - 1
+                barrier_index = bisect_left(new_barriers, placements[i][0])
+                if barrier_index < len(new_barriers):
+                    limit = min(limit, new_barriers[barrier_index])
+                delay = limit - max(placements[j][0] for j in group)
+                delay -= delay % 2
+                if delay > 0:
+                    for j in group:
+                        placements[j] = (
+                            placements[j][0] + delay, placements[j][1])
+        return placements
+
+    def number_of_idle_locations(self) -> int:
+        """Counts the places in the circuit where idling noise would be
+        added - i.e. pairs (tick, qubit) where the qubit is initialised but
+        not involved in any gate.
+
+        Returns:
+            Number of idle locations in the circuit.
+        """
+        ticks = [tick for tick in self.instructions if tick % 2 == 0]
+        return sum(
+            len(initialised.difference(self._active_qubit_ids(tick)))
+            for tick, initialised
+            in self._initialised_qubit_ids_by_tick(ticks))
 
     def add_idling_noise(self,
                          idling_noise: Union[OneQubitNoise, None],
-                         resonator_idling_noise: Union[OneQubitNoise, None]):
+                         resonator_idling_noise: Union[OneQubitNoise, None],
+                         start: Tick = None):
         """Adds idling noise everywhere in the circuit
 
         Idling noise is added at every tick to qubits that have been
@@ -283,6 +558,8 @@ class Circuit(object):
         Args:
             idling_noise:
                 Noise channel to apply to idling locations in the circuit.
+            start:
+                If given, only add idling noise from this tick onwards.
         """
 
         # If circuit is going to be compressed, then this should be done
@@ -290,52 +567,78 @@ class Circuit(object):
         # of idling time in the circuit.
         if idling_noise is not None or resonator_idling_noise is not None:
             # Note that this only loop through ticks at which there is at
-            # least one instruction
-            for tick in sorted(self.instructions.keys()):
-                # Only interested in even ticks, where actual gates happen.
-                if tick % 2 == 0:
-                    # Find out which qubits were idle at this tick. These are
-                    # those that are initialised but not involved in any gate.
-                    idle_qubits = self.get_idle_qubits(tick)
-                    # Sort for reproducibility in tests.
-                    idle_qubits = sorted(
-                        idle_qubits, key=lambda qubit: qubit.coords)
-
-                    is_measurement_tick = self.check_for_measurement_at_tick(
-                        tick)
-                    for qubit in idle_qubits:
-                        if idling_noise is not None:
-                            noise = idling_noise.instruction([qubit])
-                            self.add_instruction(tick + 1, noise)
-
-                        if is_measurement_tick == True and resonator_idling_noise is not None:
-                            noise = resonator_idling_noise.instruction([qubit])
-                            self.add_instruction(tick + 1, noise)
-
-    def get_idle_qubits(self, tick: Tick):
+            # least one instruction. Only interested in even ticks, where
+            # actual gates happen.
+            ticks = [
+                tick for tick in self.instructions
+                if tick % 2 == 0 and (start is None or tick + 1 >= start)]
+            # Sort for reproducibility in tests. Do this once up front,
+            # rather than sorting the idle qubits at every tick.
+            qubits = self.instructions.qubits
+            order = {
+                self.instructions.qubit_id(qubit): i
+                for i, qubit in enumerate(
+                    sorted(self.qubits, key=lambda qubit: qubit.coords))}
+            for tick, initialised in \
+                    self._initialised_qubit_ids_by_tick(ticks):
+                # Find out which qubits were idle at this tick. These are
+                # those that are initialised but not involved in any gate.
+                idle_qubit_ids = sorted(
+                    initialised.difference(self._active_qubit_ids(tick)),
+                    key=order.__getitem__)
+
+                is_measurement_tick = self.check_for_measurement_at_tick(
+                    tick)
+                for qubit_id in idle_qubit_ids:
+                    qubit = qubits[qubit_id]
+                    if idling_noise is not None:
+                        noise = idling_noise.instruction([qubit])
+                        self.add_instruction(tick + 1, noise)
+
+                    if is_measurement_tick == True and resonator_idling_noise is not None:
+                        noise = resonator_idling_noise.instruction([qubit])
+                        self.add_instruction(tick + 1, noise)
+
+    def get_idle_qubits(
+            self, tick: Tick, initialised_qubits: Set[Qubit] = None):
         # A qubit is idle at a given tick if it has been initialised but
-        # isn't involved in any non-identity gate.
-        def is_active(instructions: List[Instruction]):
-            names = [instruction.name for instruction in instructions]
-            return names not in [[], ['I']]
-
-        initialised_qubits = {
-            qubit
-            for qubit in self.qubits
-            if self.is_initialised(tick, qubit)}
+        # isn't involved in any non-identity gate. The initialised qubits
+        # can be passed in if they're already known.
+        if initialised_qubits is None:
+            initialised_qubits = {
+                qubit
+                for qubit in self.qubits
+                if self.is_initialised(tick, qubit)}
+        qubits = self.instructions.qubits
         active_qubits = {
-            qubit for qubit, instructions
-            in self.instructions[tick].items()
-            if is_active(instructions)}
+            qubits[qubit_id] for qubit_id in self._active_qubit_ids(tick)}
         idle_qubits = initialised_qubits.difference(active_qubits)
         return idle_qubits
 
+    def _active_qubit_ids(self, tick: Tick) -> Set[int]:
+        # The ids of the qubits involved in any instruction at this tick,
+        # other than a lone identity gate.
+        table = self.instructions
+        starts = table.qubit_starts
+        qubit_ids = table.qubit_ids
+        identities = {
+            opcode for opcode, (name, _, _) in enumerate(table.opcode_keys)
+            if name == 'I'}
+        seen = set()
+        active = set()
+        for index in table.at_tick(tick):
+            is_identity = table.opcodes[index] in identities
+            for qubit_id in qubit_ids[starts[index]:starts[index + 1]]:
+                if not is_identity or qubit_id in seen:
+                    active.add(qubit_id)
+                seen.add(qubit_id)
+        return active
+
     def check_for_measurement_at_tick(self, tick: Tick):
-        for instructions_on_qubit in self.instructions[tick].values():
-            for instruction in instructions_on_qubit:
-                if instruction.is_measurement:
-                    return True
-        return False
+        table = self.instructions
+        return any(
+            table.opcode_keys[table.opcodes[index]][1]
+            for index in table.at_tick(tick))
 
     def to_stim(
         self,
@@ -381,32 +684,15 @@ class Circuit(object):
         Returns:
             the resulting stim circuit.
         """
-        # Figure out which temporal dimension to shift if tracking coords.
-        if track_coords:
-            qubit_dimensions = {qubit.dimension for qubit in self.qubits}
-            assert len(qubit_dimensions) == 1
-            dimension = qubit_dimensions.pop()
-            shift_coords = tuple([0 for _ in range(dimension)] + [1])
-        else:
-            shift_coords = None
-
-        # Go through the circuit and add idling noise.
-        self.add_idling_noise(idling_noise, resonator_idling_noise)
-
         # Let 'circuit' denote the circuit we're currently compiling to - if
         # using repeat blocks, this need not always be the full circuit itself
         full_circuit = stim.Circuit()
         circuit = full_circuit
 
         most_recent_tick = -1
-        final_tick = max(self.instructions.keys())
-        if track_coords:
-            for qubit in sorted(self.qubits, key=lambda qubit: qubit.coords):
-                index = self.qubit_index(qubit)
-                circuit.append("QUBIT_COORDS", [index], qubit.coords)
-
-        sorted_instructions = sorted(self.instructions.items())
-        for tick, qubit_instructions in sorted_instructions:
+        for tick, tick_circuit in self._stim_ticks(
+                idling_noise, resonator_idling_noise, track_coords,
+                progress_bar):
             # Check whether we need to close a repeat block
             repeats = self.left_repeat_block(tick, most_recent_tick)
             if repeats is not None:
@@ -417,8 +703,234 @@ class Circuit(object):
             if self.entered_repeat_block(tick, most_recent_tick):
                 circuit = stim.Circuit()
 
-            targets_by_instruction, measurements = self.split_instructions_according_to_gate(
-                qubit_instructions)
+            circuit += tick_circuit
+            most_recent_tick = tick
+
+        # If we've finished inside a repeat block, close it.
+        repeat_block = self.repeat_blocks[most_recent_tick]
+        if repeat_block is not None:
+            start, end, repeats = repeat_block
+            repeat_circuit = stim.CircuitRepeatBlock(repeats, circuit)
+            full_circuit.append(repeat_circuit)
+
+        return full_circuit
+
+    def to_stim_with_branches(
+        self,
+        branches: Dict[Any, Tuple[Circuit, Tick]],
+        idling_noise: Union[OneQubitNoise, None],
+        resonator_idling_noise: Union[OneQubitNoise, None] = None,
+    ) -> Tuple[stim.Circuit, Dict[Any, stim.Circuit]]:
+        """Transforms this circuit to a stim circuit, along with some
+        branches of it - circuits that are the same as this one up to some
+        tick, then go their own way (e.g. copies of this circuit taken part
+        way through compilation, then finished off differently - see
+        Compiler.compile_to_stims). Everything before the tick at which a
+        branch splits off is only translated once, for this circuit, rather
+        than again for every branch.
+
+        Each circuit comes out exactly as to_stim (tracking coordinates)
+        would give it. Repeat blocks aren't supported, and branches can't
+        act on any qubits this circuit doesn't, since every circuit shares
+        this one's qubit coordinates.
+
+        Args:
+            branches: the branches, each with the tick from which it
+                differs from this circuit - at most this circuit's last
+                tick.
+            idling_noise: As for to_stim().
+            resonator_idling_noise: As for to_stim().
+
+        Returns:
+            The stim circuit for this circuit, and for each branch.
+        """
+        final_tick = max(self.instructions.keys())
+        for key, (branch, start) in branches.items():
+            if start > final_tick:
+                raise ValueError(
+                    f"Branch {key} splits off at tick {start}, after the "
+                    f"last tick {final_tick} of the circuit it branches off.")
+            if not branch.qubits <= self.qubits:
+                raise ValueError(
+                    f"Branch {key} acts on qubits {branch.qubits - self.qubits} "
+                    f"that the circuit it branches off doesn't.")
+        # Measurements need remembering for as long as any branch could
+        # look back at them.
+        for branch, _ in branches.values():
+            self.measurer.extend_lookback(branch.measurer.max_lookback)
+        pending = sorted(branches.items(), key=lambda item: item[1][1])
+        stim_branches = {}
+
+        def split_off_branches(tick: Union[Tick, None]):
+            # The measurer has got as far as the given tick, so any branch
+            # that splits off by then can carry on from here.
+            while pending and (tick is None or pending[0][1][1] <= tick):
+                key, (branch, start) = pending.pop(0)
+                branch._qubit_indexes = dict(self._qubit_indexes)
+                branch.measurer.continue_compilation(self.measurer)
+                stim_branch = full_circuit.copy()
+                for _, tick_circuit in branch._stim_ticks(
+                        idling_noise, resonator_idling_noise, True, None,
+                        start=start):
+                    stim_branch += tick_circuit
+                stim_branches[key] = stim_branch
+
+        full_circuit = stim.Circuit()
+        stim_ticks = self._stim_ticks(
+            idling_noise, resonator_idling_noise, True, None)
+        # Qubit coordinates come first - by which point idling noise has
+        # been added, so every tick there'll be is known.
+        _, coordinates = next(stim_ticks)
+        full_circuit += coordinates
+        for tick in sorted(self.instructions.keys()):
+            split_off_branches(tick)
+            _, tick_circuit = next(stim_ticks)
+            full_circuit += tick_circuit
+        split_off_branches(None)
+        # Let the measurer reset itself.
+        next(stim_ticks, None)
+        return full_circuit, stim_branches
+
+    def write_stim(
+        self,
+        file: Union[str, Path, TextIO],
+        idling_noise: Union[OneQubitNoise, None],
+        resonator_idling_noise: Union[OneQubitNoise, None] = None,
+        track_coords: bool = True,
+        track_progress: bool = False,
+        free_instructions: bool = False,
+    ):
+        """Like to_stim(), but writes the circuit out in Stim's text format
+        one tick at a time, rather than building a whole stim circuit in
+        memory. Arguments to instructions are written without any loss of
+        precision, so reading the file back in with stim gives exactly the
+        circuit to_stim() would have returned.
+
+        Args:
+            file: Where to write the circuit - either an open text file, or
+                a path. If a path ending in '.gz', the file is
+                gzip-compressed.
+            idling_noise: As for to_stim().
+            resonator_idling_noise: As for to_stim().
+            track_coords: As for to_stim().
+            track_progress: As for to_stim(), but defaults to False.
+            free_instructions: Whether to delete each tick's instructions
+                once they've been written, so that memory used by this
+                circuit is freed as writing goes on. The circuit can't be
+                used again afterwards.
+        """
+        if not isinstance(file, (str, Path)):
+            self._write_stim(
+                file, idling_noise, resonator_idling_noise, track_coords,
+                track_progress, free_instructions)
+            return
+        opener = gzip.open if str(file).endswith('.gz') else open
+        with opener(file, 'wt') as opened:
+            self._write_stim(
+                opened, idling_noise, resonator_idling_noise, track_coords,
+                track_progress, free_instructions)
+
+    def _write_stim(
+        self,
+        file: TextIO,
+        idling_noise: Union[OneQubitNoise, None],
+        resonator_idling_noise: Union[OneQubitNoise, None],
+        track_coords: bool,
+        track_progress: bool,
+        free_instructions: bool,
+    ):
+        if track_progress:
+            with alive_bar(len(self.instructions), force_tty=True) as bar:
+                ticks = self._stim_ticks(
+                    idling_noise, resonator_idling_noise, track_coords, bar,
+                    free_instructions)
+                self._write_stim_ticks(file, ticks)
+        else:
+            ticks = self._stim_ticks(
+                idling_noise, resonator_idling_noise, track_coords, None,
+                free_instructions)
+            self._write_stim_ticks(file, ticks)
+
+    def _write_stim_ticks(
+            self, file: TextIO, ticks: Iterator[Tuple[Tick, stim.Circuit]]):
+        # Mirrors _to_stim, but opens and closes repeat blocks in text.
+        indent = ''
+        most_recent_tick = -1
+        for tick, tick_circuit in ticks:
+            if self.left_repeat_block(tick, most_recent_tick) is not None:
+                file.write('}\n')
+                indent = ''
+            if self.entered_repeat_block(tick, most_recent_tick):
+                start, end, repeats = self.repeat_blocks[tick]
+                file.write(f'REPEAT {repeats} {{\n')
+                indent = '    '
+            if len(tick_circuit) > 0:
+                text = stim_circuit_to_text(tick_circuit)
+                for line in text.splitlines():
+                    file.write(f'{indent}{line}\n')
+            most_recent_tick = tick
+        if self.repeat_blocks[most_recent_tick] is not None:
+            file.write('}\n')
+
+    def _stim_ticks(
+        self,
+        idling_noise: Union[OneQubitNoise, None],
+        resonator_idling_noise: Union[OneQubitNoise, None],
+        track_coords: bool,
+        progress_bar: Any,
+        free_instructions: bool = False,
+        start: Tick = None,
+    ) -> Iterator[Tuple[Tick, stim.Circuit]]:
+        """Translates the circuit to Stim one tick at a time. Repeat blocks
+        are left to the caller.
+
+        Args:
+            idling_noise: Noise channel to apply to idling locations in the circuit.
+            track_coords: Whether to track the coordinates of the qubits and detectors.
+            progress_bar: An alive progress bar, if tracking progress. Else, None.
+            free_instructions: Whether to forget each tick's instructions
+                (and the measurer's record of which checks they measured)
+                once translated. The instruction table's columns are kept,
+                but any measurement instructions are let go of.
+            start: If given, only translate ticks from this one onwards,
+                with the measurer carrying on from wherever it's got to -
+                e.g. for a branch (see to_stim_with_branches). Qubit
+                coordinates are then left out too.
+
+        Yields:
+            Pairs (tick, stim circuit), where the stim circuit contains
+            everything at this tick, including triggered detectors and
+            observable updates, and the TICK that follows. Qubit coordinates
+            come first, at tick -1.
+        """
+        # Figure out which temporal dimension to shift if tracking coords.
+        if track_coords:
+            qubit_dimensions = {qubit.dimension for qubit in self.qubits}
+            assert len(qubit_dimensions) == 1
+            dimension = qubit_dimensions.pop()
+            shift_coords = tuple([0 for _ in range(dimension)] + [1])
+        else:
+            shift_coords = None
+
+        # Go through the circuit and add idling noise.
+        self.add_idling_noise(idling_noise, resonator_idling_noise, start)
+
+        final_tick = max(self.instructions.keys())
+        if track_coords and start is None:
+            circuit = stim.Circuit()
+            for qubit in sorted(self.qubits, key=lambda qubit: qubit.coords):
+                index = self.qubit_index(qubit)
+                circuit.append("QUBIT_COORDS", [index], qubit.coords)
+            yield -1, circuit
+
+        ticks = self.instructions.keys() if start is None else [
+            tick for tick in self.instructions.keys() if tick >= start]
+        for tick in sorted(ticks):
+            circuit = stim.Circuit()
+            targets_by_instruction, measurements = \
+                self.split_instructions_according_to_gate(tick)
+            if free_instructions:
+                self.instructions.free(tick)
 
             for instruction in targets_by_instruction:
                 circuit.append(instruction[0],
@@ -436,11 +948,17 @@ class Circuit(object):
             for instruction in further_instructions:
                 circuit.append(instruction)
 
-            most_recent_tick = tick
+            if free_instructions:
+                for measurement in measurements:
+                    check, round = \
+                        self.measurer.measurement_checks.pop(measurement)
+                    self.measurer.triggers.pop(
+                        (self.measurer.check_id(check), round), None)
+
             if progress_bar is not None:
                 progress_bar()
 
-            if most_recent_tick in self.shift_ticks:
+            if tick in self.shift_ticks:
                 circuit.append(
                     stim.CircuitInstruction("SHIFT_COORDS", (), shift_coords)
                 )
@@ -448,66 +966,112 @@ class Circuit(object):
             if tick != final_tick:
                 circuit.append("TICK")
 
-        # If we've finished inside a repeat block, close it.
-        repeat_block = self.repeat_blocks[final_tick]
-        if repeat_block is not None:
-            start, end, repeats = repeat_block
-            repeat_circuit = stim.CircuitRepeatBlock(repeats, circuit)
-            full_circuit.append(repeat_circuit)
+            yield tick, circuit
 
         self.measurer.reset_compilation()
-        return full_circuit
 
-    def split_instructions_according_to_gate(self, qubit_instructions: Dict[Qubit, List[Instruction]]):
-        """Splits the instructions into gates and measurements
+    def ticks_to_stim(self, start: Tick, end: Tick) -> stim.Circuit:
+        """Transforms just the instructions in ticks [start, end) to a flat
+        stim circuit. Unlike to_stim(), no idling noise, coordinates,
+        detectors or observables are added, and repeat blocks are ignored.
+        This is intended for feeding a circuit into a simulator piece by
+        piece as it's being built - e.g. when finding deterministic
+        detectors in the first rounds of a code.
+
+        Args:
+            start: First tick to include (inclusive).
+            end: Last tick to include (exclusive).
 
-        Qubit instructions is a dictionary whose keys are Qubits and values are lists of Instructions.
-        This function generates a dictionary whose keys are a instruction and whose values are lists of qubits.
+        Returns:
+            The instructions in the given ticks, as a stim circuit.
+        """
+        circuit = stim.Circuit()
+        for tick in range(start, end):
+            if tick in self.instructions:
+                targets_by_instruction, _ = \
+                    self.split_instructions_according_to_gate(tick)
+                for (name, params), targets in targets_by_instruction.items():
+                    circuit.append(name, targets, params)
+        return circuit
+
+    def split_instructions_according_to_gate(self, tick: Tick):
+        """Splits the instructions at the given tick into gates and measurements
+
+        This function generates a dictionary whose keys are a gate name and parameters and whose values are lists of targets.
         This is done to reduce the amount of times we need to call Stim's append function.
 
         It also generates a list of measurements.
 
         Args:
-            qubit_instructions: A dictionary whose keys are Qubits and values are lists of Instructions.
+            tick: The tick whose instructions to split.
 
         Returns:
-            A tuple of two dictionaries. The first dictionary has keys of Instructions and values of lists of qubits.
-            The second dictionary has keys of Instructions which are measurements and values of lists of qubits.        
+            A tuple of a dictionary and a list. The dictionary has keys of (name, params) pairs and values of lists of targets.
+            The list has the measurement Instructions, in the order they appear.
         """
         measurements = []
         targets_by_instruction = {}
-        compiled_instruction = defaultdict(bool)
+        compiled_instructions = set()
+
+        # Multi-qubit instructions appear in the list of every qubit they
+        # act on, so work out each instruction's name and qubit indices
+        # just once. The indices then double up as the instruction's
+        # targets. Note that qubits get their indices in the same order as
+        # if we worked them out afresh every time they're needed.
+        table = self.instructions
+        qubit_index = self.qubit_index
+        qubits = table.qubits
+        starts = table.qubit_starts
+        qubit_ids = table.qubit_ids
+        instruction_keys = {}
+
+        def sort_key(indices: List[int]):
+            key = []
+            for index in indices:
+                instruction_key = instruction_keys.get(index)
+                if instruction_key is None:
+                    instruction_key = (
+                        table.opcode_keys[table.opcodes[index]][0],
+                        [qubit_index(qubits[qubit_id])
+                         for qubit_id
+                         in qubit_ids[starts[index]:starts[index + 1]]])
+                    instruction_keys[index] = instruction_key
+                key.append(instruction_key)
+            return key
 
         # Sorting the instructions such that the order of operations and qubits in the resulting stim circuit is stable.
-        instructions = sorted(qubit_instructions.values(),
-                              key=lambda value: [(v.name, [self.qubit_index(q) for q in v.qubits]) for v in value])
-        for instruction_on_qubit in instructions:
-            for instruction in instruction_on_qubit:
-
-                if not compiled_instruction[instruction]:
-
-                    if instruction.is_measurement:
-                        measurements.append(instruction)
-
-                    key = (instruction.name, instruction.params)
-                    if key not in targets_by_instruction:
-                        targets_by_instruction[key] = []
-
-                    if instruction.name == "MPP":
+        instructions = sorted(
+            table.qubit_instructions(tick).values(), key=sort_key)
+        for indices in instructions:
+            for index in indices:
+
+                if index not in compiled_instructions:
+
+                    name, is_measurement, _ = \
+                        table.opcode_keys[table.opcodes[index]]
+                    kept = table.kept.get(index)
+                    if is_measurement:
+                        measurements.append(kept)
+
+                    key = (name, table.params[table.param_ids[index]])
+                    targets = targets_by_instruction.get(key)
+                    if targets is None:
+                        targets = []
+                        targets_by_instruction[key] = targets
+
+                    if name == "MPP":
                         # Stim's strange syntax for these means we need to
                         # retrieve the check associated to this instruction,
                         # in order to set the targets correctly.
-                        check, _ = self.measurer.measurement_checks[instruction]
-                        instruction.targets = self.product_measurement_targets(
+                        check, _ = self.measurer.measurement_checks[kept]
+                        kept.targets = self.product_measurement_targets(
                             check)
 
-                    if instruction.targets is not None:
-                        targets_by_instruction[key].extend(
-                            instruction.targets)
+                    if kept is not None and kept.targets is not None:
+                        targets.extend(kept.targets)
                     else:
-                        targets_by_instruction[key].extend(
-                            [self.qubit_index(qubit) for qubit in instruction.qubits])
-                    compiled_instruction[instruction] = True
+                        targets.extend(instruction_keys[index][1])
+                    compiled_instructions.add(index)
 
         return targets_by_instruction, measurements
 
@@ -522,8 +1086,14 @@ class Circuit(object):
             circuit: circuit implementing the code so far
 
         Returns:
-            the Stim targets for the check
+            the Stim targets for the check. These are remembered and
+            returned again whenever the same check is measured, so
+            shouldn't be modified.
         """
+        cached = self._product_measurement_targets.get(id(check))
+        if cached is not None and cached[0] is check:
+            return cached[1]
+
         # Do first pauli separately, then do the rest in a for loop.
         # We only care about the non-identity ones.
         paulis = [
@@ -543,6 +1113,9 @@ class Circuit(object):
             targets.append(stim.target_combiner())
             targeter = self.pauli_targeters[pauli.letter.letter]
             targets.append(targeter(self.qubit_index(pauli.qubit)))
+        # Keep hold of the check itself too, so that its id can't be
+        # reused by some other check.
+        self._product_measurement_targets[id(check)] = (check, targets)
         return targets
 
     def entered_repeat_block(self, tick: int, last_tick: int):
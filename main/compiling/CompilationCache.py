@@ -0,0 +1,248 @@
+import hashlib
+import os
+import tempfile
+from enum import Enum
+from functools import lru_cache
+from pathlib import Path
+from typing import Any, Callable, List, Union
+
+import stim
+
+from main.building_blocks.logical.LogicalOperator import LogicalOperator
+from main.codes.Code import Code
+from main.utils.NiceRepr import NiceRepr
+from main.utils.utils import stim_circuit_to_text
+
+
+# The package whose source code compiled circuits depend on.
+_source_directory = Path(__file__).resolve().parents[1]
+
+
+@lru_cache(maxsize=None)
+def _source_fingerprint() -> str:
+    # A digest of every source file in the package, so that changing any of
+    # the code that compiles circuits (e.g. while developing, when the
+    # package version stays the same) invalidates cached entries.
+    digest = hashlib.sha256()
+    for path in sorted(_source_directory.rglob('*.py')):
+        digest.update(path.relative_to(_source_directory).as_posix().encode())
+        digest.update(b'\0')
+        digest.update(path.read_bytes())
+        digest.update(b'\0')
+    return digest.hexdigest()
+
+
+class CompilationCache:
+    # Bump this whenever the way keys are built or entries are stored
+    # changes, so that old entries are never misread.
+    format_version = 1
+
+    def __init__(
+            self,
+            directory: Union[str, Path],
+            max_size: int = 2**30,
+    ):
+        """An on-disk cache of compiled circuits and detector error models.
+
+        Entries are keyed by a fingerprint of everything that goes into a
+        compilation (the compiler, its noise model and syndrome extractor,
+        the code, the number of rounds and the initial and final
+        conditions), together with a fingerprint of this package's source
+        code, so that editing the compiler invalidates entries. Once the
+        cache grows beyond max_size bytes, the least recently used entries
+        are evicted.
+
+        Args:
+            directory: where to store cached entries. Created if it doesn't
+                already exist.
+            max_size: maximum total size, in bytes, of all cached entries.
+        """
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.max_size = max_size
+
+    def key(self, *inputs: Any) -> str:
+        """Fingerprints the given inputs to a compilation.
+
+        Unlike Python's built-in hash, the result is stable across
+        processes, so can be used to look up entries cached by an earlier
+        run.
+
+        Args:
+            inputs: anything that affects the result of a compilation -
+                e.g. the compiler, the code, the number of rounds.
+
+        Returns:
+            A hex digest identifying the inputs.
+        """
+        description = '\n'.join([
+            f'format {self.format_version}',
+            f'source {_source_fingerprint()}',
+            *[self.describe(item) for item in inputs]])
+        return hashlib.sha256(description.encode()).hexdigest()
+
+    @staticmethod
+    def describe(item: Any, _in_progress: List[int] = None) -> str:
+        """Builds a canonical string describing the given item, such that
+        equal items have the same description, regardless of the order in
+        which elements were added to sets and dicts, or the memory
+        addresses at which objects happen to live.
+        """
+        if _in_progress is None:
+            _in_progress = []
+        if id(item) in _in_progress:
+            raise ValueError(
+                f"Can't describe an object that contains itself. "
+                f"Found a cycle at object {item!r}.")
+
+        def describe(child: Any) -> str:
+            return CompilationCache.describe(child, _in_progress)
+
+        if item is None or isinstance(item, (bool, int, str)):
+            return repr(item)
+        if isinstance(item, float):
+            return float.hex(item)
+        if hasattr(item, 'dtype') and hasattr(item, 'item'):
+            # A numpy scalar.
+            return describe(item.item())
+        if isinstance(item, Enum):
+            return f'{type(item).__qualname__}.{item.name}'
+        if isinstance(item, type):
+            return f'{item.__module__}.{item.__qualname__}'
+
+        _in_progress.append(id(item))
+        try:
+            if isinstance(item, (list, tuple)):
+                description = '[' + ','.join(
+                    describe(child) for child in item) + ']'
+            elif isinstance(item, (set, frozenset)):
+                description = '{' + ','.join(sorted(
+                    describe(child) for child in item)) + '}'
+            elif isinstance(item, dict):
+                description = '{' + ','.join(sorted(
+                    f'{describe(key)}:{describe(value)}'
+                    for key, value in item.items())) + '}'
+            elif isinstance(item, Code):
+                # Codes refer to themselves (e.g. via their logical qubits),
+                # and are changed by compilers (e.g. ancilla qubits are
+                # added), so just describe what defines them.
+                description = describe(
+                    [type(item), item.check_schedule, item.data_qubits])
+            elif isinstance(item, LogicalOperator):
+                # Dynamic logical operators refer back to their code, and
+                # build up their history during compilation - describe
+                # them by their initial form.
+                description = describe([type(item), item.at_round(-1)])
+            elif isinstance(item, NiceRepr):
+                description = describe([type(item), item.relevant()])
+            elif hasattr(item, '__dict__'):
+                description = describe([type(item), vars(item)])
+            else:
+                raise ValueError(
+                    f"Don't know how to describe object {item!r} of type "
+                    f"{type(item)} for use in a cache key.")
+        finally:
+            _in_progress.pop()
+        return description
+
+    def get_circuit(self, key: str) -> Union[stim.Circuit, None]:
+        text = self._read(key, '.stim')
+        return None if text is None else stim.Circuit(text)
+
+    def put_circuit(self, key: str, circuit: stim.Circuit):
+        self._write(key, '.stim', stim_circuit_to_text(circuit))
+
+    def get_detector_error_model(
+            self, key: str) -> Union[stim.DetectorErrorModel, None]:
+        text = self._read(key, '.dem')
+        return None if text is None else stim.DetectorErrorModel(text)
+
+    def put_detector_error_model(
+            self, key: str, model: stim.DetectorErrorModel):
+        self._write(key, '.dem', str(model))
+
+    def circuit(
+            self, key: str, create: Callable[[], stim.Circuit]
+    ) -> stim.Circuit:
+        """Returns the circuit cached under the given key, creating and
+        caching it first if need be.
+        """
+        circuit = self.get_circuit(key)
+        if circuit is None:
+            circuit = create()
+            self.put_circuit(key, circuit)
+        return circuit
+
+    def detector_error_model(
+            self, key: str, circuit: stim.Circuit, **kwargs
+    ) -> stim.DetectorErrorModel:
+        """Returns the detector error model for the circuit cached under
+        the given key, creating and caching it first if need be.
+
+        Args:
+            key: the key under which the circuit is (or would be) cached.
+            circuit: the circuit, used if the model needs creating.
+            kwargs: passed on to stim.Circuit.detector_error_model; also
+                form part of the key under which the model is cached.
+        """
+        model_key = self.key(key, kwargs)
+        model = self.get_detector_error_model(model_key)
+        if model is None:
+            model = circuit.detector_error_model(**kwargs)
+            self.put_detector_error_model(model_key, model)
+        return model
+
+    def invalidate(self, key: str):
+        """Removes anything cached under the given key."""
+        for path in self.directory.glob(f'{key}.*'):
+            path.unlink(missing_ok=True)
+
+    def clear(self):
+        """Removes everything from the cache."""
+        for path in self._entries():
+            path.unlink(missing_ok=True)
+
+    def size(self) -> int:
+        """The total size, in bytes, of all cached entries."""
+        return sum(path.stat().st_size for path in self._entries())
+
+    def _entries(self) -> List[Path]:
+        return [
+            path for path in self.directory.iterdir()
+            if path.suffix in ('.stim', '.dem')]
+
+    def _read(self, key: str, suffix: str) -> Union[str, None]:
+        path = self.directory / f'{key}{suffix}'
+        try:
+            text = path.read_text()
+        except FileNotFoundError:
+            return None
+        # Mark as recently used, for the sake of eviction.
+        os.utime(path)
+        return text
+
+    def _write(self, key: str, suffix: str, text: str):
+        # Write to a temporary file first, so that other processes never
+        # see a partially written entry.
+        handle, temporary = tempfile.mkstemp(
+            dir=self.directory, suffix='.tmp')
+        with os.fdopen(handle, 'w') as file:
+            file.write(text)
+        os.replace(temporary, self.directory / f'{key}{suffix}')
+        self._evict()
+
+    def _evict(self):
+        entries = []
+        for path in self._entries():
+            try:
+                stat = path.stat()
+            except FileNotFoundError:
+                # Removed by another process in the meantime.
+                continue
+            entries.append((stat.st_mtime, stat.st_size, path))
+        total_size = sum(size for _, size, _ in entries)
+        for _, size, path in sorted(entries, key=lambda entry: entry[0]):
+            if total_size <= self.max_size:
+                break
+            path.unlink(missing_ok=True)
+            total_size -= size
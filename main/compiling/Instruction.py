@@ -1,3 +1,4 @@
+from functools import lru_cache
 from typing import List, Tuple
 
 import stim
@@ -6,7 +7,28 @@ from main.building_blocks.Qubit import Qubit
 from main.utils.NiceRepr import NiceRepr
 
 
+# Circuits contain huge numbers of instructions, most of which share one of
+# only a handful of parameter tuples (e.g. those of a noise model). Keep one
+# copy of each rather than one per instruction. Only the most recently used
+# are remembered, so that sweeping over many noise models (or compiling
+# noise templates, whose placeholders are all distinct) doesn't keep every
+# tuple ever seen alive for the life of the process. Tuples compare equal
+# element by element, so (1,) and (1.0,) would otherwise share an entry -
+# the types of the elements are passed in too, to tell these apart.
+@lru_cache(maxsize=1024, typed=True)
+def _intern_params(
+        params: Tuple[float, ...], types: Tuple[type, ...]
+) -> Tuple[float, ...]:
+    return params
+
+
 class Instruction(NiceRepr):
+    __slots__ = (
+        'qubits', 'name', 'params', 'is_measurement', 'is_noise', 'targets',
+        'repr_keys')
+    _repr_keys = ('name', 'params', 'qubits')
+    _repr_keys_with_targets = ('name', 'params', 'qubits', 'targets')
+
     def __init__(
             self, qubits: List[Qubit], name: str,
             params: Tuple[float, ...] = (), is_measurement: bool = False,
@@ -42,7 +64,9 @@ class Instruction(NiceRepr):
 
         self.qubits = qubits
         self.name = name
-        self.params = params
+        self.params = _intern_params(params, tuple(map(type, params))) \
+            if isinstance(params, tuple) \
+            else params
         self.is_measurement = is_measurement
         self.is_noise = is_noise
         self.targets = targets
@@ -51,10 +75,10 @@ class Instruction(NiceRepr):
         # TODO - add a 'duration' attribute and adjust idling noise
         #  accordingly
 
-        repr_keys = ['name', 'params', 'qubits']
-        if self.targets is not None:
-            repr_keys.append('targets')
-        super().__init__(repr_keys)
+        super().__init__(
+            self._repr_keys
+            if self.targets is None
+            else self._repr_keys_with_targets)
 
     @staticmethod
     def _assert_qubits_valid(qubits: List[Qubit]):
@@ -67,3 +91,19 @@ class Instruction(NiceRepr):
                 f"instruction! Qubits given are: {qubits}")
         # TODO - also check dimensions are all the same?
         #  And either all have tuple coords or all have non-tuple coords?
+
+    def copy(self) -> 'Instruction':
+        """Returns a copy of this instruction (e.g. to place it again at a
+        later tick). The copy shares this instruction's qubits, parameters
+        and targets, and skips the checks done when creating an instruction
+        from scratch, since these have already passed.
+        """
+        copy = Instruction.__new__(Instruction)
+        copy.qubits = self.qubits
+        copy.name = self.name
+        copy.params = self.params
+        copy.is_measurement = self.is_measurement
+        copy.is_noise = self.is_noise
+        copy.targets = self.targets
+        copy.repr_keys = self.repr_keys
+        return copy
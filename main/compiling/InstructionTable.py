@@ -0,0 +1,314 @@
+from __future__ import annotations
+
+import copy
+from array import array
+from collections.abc import Mapping
+from typing import Any, Dict, Iterator, List, Tuple, Union
+
+from main.building_blocks.Qubit import Qubit
+from main.compiling.Instruction import Instruction
+from main.utils.types import Tick
+
+# What occupies a qubit at a given tick - see clash.
+EMPTY = 0
+NOISE = 1
+PRODUCT_MEASUREMENTS = 2
+GATE = 3
+
+
+class InstructionTable(Mapping):
+    def __init__(self):
+        """Compact, columnar storage for a circuit's instructions. Circuits
+        contain millions of instructions, so rather than keep each as an
+        Instruction object, we note down each instruction's tick, opcode
+        and parameters in flat arrays, and the qubits it acts on in
+        another. Opcodes (an instruction's name and whether it's a
+        measurement or noise), parameter tuples and qubits are each stored
+        just once, and referred to by integer ids.
+
+        The only instructions kept whole are measurements, since these are
+        how the Measurer knows which check was measured when, and the few
+        instructions with their own stim targets.
+
+        For convenience, this is also a read-only mapping in the same form
+        as a circuit's instructions used to be stored: from each tick to a
+        dictionary from qubits to the list of instructions acting on them
+        at that tick. Instructions looked up this way are rebuilt on the
+        fly (except the ones kept whole), so aren't the same objects as
+        were added, and nothing is saved by changing them.
+        """
+        # One entry per instruction added: its tick, opcode and the id of
+        # its parameters.
+        self.ticks = array('i')
+        self.opcodes = array('i')
+        self.param_ids = array('i')
+        # Ids of the qubits each instruction acts on, all in one column:
+        # instruction i acts on qubit_ids[qubit_starts[i]:qubit_starts[i+1]].
+        self.qubit_starts = array('q', [0])
+        self.qubit_ids = array('i')
+
+        # Values referred to by id. Opcodes are (name, is_measurement,
+        # is_noise) triples.
+        self.opcode_keys: List[Tuple[str, bool, bool]] = []
+        self._opcode_ids: Dict[Tuple[str, bool, bool], int] = {}
+        self.params: List[Union[Tuple[float, ...], Any]] = []
+        # Keyed by parameters along with their types, so that e.g. (1,)
+        # and (1.0,) aren't muddled. Most instructions share the same few
+        # parameter tuples (see Instruction), so first try looking these up
+        # by id - safe, since self.params keeps them alive.
+        self._param_ids: Dict[Any, int] = {}
+        self._param_ids_by_identity: Dict[int, int] = {}
+        self.qubits: List[Qubit] = []
+        self._qubit_ids: Dict[Qubit, int] = {}
+
+        # Instructions kept whole, keyed by index.
+        self.kept: Dict[int, Instruction] = {}
+        # Indices of the instructions at each tick, in the order added.
+        self._by_tick: Dict[Tick, array] = {}
+        # What occupies each qubit (indexed by id) at each tick.
+        self._occupancy: Dict[Tick, bytearray] = {}
+
+    def qubit_id(self, qubit: Qubit) -> int:
+        """Get the id of a qubit, giving it one if it doesn't yet have one.
+
+        Args:
+            qubit: Qubit to get the id of.
+
+        Returns:
+            The qubit's id - its index in self.qubits.
+        """
+        qubit_id = self._qubit_ids.get(qubit)
+        if qubit_id is None:
+            qubit_id = len(self.qubits)
+            self._qubit_ids[qubit] = qubit_id
+            self.qubits.append(qubit)
+        return qubit_id
+
+    def _opcode(self, instruction: Instruction) -> int:
+        key = (
+            instruction.name, instruction.is_measurement,
+            instruction.is_noise)
+        opcode = self._opcode_ids.get(key)
+        if opcode is None:
+            opcode = len(self.opcode_keys)
+            self._opcode_ids[key] = opcode
+            self.opcode_keys.append(key)
+        return opcode
+
+    def _param_id(self, params: Union[Tuple[float, ...], Any]) -> int:
+        param_id = self._param_ids_by_identity.get(id(params))
+        if param_id is not None:
+            return param_id
+        types = tuple(map(type, params)) \
+            if isinstance(params, tuple) \
+            else type(params)
+        key = (params, types)
+        try:
+            param_id = self._param_ids.get(key)
+        except TypeError:
+            # Unhashable (e.g. a list) - just don't share it.
+            key = None
+        if param_id is None:
+            param_id = len(self.params)
+            self.params.append(params)
+            if key is not None:
+                self._param_ids[key] = param_id
+        if self.params[param_id] is params:
+            self._param_ids_by_identity[id(params)] = param_id
+        return param_id
+
+    @staticmethod
+    def _occupant(instruction: Instruction) -> int:
+        if instruction.is_noise:
+            return NOISE
+        elif instruction.name == "MPP":
+            return PRODUCT_MEASUREMENTS
+        else:
+            return GATE
+
+    def clash(
+            self, tick: Tick, instruction: Instruction) -> Union[Qubit, None]:
+        """Finds a qubit on which the given instruction can't be added at
+        the given tick, because of what's already there. The only time a
+        qubit can have multiple instructions at the same tick is when
+        they're all noise or all Pauli product measurements.
+
+        Args:
+            tick: Tick at which the instruction would be added.
+            instruction: Instruction that would be added.
+
+        Returns:
+            The first such qubit, or None if there isn't one.
+        """
+        occupancy = self._occupancy.get(tick)
+        if occupancy is None:
+            return None
+        occupant = self._occupant(instruction)
+        for qubit in instruction.qubits:
+            qubit_id = self._qubit_ids.get(qubit)
+            if qubit_id is None or qubit_id >= len(occupancy):
+                continue
+            existing = occupancy[qubit_id]
+            if existing != EMPTY and (
+                    existing != occupant or occupant == GATE):
+                return qubit
+        return None
+
+    def add(self, tick: Tick, instruction: Instruction) -> int:
+        """Adds an instruction at the given tick, without any checks - see
+        Circuit.add_instruction.
+
+        Args:
+            tick: Tick at which to add the instruction.
+            instruction: Instruction to add.
+
+        Returns:
+            The index of the instruction in the table.
+        """
+        index = len(self.ticks)
+        self.ticks.append(tick)
+        self.opcodes.append(self._opcode(instruction))
+        self.param_ids.append(self._param_id(instruction.params))
+        qubit_ids = [self.qubit_id(qubit) for qubit in instruction.qubits]
+        self.qubit_ids.extend(qubit_ids)
+        self.qubit_starts.append(len(self.qubit_ids))
+        if instruction.is_measurement or instruction.targets is not None:
+            self.kept[index] = instruction
+
+        at_tick = self._by_tick.get(tick)
+        if at_tick is None:
+            at_tick = array('i')
+            self._by_tick[tick] = at_tick
+            occupancy = bytearray(len(self.qubits))
+            self._occupancy[tick] = occupancy
+        else:
+            occupancy = self._occupancy[tick]
+            if len(occupancy) < len(self.qubits):
+                occupancy.extend(bytes(len(self.qubits) - len(occupancy)))
+        at_tick.append(index)
+        occupant = self._occupant(instruction)
+        for qubit_id in qubit_ids:
+            existing = occupancy[qubit_id]
+            occupancy[qubit_id] = occupant \
+                if existing in (EMPTY, occupant) \
+                else GATE
+        return index
+
+    def instruction(self, index: int) -> Instruction:
+        """Gets an instruction back from the table.
+
+        Args:
+            index: The index of the instruction in the table.
+
+        Returns:
+            The instruction as it was added, if it was kept whole, or else
+            a copy of it rebuilt from the table.
+        """
+        kept = self.kept.get(index)
+        if kept is not None:
+            return kept
+        name, is_measurement, is_noise = self.opcode_keys[self.opcodes[index]]
+        instruction = Instruction.__new__(Instruction)
+        instruction.qubits = [
+            self.qubits[qubit_id]
+            for qubit_id in self.qubit_ids[
+                self.qubit_starts[index]:self.qubit_starts[index + 1]]]
+        instruction.name = name
+        instruction.params = self.params[self.param_ids[index]]
+        instruction.is_measurement = is_measurement
+        instruction.is_noise = is_noise
+        instruction.targets = None
+        instruction.repr_keys = Instruction._repr_keys
+        return instruction
+
+    def at_tick(self, tick: Tick) -> array:
+        """The indices of the instructions at the given tick, in the order
+        they were added. Empty if there are none.
+        """
+        return self._by_tick.get(tick, array('i'))
+
+    def indices(self) -> Iterator[int]:
+        """The indices of all instructions still in the table (see free)."""
+        for at_tick in self._by_tick.values():
+            yield from at_tick
+
+    def qubit_instructions(self, tick: Tick) -> Dict[int, List[int]]:
+        """The instructions at the given tick, grouped by qubit.
+
+        Args:
+            tick: The tick to look at.
+
+        Returns:
+            A dictionary from the id of every qubit acted on at this tick to
+            the indices of the instructions acting on it, in the order
+            added. A multi-qubit instruction is included for each of its
+            qubits.
+        """
+        starts = self.qubit_starts
+        qubit_ids = self.qubit_ids
+        qubit_instructions = {}
+        for index in self.at_tick(tick):
+            for qubit_id in qubit_ids[starts[index]:starts[index + 1]]:
+                indices = qubit_instructions.get(qubit_id)
+                if indices is None:
+                    qubit_instructions[qubit_id] = [index]
+                else:
+                    indices.append(index)
+        return qubit_instructions
+
+    def free(self, tick: Tick):
+        """Forgets the instructions at the given tick, and lets go of any
+        kept whole. Their entries in the table's columns stay, but are no
+        longer found by looking the tick up.
+
+        Args:
+            tick: The tick whose instructions to forget.
+        """
+        for index in self._by_tick.pop(tick, ()):
+            self.kept.pop(index, None)
+        self._occupancy.pop(tick, None)
+
+    def copy(self) -> InstructionTable:
+        """Copies the table. The copy shares the instructions kept whole
+        with this table, but adding to one table leaves the other
+        untouched.
+
+        Returns:
+            The copy.
+        """
+        copied = copy.copy(self)
+        for name in [
+                'ticks', 'opcodes', 'param_ids', 'qubit_starts',
+                'qubit_ids', 'opcode_keys', '_opcode_ids', 'params',
+                '_param_ids', '_param_ids_by_identity', 'qubits',
+                '_qubit_ids', 'kept']:
+            setattr(copied, name, copy.copy(getattr(self, name)))
+        copied._by_tick = {
+            tick: array('i', at_tick)
+            for tick, at_tick in self._by_tick.items()}
+        copied._occupancy = {
+            tick: bytearray(occupancy)
+            for tick, occupancy in self._occupancy.items()}
+        return copied
+
+    def __getitem__(self, tick: Tick) -> Dict[Qubit, List[Instruction]]:
+        if tick not in self._by_tick:
+            raise KeyError(tick)
+        instructions = {}
+        result = {}
+        for qubit_id, indices in self.qubit_instructions(tick).items():
+            for index in indices:
+                if index not in instructions:
+                    instructions[index] = self.instruction(index)
+            result[self.qubits[qubit_id]] = [
+                instructions[index] for index in indices]
+        return result
+
+    def __contains__(self, tick: Any) -> bool:
+        return tick in self._by_tick
+
+    def __iter__(self) -> Iterator[Tick]:
+        return iter(self._by_tick)
+
+    def __len__(self) -> int:
+        return len(self._by_tick)
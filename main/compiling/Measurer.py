@@ -1,5 +1,8 @@
+from __future__ import annotations
+
+import copy
 from collections import defaultdict
-from typing import List, Iterable, Tuple, Dict, Union
+from typing import List, Iterable, Tuple, Dict, Union, Any
 
 import stim
 
@@ -35,40 +38,212 @@ class Measurer:
         # measurement 'targets'.
         self.total_measurements = 0
 
+        # Checks and detectors are mostly looked up by integer id rather than
+        # by the objects themselves, since hashing and comparing checks is
+        # relatively slow. Codes give their checks and detectors dense ids
+        # when their schedules are set; anything else (e.g. the checks
+        # compilers make for final measurements) is given a negative id
+        # here instead - see check_id.
+        self._check_ids: Dict[Check, int] = {}
+        self._detector_ids: Dict[Detector, int] = {}
+
         # Note which instructions correspond to the measurement of which
         # checks and in which rounds. Keys are Instructions, values are
         # (check, round) pairs.
         self.measurement_checks: Dict[Instruction, Tuple[Check, int]] = {}
         # Track the numbers stim assigns to the measurement of a given check
-        # in a given round. Keys are (check, round) pairs.
-        self.measurement_numbers: Dict[Tuple[Check, int], int] = {}
+        # in a given round. Keys are (check id, round) pairs.
+        self.measurement_numbers: Dict[Tuple[int, int], int] = {}
 
         # Map observables to their index in Stim
         self._observable_indexes = {}
 
         # A measurement can lead to a detector being compiled or an observable
         # being updated - we track which measurements trigger what.
-        # Keys are (check, round) pairs, and values are lists whose elements
-        # are detectors or observables.
-        self.triggers: Dict[Tuple[Check, int], List[Trigger]] = \
+        # Keys are (check id, round) pairs, and values are lists whose
+        # elements are detectors or observables.
+        self.triggers: Dict[Tuple[int, int], List[Trigger]] = \
             defaultdict(list)
         # To prevent duplicate detectors being compiled, track those that we've
         # already made.
         self.detectors_compiled: Dict[Tuple[int], bool] = defaultdict(bool)
 
+        # Template mode - see use_templates. The period is in rounds; if
+        # None, every detector is compiled from scratch and nothing is ever
+        # forgotten.
+        self.period: Union[int, None] = None
+        self.window_periods: Union[int, None] = None
+        # Most rounds ago that any detector looks back.
+        self._max_lookback = 0
+        # Rounds to look back for the current compilation to stim only -
+        # see extend_lookback.
+        self._extra_lookback = 0
+        self._reset_templates()
+
+    def check_id(self, check: Check) -> int:
+        """The integer id this measurer uses for the given check - the id
+        the check's code gave it, if any, or else one of this measurer's own
+        (shared with any copies of it). Equal checks without a code's id get
+        the same id as each other.
+
+        Args:
+            check: the check to get the id of.
+
+        Returns:
+            The check's id.
+        """
+        check_id = check.check_id
+        if check_id is None:
+            # Negative, so as not to clash with ids codes give their checks.
+            check_id = self._check_ids.setdefault(
+                check, -1 - len(self._check_ids))
+        return check_id
+
+    def _detector_id(self, detector: Detector) -> int:
+        # Likewise for detectors, which are only ever equal to themselves.
+        detector_id = detector.detector_id
+        if detector_id is None:
+            detector_id = self._detector_ids.setdefault(
+                detector, -1 - len(self._detector_ids))
+        return detector_id
+
+    @property
+    def max_lookback(self) -> int:
+        """The most rounds ago that any detector added so far looks back."""
+        return self._max_lookback
+
+    def extend_lookback(self, rounds: int):
+        """Remembers measurements for at least the given number of rounds
+        back, rather than just as long as this measurer's own detectors
+        need, until the current compilation to stim finishes - e.g. so that
+        a branch whose detectors look further back can carry on from this
+        measurer (see continue_compilation). Only matters in template mode,
+        where old rounds are forgotten.
+
+        Args:
+            rounds: the number of rounds back to remember.
+        """
+        self._extra_lookback = max(self._extra_lookback, rounds)
+
+    def use_templates(self, period: int, window_periods: int = 3):
+        """Turns on template mode, for circuits whose bulk repeats every
+        `period` rounds. In this mode, once a detector has been compiled in
+        some round, the same Stim instruction is reused one period later
+        (and so on), rather than being rebuilt by looking up the number of
+        every measurement it compares. This is only done when every
+        measurement made since the earliest one the detector compares
+        matches the measurement made exactly one period before it, so
+        templates are never used in the irregular rounds at the start and
+        end of a circuit.
+
+        Memory is also kept bounded: the numbers assigned to measurements,
+        and the record of detectors already compiled, are only kept for
+        the most recent `window_periods` periods (plus however far back
+        detectors look).
+
+        Args:
+            period: number of rounds after which the detectors (and the
+                order in which checks are measured) repeat - e.g. a code's
+                schedule length.
+            window_periods: number of periods' worth of measurements to
+                remember.
+        """
+        if period < 1 or window_periods < 1:
+            raise ValueError(
+                f"Period and window must both be positive, but got period "
+                f"{period} and window {window_periods}.")
+        self.period = period
+        self.window_periods = window_periods
+        self._reset_templates()
+
+    def _reset_templates(self):
+        # Measurement layouts of previous ticks - i.e. which checks were
+        # measured in which rounds, and which detectors this triggered -
+        # keyed by the first (check id, round) measured, together with the
+        # number of the first measurement.
+        self._layouts: Dict[Tuple[int, int], Tuple[List[Any], int]] = {}
+        # Instructions that detectors compiled to (or None if they weren't
+        # compiled), along with the measurements they compared relative to
+        # the end of the tick. Keys are (detector id, check id, round),
+        # where the check is the one whose measurement triggered the
+        # detector.
+        self._templates: Dict[
+            Tuple[int, int, int],
+            Union[Tuple[stim.CircuitInstruction, Tuple[int, ...]], None]] = {}
+        # Number of measurements per period in the current periodic stretch
+        # of measurements, and the first round all of whose measurements
+        # lie in it. Both None if we're not currently in such a stretch.
+        self._period_measurements: Union[int, None] = None
+        self._periodic_from_round: Union[int, None] = None
+        # Latest round in which anything's been measured, and everything
+        # recorded per round, so that it can be forgotten later on. Values
+        # are lists of (dict, key) pairs.
+        self._latest_round = -1
+        self._history: Dict[int, List[Tuple[Dict, Any]]] = defaultdict(list)
+
+    def copy(self) -> Measurer:
+        """Copies this measurer, as it stands between compilations to stim
+        - e.g. so that a circuit can be copied part way through being
+        compiled, and each copy then finished off differently. The copy
+        shares Instructions, checks, detectors and observables with this
+        measurer, as well as the ids given to checks and detectors, but
+        nothing else recorded in one affects the other.
+
+        Returns:
+            The copy.
+        """
+        copied = copy.copy(self)
+        copied.measurement_checks = dict(self.measurement_checks)
+        copied.triggers = defaultdict(list, {
+            key: list(triggers) for key, triggers in self.triggers.items()})
+        copied._observable_indexes = dict(self._observable_indexes)
+        copied.reset_compilation()
+        return copied
+
+    def continue_compilation(self, other: Measurer):
+        """Picks up compiling to stim from wherever another measurer has got
+        to, for a circuit that's the same as the other measurer's up to
+        that point, but then goes its own way (see
+        Circuit.to_stim_with_branches). Only what's recorded while
+        compiling to stim is carried over - which checks are measured in
+        which rounds, and what this triggers, stays this measurer's own.
+
+        Args:
+            other: the measurer to carry on from.
+        """
+        # Everything in the history refers to one of these records, so
+        # must refer to this measurer's copy of it instead.
+        copies = {}
+        for name in [
+                'measurement_numbers', 'detectors_compiled', '_layouts',
+                '_templates']:
+            records = getattr(other, name)
+            copies[id(records)] = copy.copy(records)
+            setattr(self, name, copies[id(records)])
+        self._history = defaultdict(list, {
+            round: [(copies[id(records)], key) for records, key in history]
+            for round, history in other._history.items()})
+        self.total_measurements = other.total_measurements
+        self._observable_indexes = dict(other._observable_indexes)
+        self._period_measurements = other._period_measurements
+        self._periodic_from_round = other._periodic_from_round
+        self._latest_round = other._latest_round
+
     def add_measurement(self, measurement: Instruction, check: Check, round: int):
         self.measurement_checks[measurement] = (check, round)
 
     def add_detectors(self, detectors: Iterable[Detector], round: int):
         for detector in detectors:
+            self._max_lookback = max(
+                self._max_lookback, detector.end - detector.start)
             for check in detector.final_checks:
-                self.triggers[(check, round)].append(detector)
+                self.triggers[(self.check_id(check), round)].append(detector)
 
     def multiply_observable(
         self, checks: Iterable[Check], observable: LogicalOperator, round: int
     ):
         for check in checks:
-            self.triggers[(check, round)].append(observable)
+            self.triggers[(self.check_id(check), round)].append(observable)
 
     def measurement_triggers_to_stim(
         self, measurements: List[Instruction], shift_coords: Union[Tuple[Coordinates], None]
@@ -88,22 +263,47 @@ class Measurer:
         observable_multipliers = defaultdict(list)
         track_coords = shift_coords is not None
 
+        layout = []
         for measurement in measurements:
-            # First record the measurement numbers
             check, round = self.measurement_checks[measurement]
-            self.measurement_numbers[(check, round)] = self.total_measurements
+            check_id = self.check_id(check)
+            layout.append((
+                check, check_id, round,
+                self.triggers.get((check_id, round), [])))
+        templating = self.period is not None
+        periodic = templating and self._is_periodic(layout)
+        tick_end = self.total_measurements + len(layout)
+
+        for check, check_id, round, triggers in layout:
+            # First record the measurement numbers
+            self.measurement_numbers[(check_id, round)] = \
+                self.total_measurements
             self.total_measurements += 1
+            if templating:
+                self._history[round].append(
+                    (self.measurement_numbers, (check_id, round)))
 
             # Now see if measuring this check triggers any extra instructions.
-            for trigger in self.triggers[(check, round)]:
+            for trigger in triggers:
                 if isinstance(trigger, Detector):
                     # This check (amongst others) triggers a detector.
                     detector = trigger
-                    if self.can_compile_detector(detector, round):
+                    found, template = self._template(
+                        detector, check_id, round, tick_end) \
+                        if periodic else (False, None)
+                    if found:
+                        if template is not None:
+                            detectors.append(
+                                (detector, check_id, round, template))
+                    elif self.can_compile_detector(detector, round):
                         # Must wait til all measurement numbers have been
                         # assigned (at the end of the outer for loop we're in)
                         # before turning this detector into a Stim instruction
-                        detectors.append((detector, round))
+                        detectors.append((detector, check_id, round, None))
+                    elif templating:
+                        self._add_template(
+                            self._detector_id(detector), check_id, round,
+                            None)
                 else:
                     # Must be an observable update.
                     assert isinstance(trigger, LogicalOperator)
@@ -114,9 +314,21 @@ class Measurer:
 
         # Can now actually create corresponding Stim instructions.
         instructions = []
-        for detector, round in detectors:
-            instructions.append(self.detector_to_stim(
-                detector, round, track_coords))
+        for detector, check_id, round, template in detectors:
+            if template is not None:
+                instructions.append(template[0])
+                continue
+            instruction = self.detector_to_stim(detector, round, track_coords)
+            if templating:
+                offsets = tuple(sorted(
+                    target.value for target in instruction.targets_copy()))
+                self._add_template(
+                    self._detector_id(detector), check_id, round,
+                    (instruction, offsets))
+                self._history[round].append((
+                    self.detectors_compiled,
+                    tuple(tick_end + offset for offset in offsets)))
+            instructions.append(instruction)
         for observable, checks in observable_multipliers.items():
             targets = [self.measurement_target(
                 check, round) for check, round in checks]
@@ -125,8 +337,115 @@ class Measurer:
                 stim.CircuitInstruction("OBSERVABLE_INCLUDE", targets, [index])
             )
 
+        if templating and layout:
+            self._forget_old_rounds(max(round for _, _, round, _ in layout))
         return instructions
 
+    def _is_periodic(
+            self, layout: List[Tuple[Check, int, int, List[Trigger]]]):
+        # Checks whether these measurements are the same as those made one
+        # period earlier (up to shifting rounds by a period), and notes
+        # whether we're in (or have just entered) a periodic stretch of
+        # measurements - one in which the gap between each measurement and
+        # its counterpart a period earlier is always the same.
+        if not layout:
+            return False
+        _, check_id, round, _ = layout[0]
+        key = (check_id, round)
+        self._layouts[key] = (layout, self.total_measurements)
+        self._history[round].append((self._layouts, key))
+
+        previous = self._layouts.get((check_id, round - self.period))
+        periodic = previous is not None and \
+            self._same_layout(layout, previous[0])
+        if not periodic:
+            self._period_measurements = None
+            self._periodic_from_round = None
+        else:
+            gap = self.total_measurements - previous[1]
+            if gap != self._period_measurements:
+                # Starting a new periodic stretch - every round measured
+                # from now on is in it, but none measured before.
+                self._period_measurements = gap
+                self._periodic_from_round = self._latest_round + 1
+        return periodic
+
+    def _same_layout(
+            self, layout: List[Tuple[Check, int, int, List[Trigger]]],
+            previous: List[Tuple[Check, int, int, List[Trigger]]]):
+        if len(layout) != len(previous):
+            return False
+        for (_, check_id, round, triggers), (
+                _, previous_check_id, previous_round, previous_triggers) \
+                in zip(layout, previous):
+            if check_id != previous_check_id or \
+                    round != previous_round + self.period:
+                return False
+            # Triggers are only ever equal to themselves, so this is quick,
+            # and usually enough.
+            if triggers == previous_triggers:
+                continue
+            # Observable updates needn't repeat with the same period, and
+            # don't use templates anyway, so only compare detectors.
+            detectors = [
+                trigger for trigger in triggers
+                if isinstance(trigger, Detector)]
+            previous_detectors = [
+                trigger for trigger in previous_triggers
+                if isinstance(trigger, Detector)]
+            if len(detectors) != len(previous_detectors) or any(
+                    detector is not previous_detector
+                    for detector, previous_detector
+                    in zip(detectors, previous_detectors)):
+                return False
+        return True
+
+    def _template(
+            self, detector: Detector, check_id: int, round: int,
+            tick_end: int):
+        # Looks for what this detector compiled to a period ago, when
+        # triggered by the same check. This can only be reused if every
+        # measurement the detector compares now lies in the current
+        # periodic stretch. Returns whether a template was found, and if
+        # so the template itself (None if the detector wasn't compiled).
+        if round - (detector.end - detector.start) < self._periodic_from_round:
+            return False, None
+        detector_id = self._detector_id(detector)
+        key = (detector_id, check_id, round - self.period)
+        if key not in self._templates:
+            return False, None
+        template = self._templates[key]
+        self._add_template(detector_id, check_id, round, template)
+        if template is not None:
+            # Note down that this detector's been compiled, in case an
+            # equivalent one comes along that isn't compiled from a template.
+            numbers = tuple(tick_end + offset for offset in template[1])
+            self.detectors_compiled[numbers] = True
+            self._history[round].append((self.detectors_compiled, numbers))
+        return True, template
+
+    def _add_template(
+            self, detector_id: int, check_id: int, round: int,
+            template: Union[Tuple[stim.CircuitInstruction, Tuple[int, ...]], None]):
+        key = (detector_id, check_id, round)
+        self._templates[key] = template
+        self._history[round].append((self._templates, key))
+
+    def _forget_old_rounds(self, round: int):
+        # Forget everything recorded for rounds that have dropped out of the
+        # window, now that the given round has been measured.
+        if round <= self._latest_round:
+            return
+        self._latest_round = round
+        window = self.window_periods * self.period + \
+            max(self._max_lookback, self._extra_lookback)
+        old_rounds = [
+            old_round for old_round in self._history
+            if old_round < round - window]
+        for old_round in old_rounds:
+            for records, key in self._history.pop(old_round):
+                records.pop(key, None)
+
     def detector_to_stim(self, detector: Detector, round: int, track_coords: bool):
         targets = [
             self.measurement_target(check, round + rounds_ago)
@@ -146,13 +465,14 @@ class Measurer:
         # equivalent detector (one that compares the exact same measurements).
 
         final_checks_measured = all([
-            (check, round) in self.measurement_numbers
+            (self.check_id(check), round) in self.measurement_numbers
             for check in detector.final_checks])
 
         if final_checks_measured:
             # First criteria met...
             measurement_numbers = tuple(sorted([
-                self.measurement_numbers[(check, round + rounds_ago)]
+                self.measurement_numbers[
+                    (self.check_id(check), round + rounds_ago)]
                 for rounds_ago, check in detector.timed_checks_mod_2]))
             already_compiled = self.detectors_compiled[measurement_numbers]
             if not already_compiled:
@@ -163,7 +483,8 @@ class Measurer:
 
     def measurement_target(self, check: Check, round: int):
         measurements_ago = (
-            self.measurement_numbers[(check, round)] - self.total_measurements
+            self.measurement_numbers[(self.check_id(check), round)] -
+            self.total_measurements
         )
         return stim.target_rec(measurements_ago)
 
@@ -183,3 +504,5 @@ class Measurer:
         self.measurement_numbers = {}
         self.detectors_compiled = defaultdict(bool)
         self.total_measurements = 0
+        self._extra_lookback = 0
+        self._reset_templates()
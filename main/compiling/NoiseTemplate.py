@@ -0,0 +1,160 @@
+import copy
+from typing import Dict, Tuple, Type, Union
+
+import stim
+
+from main.compiling.noise.models.NoiseModel import NoiseModel
+from main.compiling.noise.noises.Noise import Noise
+
+
+class NoiseTemplate:
+    # Placeholder parameters are multiples of this - far too small to be
+    # confused with anything else in a circuit, and exactly representable,
+    # so they survive the round trip through stim unchanged.
+    placeholder_unit = 2**-30
+
+    def __init__(
+            self,
+            circuit: stim.Circuit,
+            placeholders: Dict[float, Tuple[str, str]],
+            shape: Dict[str, Union[Type[Noise], None]],
+    ):
+        """A circuit compiled once, that can then be turned into the same
+        circuit under any noise model of the same shape - e.g. for each of
+        the error rates in a threshold sweep - without compiling again.
+
+        The circuit is compiled with a placeholder noise model (see
+        with_placeholders), in which every parameter of every noise channel
+        is a distinct placeholder value, so that each noise location in the
+        circuit records which noise model slot (initialisation,
+        two_qubit_gate, measurement, etc.) and which parameter it came from.
+
+        Instantiating the template gives a circuit equivalent to compiling
+        with the given noise model directly: the same noise channels act at
+        the same locations. The only difference is that where channels from
+        different slots coincide (e.g. initialisation and idling noise with
+        the same strength at the same tick), they may be listed in a
+        different order, which makes no difference since Pauli channels
+        commute.
+
+        Args:
+            circuit: the circuit compiled with the placeholder noise model.
+            placeholders: the noise model slot and attribute each
+                placeholder value stands for.
+            shape: the type of noise in each slot of the noise model the
+                template was compiled for (None if there's no noise there).
+        """
+        self.circuit = circuit
+        self.placeholders = placeholders
+        self.shape = shape
+
+    @staticmethod
+    def shape_of(noise_model: NoiseModel) -> Dict[str, Union[Type[Noise], None]]:
+        """The type of noise in each of the noise model's slots, or None
+        if there's no noise in that slot. Noise models of the same shape
+        compile to circuits that only differ in their noise parameters.
+        """
+        return {
+            slot: None if noise is None else type(noise)
+            for slot, noise in vars(noise_model).items()
+            if noise is None or isinstance(noise, Noise)}
+
+    @classmethod
+    def with_placeholders(
+            cls, noise_model: NoiseModel
+    ) -> Tuple[NoiseModel, Dict[float, Tuple[str, str]]]:
+        """Copies a noise model, replacing every parameter of every noise
+        channel in it with a distinct placeholder value.
+
+        Args:
+            noise_model: the noise model to copy.
+
+        Returns:
+            The copy, together with the noise model slot and attribute that
+            each placeholder value stands for.
+        """
+        placeholders = {}
+        noise_model = copy.copy(noise_model)
+        for slot, noise in vars(noise_model).items():
+            if isinstance(noise, Noise):
+                noise = copy.copy(noise)
+                for attribute, value in vars(noise).items():
+                    if isinstance(value, (float, int)):
+                        placeholder = (len(placeholders) + 1) * \
+                            cls.placeholder_unit
+                        placeholders[placeholder] = (slot, attribute)
+                        setattr(noise, attribute, placeholder)
+                setattr(noise_model, slot, noise)
+        return noise_model, placeholders
+
+    def instantiate(self, noise_model: NoiseModel) -> stim.Circuit:
+        """Builds the circuit this template was compiled from, but under the
+        given noise model. Takes time linear in the size of the circuit.
+
+        Args:
+            noise_model: a noise model of the same shape as the one the
+                template was compiled for.
+
+        Returns:
+            The circuit under the given noise model.
+        """
+        return self.substitute(self.values(noise_model))
+
+    def substitute(self, values: Dict[float, float]) -> stim.Circuit:
+        """The template's circuit, with every placeholder replaced by the
+        given value.
+
+        Args:
+            values: the value to replace each placeholder with.
+
+        Returns:
+            The circuit with the values in.
+        """
+        return self._substitute(self.circuit, values)
+
+    def values(self, noise_model: NoiseModel) -> Dict[float, float]:
+        """The value each placeholder takes under the given noise model.
+
+        Args:
+            noise_model: a noise model of the same shape as the one the
+                template was compiled for.
+
+        Returns:
+            The value of each placeholder's parameter in the noise model.
+        """
+        shape = self.shape_of(noise_model)
+        if shape != self.shape:
+            raise ValueError(
+                f"Can only instantiate a noise template with a noise model "
+                f"of the same shape as the one it was compiled for. "
+                f"Template has noise {self.shape}, but was given noise "
+                f"model with noise {shape}.")
+        return {
+            placeholder: getattr(getattr(noise_model, slot), attribute)
+            for placeholder, (slot, attribute) in self.placeholders.items()}
+
+    @classmethod
+    def _substitute(
+            cls, circuit: stim.Circuit, values: Dict[float, float]
+    ) -> stim.Circuit:
+        # Appending instructions one by one lets stim fuse neighbouring ones
+        # that now have the same parameters, as it would have done had the
+        # circuit been compiled with these parameters in the first place.
+        substituted = stim.Circuit()
+        for instruction in circuit:
+            if isinstance(instruction, stim.CircuitRepeatBlock):
+                substituted.append(stim.CircuitRepeatBlock(
+                    instruction.repeat_count,
+                    cls._substitute(instruction.body_copy(), values)))
+                continue
+            args = instruction.gate_args_copy()
+            if args and all(arg in values for arg in args):
+                # Much quicker than appending the name, targets and
+                # arguments separately.
+                substituted.append(stim.CircuitInstruction(
+                    instruction.name,
+                    instruction.targets_copy(),
+                    [values[arg] for arg in args]))
+            else:
+                substituted.append(instruction)
+        return substituted
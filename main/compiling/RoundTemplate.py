@@ -0,0 +1,98 @@
+from typing import Any, List, Tuple, Union
+
+from main.building_blocks.Check import Check
+from main.compiling.Circuit import Circuit
+from main.compiling.Instruction import Instruction
+from main.utils.types import Tick
+
+
+class RoundTemplate(object):
+    # Kinds of step a template can record.
+    ADD = 0
+    INITIALISE = 1
+    MEASURE = 2
+
+    def __init__(self, circuit: Circuit, checks: List[Check], tick: Tick):
+        """Record of the instructions a syndrome extractor compiles for one
+        round of checks, so that the same round can later be stamped onto
+        the circuit again at a different tick, without running the
+        syndrome extractor again. In a code's check schedule, round r and
+        round r + schedule_length measure the same checks, so only differ
+        in the tick at which they start.
+
+        While recording, a template stands in for the circuit: it is given
+        to the syndrome extractor instead, and passes everything on to the
+        real circuit, noting down each instruction added, initialisation
+        and measurement on the way.
+
+        Args:
+            circuit: The circuit the round is being compiled onto.
+            checks: The checks measured in this round.
+            tick: The tick at which the round starts.
+        """
+        self.circuit = circuit
+        self.checks = checks
+        self.start = tick
+        # Steps are (kind, tick relative to start, instruction, check),
+        # where check is None unless this is a measurement.
+        self.steps: List[Tuple[int, Tick, Instruction, Union[Check, None]]] = []
+        # Number of ticks the round takes - only known once it's recorded.
+        self.length: Union[int, None] = None
+
+    def add_instruction(self, tick: Tick, instruction: Instruction):
+        self.circuit.add_instruction(tick, instruction)
+        self.steps.append((self.ADD, tick - self.start, instruction, None))
+
+    def initialise(self, tick: Tick, instruction: Instruction):
+        self.circuit.initialise(tick, instruction)
+        self.steps.append(
+            (self.INITIALISE, tick - self.start, instruction, None))
+
+    def measure(
+            self, measurement: Instruction, check: Check, round: int,
+            tick: Tick):
+        self.circuit.measure(measurement, check, round, tick)
+        self.steps.append(
+            (self.MEASURE, tick - self.start, measurement, check))
+
+    def __getattr__(self, name: str) -> Any:
+        # Anything else the syndrome extractor wants from the circuit
+        # doesn't change it, so needn't be recorded.
+        return getattr(self.circuit, name)
+
+    def finish(self, tick: Tick):
+        """Stops recording.
+
+        Args:
+            tick: The tick returned by the syndrome extractor - i.e. the
+                next tick that can be used after the round.
+        """
+        self.length = tick - self.start
+        self.circuit = None
+
+    def stamp(self, round: int, tick: Tick, circuit: Circuit) -> Tick:
+        """Compiles a copy of the recorded round onto the given circuit.
+
+        Args:
+            round: The round being compiled.
+            tick: The tick at which to start the round.
+            circuit: The circuit to compile the round onto.
+
+        Returns:
+            The next tick that can be used after the round.
+        """
+        # Instructions were checked when the round was recorded, so needn't
+        # be again - unless the round is being stamped onto ticks that
+        # already have something on them, or the ticks' parities differ.
+        validate = (tick - self.start) % 2 != 0 or any(
+            tick + offset in circuit.instructions
+            for offset in range(self.length))
+        for kind, offset, instruction, check in self.steps:
+            instruction = instruction.copy()
+            if kind == self.ADD:
+                circuit.add_instruction(tick + offset, instruction, validate)
+            elif kind == self.INITIALISE:
+                circuit.initialise(tick + offset, instruction)
+            else:
+                circuit.measure(instruction, check, round, tick + offset)
+        return tick + self.length
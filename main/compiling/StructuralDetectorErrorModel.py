@@ -0,0 +1,451 @@
+from __future__ import annotations
+
+from functools import lru_cache
+from typing import Dict, List, Tuple, Union
+
+import numpy as np
+import scipy.sparse
+import stim
+
+from main.compiling.NoiseTemplate import NoiseTemplate
+from main.compiling.noise.models.NoiseModel import NoiseModel
+
+# A noise channel: the name and arguments of a noise instruction in a
+# circuit, and the index of the one error (e.g. the Y error of a
+# PAULI_CHANNEL_1) it stands for.
+Channel = Tuple[str, Tuple[float, ...], int]
+
+
+class StructuralDetectorErrorModel:
+    # Noise instructions whose single argument is the probability of a
+    # single error.
+    single_error_gates = {'X_ERROR', 'Y_ERROR', 'Z_ERROR'}
+    # Noise instructions whose arguments are the probabilities of disjoint
+    # Pauli errors - one per non-identity Pauli, in stim's order.
+    pauli_channels = {'PAULI_CHANNEL_1', 'PAULI_CHANNEL_2'}
+
+    def __init__(
+            self,
+            template: NoiseTemplate,
+            layout: List[Union[int, str]],
+            targets: List[str],
+            counts: scipy.sparse.csr_matrix,
+            channels: List[Channel],
+    ):
+        """The detector error model of a noise template's circuit, worked
+        out once, that can then be turned into the detector error model
+        under any noise model of the same shape, without analysing the
+        circuit again. The result can be handed straight to a
+        PymatchingDecoder, or to sinter as a task's detector_error_model.
+
+        Every error mechanism records which noise channels it comes from.
+        A channel is a single error of a noise instruction in the circuit
+        (e.g. the X error of a PAULI_CHANNEL_1), and a mechanism happens
+        whenever an odd number of the errors it's made of do. Under a new
+        noise model, it then happens with probability
+        (1 - prod_i (1 - 2p_i)) / 2 over those errors, as stim works out.
+
+        This is exact, bar two cases, where it's approximate:
+        - Where different errors of the same noise instruction acting on
+          the same qubits have the same symptoms, stim adds their
+          probabilities, rather than combining them as independent
+          errors. This makes a relative difference of around a tenth of
+          the noise strength to the mechanisms concerned.
+        - Where stim decomposes errors with the same symptoms in more than
+          one way, and the errors of the noise instructions involved
+          aren't all equally likely (as they are for depolarising noise).
+        See max_relative_error to check how closely the result matches a
+        freshly generated detector error model.
+
+        Build one with from_noise_template rather than directly.
+
+        Args:
+            template: the noise template the model is of.
+            layout: the lines of the (flattened) model, in order, with
+                each error mechanism replaced by its index.
+            targets: the targets of each error mechanism, as stim writes
+                them.
+            counts: how many errors from each channel (column) make up each
+                error mechanism (row).
+            channels: the noise channel behind each column of counts.
+        """
+        self.template = template
+        self.layout = layout
+        self.targets = targets
+        self.counts = counts
+        self.channels = channels
+
+    @classmethod
+    def from_noise_template(
+            cls, template: NoiseTemplate, **kwargs
+    ) -> StructuralDetectorErrorModel:
+        """Works out the structural detector error model of a noise
+        template's circuit. Takes a few times as long as working out a
+        single detector error model for the circuit directly.
+
+        Args:
+            template: the noise template.
+            kwargs: passed on to stim.Circuit.detector_error_model, e.g.
+                decompose_errors=True and approximate_disjoint_errors=True,
+                as sinter uses for pymatching.
+
+        Returns:
+            The structural detector error model.
+        """
+        # Split every noise instruction into one instruction per error,
+        # tagged with its channel. Stim then tags every error mechanism
+        # with the one channel it came from, rather than merging
+        # mechanisms from different channels, giving exactly how many
+        # errors from each channel have each set of symptoms.
+        channels: Dict[Channel, int] = {}
+        split = cls._split_channels(template.circuit, channels)
+        split_model = split.detector_error_model(
+            **dict(kwargs, decompose_errors=False))
+        channels = list(channels)
+        channel_probabilities = np.array(
+            [args[i] for _, args, i in channels], dtype=float)
+        # Much quicker to read the (exact) text of a large model than to go
+        # through its instructions one by one.
+        symptom_rows: Dict[str, int] = {}
+        rows, columns, probabilities = [], [], []
+        for line in str(split_model.flattened()).splitlines():
+            if line.startswith('error'):
+                tag, probability, targets = cls._parse_error(line)
+                rows.append(symptom_rows.setdefault(
+                    cls._symptoms(targets), len(symptom_rows)))
+                columns.append(tag)
+                probabilities.append(probability)
+        symptom_counts = cls._counts(
+            rows, columns, probabilities,
+            channel_probabilities[np.array(columns, dtype=int)],
+            (len(symptom_rows), len(channels)))
+
+        # Splitting instructions changes how stim decomposes errors though,
+        # so get the error mechanisms from the whole instructions instead,
+        # each tagged with its group of channels. Making every error equally
+        # likely then gives how many errors from each group make up each
+        # mechanism.
+        groups: Dict[Tuple[str, Tuple[float, ...]], int] = {}
+        tagged = cls._tag_groups(
+            template.circuit, groups, template.placeholder_unit)
+        model = tagged.detector_error_model(**kwargs)
+        mechanisms: Dict[str, int] = {}
+        layout = []
+        symptoms = []
+        rows, columns, probabilities = [], [], []
+        for line in str(model.flattened()).splitlines():
+            if not line.startswith('error'):
+                layout.append(line)
+                continue
+            tag, probability, targets = cls._parse_error(line)
+            row = mechanisms.get(targets)
+            if row is None:
+                row = mechanisms[targets] = len(mechanisms)
+                symptoms.append(symptom_rows[cls._symptoms(targets)])
+                layout.append(row)
+            rows.append(row)
+            columns.append(tag)
+            probabilities.append(probability)
+        group_counts = cls._counts(
+            rows, columns, probabilities, template.placeholder_unit,
+            (len(mechanisms), len(groups))).toarray()
+
+        # Each mechanism then gets the errors from each channel with its
+        # symptoms, in proportion to how many of the errors from the
+        # channel's group with those symptoms it gets. Almost always it's
+        # the only mechanism with its symptoms, so gets all of them.
+        symptoms = np.array(symptoms, dtype=int)
+        group_totals = np.zeros((len(symptom_rows), len(groups)))
+        np.add.at(group_totals, symptoms, group_counts)
+        channel_groups = np.array(
+            [groups[name, args] for name, args, _ in channels], dtype=int)
+        counts = symptom_counts[symptoms].tocoo()
+        column_groups = channel_groups[counts.col]
+        counts.data = counts.data * group_counts[counts.row, column_groups] / \
+            group_totals[symptoms[counts.row], column_groups]
+        return cls(template, layout, list(mechanisms), counts.tocsr(), channels)
+
+    @staticmethod
+    def _parse_error(line: str) -> Tuple[int, float, str]:
+        # Splits a line like 'error[3](0.001) D0 D1 ^ D2' into its tag,
+        # probability and targets.
+        instruction, targets = line.split(' ', 1)
+        tag_end = instruction.index(']')
+        return \
+            int(instruction[6:tag_end]), \
+            float(instruction[tag_end + 2:-1]), \
+            targets
+
+    @staticmethod
+    def _counts(
+            rows: List[int],
+            columns: List[int],
+            probabilities: List[float],
+            error_probabilities: Union[np.ndarray, float],
+            shape: Tuple[int, int],
+    ) -> scipy.sparse.csr_matrix:
+        # Stim has XORed together some number of independent errors, each
+        # with the given error probability, to get each of the given
+        # probabilities. Duplicate entries get added together.
+        counts = np.rint(
+            np.log1p(-2 * np.array(probabilities, dtype=float)) /
+            np.log1p(-2 * np.asarray(error_probabilities)))
+        return scipy.sparse.csr_matrix((counts, (rows, columns)), shape=shape)
+
+    @staticmethod
+    def _symptoms(targets: str) -> str:
+        # The detectors and observables an error mechanism flips, however
+        # it's decomposed, as stim would write them.
+        symptoms = set()
+        for target in targets.split():
+            if target != '^':
+                symptoms ^= {target}
+        return ' '.join(sorted(
+            symptoms, key=lambda target: (target[0], int(target[1:]))))
+
+    @classmethod
+    def _split_channels(
+            cls, circuit: stim.Circuit, channels: Dict[Channel, int]
+    ) -> stim.Circuit:
+        split = stim.Circuit()
+        for instruction in circuit:
+            if isinstance(instruction, stim.CircuitRepeatBlock):
+                split.append(stim.CircuitRepeatBlock(
+                    instruction.repeat_count,
+                    cls._split_channels(instruction.body_copy(), channels)))
+                continue
+            name = instruction.name
+            args = tuple(instruction.gate_args_copy())
+            if not cls._is_noise(name, args):
+                split.append(instruction)
+            elif name == 'PAULI_CHANNEL_1':
+                targets = instruction.targets_copy()
+                for i, arg in enumerate(args):
+                    if arg:
+                        split.append(stim.CircuitInstruction(
+                            f'{"XYZ"[i]}_ERROR', targets, [arg],
+                            tag=cls._tag((name, args, i), channels)))
+            elif name == 'PAULI_CHANNEL_2':
+                # There's one E instruction per error per pair of qubits,
+                # which is far quicker for stim to parse than to append one
+                # by one.
+                qubits = [
+                    target.value for target in instruction.targets_copy()]
+                pairs = list(zip(qubits[::2], qubits[1::2]))
+                lines = []
+                for i, arg in enumerate(args):
+                    if arg:
+                        tag = cls._tag((name, args, i), channels)
+                        first, second = cls._pauli_letters(i)
+                        lines.extend(
+                            f'E[{tag}]({arg!r}) ' + ' '.join(
+                                f'{letter}{qubit}'
+                                for letter, qubit in zip(
+                                    (first, second), pair)
+                                if letter != 'I')
+                            for pair in pairs)
+                split += stim.Circuit('\n'.join(lines))
+            else:
+                # The argument is the probability of the one error (e.g.
+                # the result of a noisy measurement being flipped).
+                split.append(stim.CircuitInstruction(
+                    name, instruction.targets_copy(), args,
+                    tag=cls._tag((name, args, 0), channels)))
+        return split
+
+    @classmethod
+    def _tag_groups(
+            cls,
+            circuit: stim.Circuit,
+            groups: Dict[Tuple[str, Tuple[float, ...]], int],
+            probability: float,
+    ) -> stim.Circuit:
+        tagged = stim.Circuit()
+        for instruction in circuit:
+            if isinstance(instruction, stim.CircuitRepeatBlock):
+                tagged.append(stim.CircuitRepeatBlock(
+                    instruction.repeat_count,
+                    cls._tag_groups(
+                        instruction.body_copy(), groups, probability)))
+                continue
+            name = instruction.name
+            args = tuple(instruction.gate_args_copy())
+            if cls._is_noise(name, args):
+                tag = str(groups.setdefault((name, args), len(groups)))
+                tagged.append(stim.CircuitInstruction(
+                    name, instruction.targets_copy(),
+                    [probability if arg else 0.0 for arg in args], tag=tag))
+            else:
+                tagged.append(instruction)
+        return tagged
+
+    @classmethod
+    def _is_noise(cls, name: str, args: Tuple[float, ...]) -> bool:
+        if not any(args) or not stim.gate_data(name).is_noisy_gate:
+            return False
+        if name in cls.single_error_gates | cls.pauli_channels or (
+                stim.gate_data(name).produces_measurements and
+                len(args) == 1):
+            return True
+        raise ValueError(
+            f"Can't build a structural detector error model for a circuit "
+            f"containing {name} instructions. Noise must come from one of "
+            f"{sorted(cls.single_error_gates | cls.pauli_channels)}, or "
+            f"from noisy measurements.")
+
+    @staticmethod
+    def _tag(channel: Channel, channels: Dict[Channel, int]) -> str:
+        return str(channels.setdefault(channel, len(channels)))
+
+    @staticmethod
+    def _pauli_letters(i: int) -> str:
+        # The Paulis on the first and second qubits of the i-th error of a
+        # PAULI_CHANNEL_2, which are ordered IX, IY, IZ, XI, XX, etc.
+        return 'IXYZ'[(i + 1) // 4] + 'IXYZ'[(i + 1) % 4]
+
+    def instantiate(self, noise_model: NoiseModel) -> stim.DetectorErrorModel:
+        """Builds the detector error model of the template's circuit under
+        the given noise model. Takes time linear in the size of the model.
+
+        Args:
+            noise_model: a noise model of the same shape as the one the
+                template was compiled for.
+
+        Returns:
+            The detector error model under the given noise model. Error
+            mechanisms whose probability is now zero are left out, as stim
+            would do.
+        """
+        values = self.template.values(noise_model)
+        independent = {}
+        probabilities = np.empty(len(self.channels))
+        for column, (name, args, i) in enumerate(self.channels):
+            if (name, args) not in independent:
+                independent[name, args] = self.independent_probabilities(
+                    name, [values.get(arg, arg) for arg in args])
+            probabilities[column] = independent[name, args][i]
+        # A channel with probability 1/2 gives log1p(-1) = -inf, which is
+        # what's wanted: any mechanism it contributes to then has
+        # probability exactly 1/2. (The counts are sparse, so there's no
+        # 0 * -inf to worry about.)
+        with np.errstate(divide='ignore'):
+            logs = np.log1p(-2 * probabilities)
+        probabilities = -np.expm1(self.counts @ logs) / 2
+
+        probabilities = probabilities.tolist()
+        lines = []
+        for item in self.layout:
+            if not isinstance(item, int):
+                lines.append(item)
+            elif probabilities[item] > 0:
+                lines.append(
+                    f'error({probabilities[item]!r}) {self.targets[item]}')
+        return stim.DetectorErrorModel('\n'.join(lines))
+
+    @classmethod
+    def independent_probabilities(
+            cls, name: str, args: List[float]
+    ) -> List[float]:
+        """The probability stim gives each error of a noise instruction,
+        when treating them as independent errors (i.e. when generating a
+        detector error model with approximate_disjoint_errors=True).
+
+        Args:
+            name: the name of the noise instruction.
+            args: its arguments.
+
+        Returns:
+            The probability of each of its errors, in the same order as its
+            arguments.
+        """
+        if name not in cls.pauli_channels:
+            return args
+        model = _pauli_channel_circuit(name, args).detector_error_model(
+            approximate_disjoint_errors=True)
+        probabilities = {
+            tuple(instruction.targets_copy()): instruction.args_copy()[0]
+            for instruction in model
+            if instruction.type == 'error'}
+        return [
+            probabilities.get(symptoms, 0.0)
+            for symptoms in _pauli_channel_symptoms(name, len(args))]
+
+    @staticmethod
+    def max_relative_error(
+            model: stim.DetectorErrorModel,
+            reference: stim.DetectorErrorModel,
+    ) -> float:
+        """The largest relative difference between the probability of an
+        error mechanism in a model and in a reference model, e.g. between
+        an instantiated structural detector error model and a detector
+        error model generated by stim for the same circuit. Mechanisms
+        only in one of the models count as a relative difference of 1.
+
+        Args:
+            model: the model to check.
+            reference: the model to check it against.
+
+        Returns:
+            The largest relative difference, or 0 if the models have the
+            same error mechanisms with exactly the same probabilities.
+        """
+        model = StructuralDetectorErrorModel._probabilities(model)
+        reference = StructuralDetectorErrorModel._probabilities(reference)
+        error = 0.0
+        for key in model.keys() | reference.keys():
+            p = model.get(key, 0.0)
+            q = reference.get(key, 0.0)
+            if p != q:
+                error = max(error, abs(p - q) / max(p, q))
+        return error
+
+    @staticmethod
+    def _probabilities(
+            model: stim.DetectorErrorModel
+    ) -> Dict[Tuple[stim.DemTarget, ...], float]:
+        probabilities = {}
+        for instruction in model.flattened():
+            if instruction.type == 'error':
+                key = tuple(instruction.targets_copy())
+                p = probabilities.get(key, 0.0)
+                q, = instruction.args_copy()
+                probabilities[key] = p * (1 - q) + q * (1 - p)
+        return probabilities
+
+
+def _pauli_channel_circuit(name: str, args: List[float]) -> stim.Circuit:
+    # Make each qubit a Pauli channel acts on half of a Bell pair, so that
+    # every one of its errors is detected, each by a different set of
+    # detectors.
+    qubits = 2 if stim.gate_data(name).is_two_qubit_gate else 1
+    halves = list(range(0, 2 * qubits, 2))
+    pairs = [qubit for half in halves for qubit in (half, half + 1)]
+    circuit = stim.Circuit()
+    circuit.append('R', pairs)
+    circuit.append('H', halves)
+    circuit.append('CX', pairs)
+    circuit.append(name, halves, args)
+    circuit.append('CX', pairs)
+    circuit.append('H', halves)
+    circuit.append('M', pairs)
+    for i in range(len(pairs)):
+        circuit.append('DETECTOR', [stim.target_rec(-1 - i)])
+    return circuit
+
+
+@lru_cache(maxsize=None)
+def _pauli_channel_symptoms(
+        name: str, num_args: int
+) -> List[Tuple[stim.DemTarget, ...]]:
+    # The detectors each error of a Pauli channel sets off, in
+    # _pauli_channel_circuit.
+    symptoms = []
+    for i in range(num_args):
+        args = [0.0] * num_args
+        args[i] = 0.1
+        model = _pauli_channel_circuit(name, args).detector_error_model()
+        error, = [
+            instruction for instruction in model
+            if instruction.type == 'error']
+        symptoms.append(tuple(error.targets_copy()))
+    return symptoms
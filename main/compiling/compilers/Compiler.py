@@ -1,5 +1,6 @@
+import copy
 from abc import abstractmethod, ABC
-from typing import List, Dict, Iterable, Union
+from typing import Callable, List, Dict, Iterable, Tuple, Union
 from main.building_blocks.Check import Check
 from main.building_blocks.detectors.Detector import Detector
 from main.building_blocks.detectors.Drum import Drum
@@ -17,6 +18,9 @@ from main.building_blocks.pauli.PauliLetter import PauliLetter
 from main.building_blocks.Qubit import Qubit
 from main.building_blocks.pauli.Pauli import Pauli
 from main.compiling.Circuit import Circuit, RepeatBlock
+from main.compiling.CompilationCache import CompilationCache
+from main.compiling.NoiseTemplate import NoiseTemplate
+from main.compiling.RoundTemplate import RoundTemplate
 from main.compiling.compilers.DetectorInitialiser import DetectorInitialiser
 from main.compiling.noise.models.NoNoise import NoNoise
 from main.compiling.noise.models.NoiseModel import NoiseModel
@@ -102,6 +106,11 @@ class Compiler(ABC):
         self.syndrome_extractor = syndrome_extractor
         self.initialisation_instructions = initialisation_instructions
         self.measurement_instructions = measurement_instructions
+        # Template mode - rather than running the syndrome extractor for
+        # every round, run it once per relative round (i.e. round modulo
+        # the code's schedule length) and stamp out copies of what it
+        # compiled in later rounds.
+        self.use_round_templates = True
 
     def check_validity_of_inputs(
         self,
@@ -174,6 +183,59 @@ class Compiler(ABC):
             observables: 
                 The observables to include in the circuit.
         """
+        return self.compile_to_circuits(
+            code, [total_rounds], initial_states, initial_stabilizers,
+            final_measurements, final_stabilizers, observables)[total_rounds]
+
+    def compile_to_circuits(
+        self,
+        code: Code,
+        total_rounds: Iterable[int],
+        initial_states: Dict[Qubit, State] = None,
+        initial_stabilizers: List[Stabilizer] = None,
+        final_measurements: Union[List[Pauli], Dict[int, List[Pauli]]] = None,
+        final_stabilizers: List[Stabilizer] = None,
+        observables: List[LogicalOperator] = None,
+    ) -> Dict[int, Circuit]:
+        """Compiles circuits for a given code with several different numbers
+        of rounds, in a single pass - e.g. for finding how a circuit's
+        distance grows with the number of rounds.
+
+        Rounds are compiled once, up to the largest number asked for. Each
+        time the circuit reaches one of the other numbers of rounds, a
+        snapshot of it is taken (see Circuit.copy), and the final
+        measurements are added to the snapshot. So the rounds all the
+        circuits have in common are only compiled once, rather than once
+        per circuit. Each circuit is the same as compile_to_circuit would
+        have given for its number of rounds.
+
+        Args are as for compile_to_circuit, except:
+            total_rounds: The numbers of rounds to compile circuits for.
+            final_measurements: As for compile_to_circuit, or a dict giving
+                the final measurements to use for each number of rounds.
+
+        Returns:
+            The circuit for each number of rounds.
+        """
+        branches = self._compile_branches(
+            code, total_rounds, initial_states, initial_stabilizers,
+            final_measurements, final_stabilizers, observables)
+        return {rounds: circuit for rounds, (circuit, _) in branches.items()}
+
+    def _compile_branches(
+        self,
+        code: Code,
+        total_rounds: Iterable[int],
+        initial_states: Union[Dict[Qubit, State], None],
+        initial_stabilizers: Union[List[Stabilizer], None],
+        final_measurements: Union[List[Pauli], Dict[int, List[Pauli]], None],
+        final_stabilizers: Union[List[Stabilizer], None],
+        observables: Union[List[LogicalOperator], None],
+    ) -> Dict[int, Tuple[Circuit, Union[Tick, None]]]:
+        # Does the work for compile_to_circuits, also giving the tick from
+        # which each circuit differs from the one with the most rounds (or
+        # None for that circuit itself) - see Circuit.to_stim_with_branches.
+        total_rounds = sorted(set(total_rounds))
         self.check_validity_of_inputs(
             code, initial_states, initial_stabilizers, final_measurements, final_stabilizers, observables
         )
@@ -183,11 +245,11 @@ class Compiler(ABC):
         initialization_layers = len(initial_detector_schedules)
         # initial_layers is the number of layers in which 'lid-only'
         # detectors exist.
-        if initialization_layers * code.schedule_length > total_rounds:
+        if initialization_layers * code.schedule_length > total_rounds[0]:
             raise ValueError(
                 f"The number of layers required to set up the code is "
                 f"greater than the number of layers to compile!"
-                f"Requested that {total_rounds} round(s) are compiled, but code "
+                f"Requested that {total_rounds[0]} round(s) are compiled, but code "
                 f"seems to take {initialization_layers * code.schedule_length} round(s) to set up.")
 
         # Compile these initial layers.
@@ -196,43 +258,59 @@ class Compiler(ABC):
                 layer, detector_schedule, observables, tick, circuit, code
             )
 
-        # Compile the remaining layers.
+        branches = {}
         round = code.schedule_length * initialization_layers
-        while round < total_rounds:
-            tick = self.compile_round(
-                round,
-                round % code.schedule_length,
-                code.detector_schedule,
+        for rounds in total_rounds:
+            # Compile the remaining layers.
+            while round < rounds:
+                tick = self.compile_round(
+                    round,
+                    round % code.schedule_length,
+                    code.detector_schedule,
+                    observables,
+                    tick,
+                    circuit,
+                    code,
+                )
+                round += 1
+
+            # Finish off a snapshot of the circuit so far, leaving the
+            # circuit itself free to carry on with more rounds. There's no
+            # need to take one for the last circuit. Later rounds start
+            # adding to the circuit from the tick before this one (e.g.
+            # with noise at the start of the round).
+            if rounds == total_rounds[-1]:
+                snapshot, branch_tick = circuit, None
+            else:
+                snapshot, branch_tick = circuit.copy(), tick - 1
+            final = final_measurements.get(rounds) \
+                if isinstance(final_measurements, dict) \
+                else final_measurements
+
+            # For tic-tac-toe codes, which measurements need to be performed at the end depends on the number of rounds.
+            # Only after compilition the at_round function contains the pauli letter of the observable.
+            # That is why we do this here.
+            if final_stabilizers is None and final is None:
+                # We are assuming that there is only one observable in the list.
+                pauli_letter_observable = observables[0].at_round(round-1)[
+                    0].letter.letter
+
+                final = [Pauli(qubit, PauliLetter(pauli_letter_observable))
+                         for qubit in code.data_qubits.values()]
+
+            # Finish with data qubit measurements, and use these to reconstruct
+            # some detectors.
+            self.compile_final_measurements(
+                final,
+                final_stabilizers,
                 observables,
+                round,
                 tick,
-                circuit,
-                code,
-            )
-            round += 1
-
-        # For tic-tac-toe codes, which measurements need to be performed at the end depends on the number of rounds.
-        # Only after compilition the at_round function contains the pauli letter of the observable.
-        # That is why we do this here.
-        if final_stabilizers is None and final_measurements is None:
-            # We are assuming that there is only one observable in the list.
-            pauli_letter_observable = observables[0].at_round(round-1)[
-                0].letter.letter
-
-            final_measurements = [Pauli(qubit, PauliLetter(pauli_letter_observable))
-                                  for qubit in code.data_qubits.values()]
-
-        # Finish with data qubit measurements, and use these to reconstruct
-        # some detectors.
-        self.compile_final_measurements(
-            final_measurements,
-            final_stabilizers,
-            observables,
-            round,
-            tick,
-            circuit,
-            code)
+                snapshot,
+                code)
+            branches[rounds] = (snapshot, branch_tick)
 
-        return circuit
+        return branches
 
     def compile_to_circuit_for_loop(
             self,
@@ -409,16 +487,251 @@ class Compiler(ABC):
         final_measurements: List[Pauli] = None,
         final_stabilizers: List[Stabilizer] = None,
         observables: List[LogicalOperator] = None,
+        compress: bool = False,
+        use_repeat_block: bool = False,
+        cache: CompilationCache = None,
     ) -> stim.Circuit:
-        circuit = self.compile_to_circuit(
-            code=code,
-            total_rounds=total_rounds,
-            initial_states=initial_states,
-            initial_stabilizers=initial_stabilizers,
-            final_measurements=final_measurements,
-            final_stabilizers=final_stabilizers,
-            observables=observables)
-        return (circuit.to_stim(self.noise_model.idling, self.noise_model.resonator_idle))
+        """Compiles a stim circuit for a given code.
+
+        Args are as for compile_to_circuit, plus:
+            compress: Whether to compress the circuit (see Circuit.compress)
+                before translating it to stim.
+            use_repeat_block: If True, the periodic bulk of the circuit
+                (i.e. the rounds after the code has been set up and before
+                the final measurements) is emitted as a single stim REPEAT
+                block. Only a bounded number of rounds is ever compiled, so
+                compile time and memory don't grow with total_rounds. The
+                resulting circuit is equivalent to the unrolled one.
+            cache: If given, the circuit is looked up in this cache rather
+                than compiled, if it's been compiled before with exactly the
+                same inputs. Otherwise it's compiled and stored in the cache.
+        """
+        if cache is not None:
+            key = cache.key(
+                self, code, total_rounds, initial_states, initial_stabilizers,
+                final_measurements, final_stabilizers, observables, compress,
+                use_repeat_block)
+            return cache.circuit(key, lambda: self.compile_to_stim(
+                code, total_rounds, initial_states, initial_stabilizers,
+                final_measurements, final_stabilizers, observables, compress,
+                use_repeat_block))
+
+        def compile_rounds(rounds: int) -> stim.Circuit:
+            circuit = self.compile_to_circuit(
+                code=code,
+                total_rounds=rounds,
+                initial_states=initial_states,
+                initial_stabilizers=initial_stabilizers,
+                final_measurements=final_measurements,
+                final_stabilizers=final_stabilizers,
+                observables=observables)
+            return self._circuit_to_stim(circuit, compress)
+
+        if not use_repeat_block:
+            return compile_rounds(total_rounds)
+        return self._compile_with_repeat_block(
+            compile_rounds, total_rounds, code.schedule_length)
+
+    def compile_to_stims(
+        self,
+        code: Code,
+        total_rounds: Iterable[int],
+        initial_states: Dict[Qubit, State] = None,
+        initial_stabilizers: List[Stabilizer] = None,
+        final_measurements: Union[List[Pauli], Dict[int, List[Pauli]]] = None,
+        final_stabilizers: List[Stabilizer] = None,
+        observables: List[LogicalOperator] = None,
+        compress: bool = False,
+    ) -> Dict[int, stim.Circuit]:
+        """Compiles stim circuits for a given code with several different
+        numbers of rounds, in a single pass - see compile_to_circuits. The
+        rounds the circuits have in common are also only translated to stim
+        once (unless compressing). Each circuit is exactly the one
+        compile_to_stim would have given for its number of rounds.
+
+        Args are as for compile_to_circuits, plus:
+            compress: As for compile_to_stim.
+
+        Returns:
+            The stim circuit for each number of rounds.
+        """
+        branches = self._compile_branches(
+            code, total_rounds, initial_states, initial_stabilizers,
+            final_measurements, final_stabilizers, observables)
+        if compress:
+            # Compressing moves instructions between ticks, so the circuits
+            # no longer share their first ticks, and each has to be
+            # translated in full.
+            return {
+                rounds: self._circuit_to_stim(circuit, compress)
+                for rounds, (circuit, _) in branches.items()}
+        last = max(branches)
+        circuit, _ = branches.pop(last)
+        stim_circuit, stim_circuits = circuit.to_stim_with_branches(
+            branches, self.noise_model.idling, self.noise_model.resonator_idle)
+        stim_circuits[last] = stim_circuit
+        return dict(sorted(stim_circuits.items()))
+
+    def _circuit_to_stim(
+            self, circuit: Circuit, compress: bool) -> stim.Circuit:
+        if compress:
+            # Must happen before idling noise is added in to_stim.
+            circuit, _ = circuit.compress()
+        return circuit.to_stim(
+            self.noise_model.idling, self.noise_model.resonator_idle)
+
+    def compile_noise_template(
+        self,
+        code: Code,
+        total_rounds: int,
+        initial_states: Dict[Qubit, State] = None,
+        initial_stabilizers: List[Stabilizer] = None,
+        final_measurements: List[Pauli] = None,
+        final_stabilizers: List[Stabilizer] = None,
+        observables: List[LogicalOperator] = None,
+        compress: bool = False,
+        use_repeat_block: bool = False,
+    ) -> NoiseTemplate:
+        """Compiles a stim circuit for a given code once, as a template
+        that can then be instantiated under any noise model of the same
+        shape as this compiler's - e.g. for every error rate in a sweep.
+
+        Args are as for compile_to_stim.
+
+        Returns:
+            The template. Calling its instantiate method with a noise model
+            gives the circuit that compile_to_stim would have given had
+            this compiler had that noise model (up to the order in which
+            some noise channels are listed - see NoiseTemplate).
+        """
+        noise_model, placeholders = \
+            NoiseTemplate.with_placeholders(self.noise_model)
+        compiler = copy.copy(self)
+        compiler.noise_model = noise_model
+        circuit = compiler.compile_to_stim(
+            code, total_rounds, initial_states, initial_stabilizers,
+            final_measurements, final_stabilizers, observables, compress,
+            use_repeat_block)
+        return NoiseTemplate(
+            circuit, placeholders, NoiseTemplate.shape_of(self.noise_model))
+
+    # Number of layers of the check schedule to compile when looking for the
+    # period of the bulk of a circuit. Enough to see a few periods of the
+    # logical observables of tic-tac-toe codes, which can take several
+    # layers to return to their original form.
+    repeat_block_probe_layers = 20
+
+    def _compile_with_repeat_block(
+            self,
+            compile_rounds: Callable[[int], stim.Circuit],
+            total_rounds: int,
+            schedule_length: int,
+    ) -> stim.Circuit:
+        """Compiles a circuit whose periodic bulk is a single REPEAT block.
+
+        First compiles a bounded number of rounds and looks for the
+        shortest period (a multiple of the schedule length) after which the
+        stim instructions for each round repeat exactly. If more rounds were
+        requested than were compiled, recompiles with the same number of
+        rounds modulo this period, so that the end of the circuit is the
+        same as it would be for total_rounds. The repeating rounds are then
+        folded into a REPEAT block with enough repetitions to make up
+        total_rounds.
+
+        Args:
+            compile_rounds: Function taking a number of rounds and returning the
+                fully unrolled stim circuit for that many rounds.
+            total_rounds: The number of rounds the circuit should contain.
+            schedule_length: The length of the code's check schedule.
+
+        Returns:
+            The stim circuit, with at most one REPEAT block.
+        """
+        probe_rounds = min(
+            total_rounds, self.repeat_block_probe_layers * schedule_length)
+        circuit = compile_rounds(probe_rounds)
+        rounds = self._split_into_rounds(circuit, probe_rounds)
+        if rounds is None:
+            return circuit if probe_rounds == total_rounds \
+                else compile_rounds(total_rounds)
+        period, start = self._find_period(rounds, schedule_length)
+        if period is None:
+            return circuit if probe_rounds == total_rounds \
+                else compile_rounds(total_rounds)
+
+        # Remove some whole periods from the bulk, so that what's left
+        # still fits in the probe.
+        extra_periods = -(-(total_rounds - probe_rounds) // period)
+        if extra_periods > 0:
+            reduced_rounds = total_rounds - extra_periods * period
+            circuit = compile_rounds(reduced_rounds)
+            rounds = self._split_into_rounds(circuit, reduced_rounds)
+            start = None if rounds is None \
+                else self._find_start(rounds, period)
+            if start is None:
+                # Shouldn't happen, since removing whole periods from the
+                # bulk shouldn't change what each round looks like. But
+                # fall back to the unrolled circuit just in case.
+                return compile_rounds(total_rounds)
+
+        # rounds[-1] holds the final measurements, not a round of checks.
+        repetitions = (len(rounds) - 1 - start) // period
+        body = sum(rounds[start:start + period], stim.Circuit())
+        folded = sum(rounds[:start], stim.Circuit())
+        folded.append(stim.CircuitRepeatBlock(
+            repetitions + extra_periods, body))
+        folded += sum(
+            rounds[start + repetitions * period:], stim.Circuit())
+        return folded
+
+    @staticmethod
+    def _split_into_rounds(
+            circuit: stim.Circuit, total_rounds: int
+    ) -> Union[List[stim.Circuit], None]:
+        """Splits a stim circuit at the end of each round of checks.
+
+        Rounds end with a SHIFT_COORDS instruction. Returns None if the
+        circuit can't be split into total_rounds rounds this way, otherwise
+        a list of total_rounds + 1 circuits - the last holds whatever comes
+        after the final round, e.g. final data qubit measurements.
+        """
+        rounds = [stim.Circuit()]
+        for instruction in circuit:
+            rounds[-1].append(instruction)
+            if instruction.name == 'SHIFT_COORDS':
+                rounds.append(stim.Circuit())
+        return rounds if len(rounds) == total_rounds + 1 else None
+
+    @staticmethod
+    def _find_start(
+            rounds: List[stim.Circuit], period: int
+    ) -> Union[int, None]:
+        """Finds the first round from which all rounds repeat with the
+        given period, up to the final round. Returns None if there aren't
+        at least two whole periods of such rounds.
+        """
+        total_rounds = len(rounds) - 1
+        start = total_rounds - period
+        while start > 0 and rounds[start - 1] == rounds[start - 1 + period]:
+            start -= 1
+        return start if total_rounds - start >= 2 * period else None
+
+    @staticmethod
+    def _find_period(
+            rounds: List[stim.Circuit], schedule_length: int
+    ) -> Tuple[Union[int, None], Union[int, None]]:
+        """Finds the shortest period (a multiple of the schedule length) with
+        which the rounds repeat, and the round from which they do so.
+        Requires at least three whole periods to be seen, so that a period
+        is only accepted if it has actually been seen to repeat.
+        """
+        total_rounds = len(rounds) - 1
+        for period in range(
+                schedule_length, total_rounds // 3 + 1, schedule_length):
+            start = Compiler._find_start(rounds, period)
+            if start is not None and total_rounds - start >= 3 * period:
+                return period, start
+        return None, None
 
     def compile_initialisation(
             self,
@@ -448,6 +761,9 @@ class Compiler(ABC):
         # compilation onto an existing circuit (e.g. in a lattice surgery or
         # gauge fixing protocol),
         circuit = Circuit()
+        # Checks and detectors repeat every schedule_length rounds, so the
+        # measurer can reuse detectors it compiled one period earlier.
+        circuit.measurer.use_templates(code.schedule_length)
         tick = 0
         self.add_ancilla_qubits(code)
 
@@ -633,9 +949,7 @@ class Compiler(ABC):
 
         # First compile the syndrome extraction circuits for the checks.
         checks = code.check_schedule[relative_round]
-        tick = self.syndrome_extractor.extract_checks(
-            checks, round, tick, circuit, self
-        )
+        tick = self.extract_checks(checks, round, relative_round, tick, circuit)
 
         # Next note down any detectors we'll need to compile at this round.
         detectors = detector_schedule[relative_round]
@@ -652,6 +966,43 @@ class Compiler(ABC):
         circuit.end_round(tick - 2)
         return tick
 
+    def extract_checks(
+            self,
+            checks: List[Check],
+            round: int,
+            relative_round: int,
+            tick: int,
+            circuit: Circuit,
+    ) -> Tick:
+        """ Compile the syndrome extraction circuits for one round's checks.
+        In template mode, the syndrome extractor is only run the first time
+        a relative round is compiled; later rounds are copies of that one.
+
+        Args:
+            checks: The checks to measure.
+            round: The round of the code to compile.
+            relative_round: The round relative to the length of the code
+                schedule.
+            tick: The tick to start compiling at.
+            circuit: The circuit to compile to.
+
+        Returns:
+            The tick after the checks have been measured.
+        """
+        if not self.use_round_templates:
+            return self.syndrome_extractor.extract_checks(
+                checks, round, tick, circuit, self)
+
+        template = circuit.round_templates.get(relative_round)
+        if template is None or template.checks is not checks:
+            template = RoundTemplate(circuit, checks, tick)
+            tick = self.syndrome_extractor.extract_checks(
+                checks, round, tick, template, self)
+            template.finish(tick)
+            circuit.round_templates[relative_round] = template
+            return tick
+        return template.stamp(round, tick, circuit)
+
     def add_start_of_round_noise(self, tick: int, circuit: Circuit, code: Code):
         noise = self.noise_model.data_qubit_start_round
         if noise is not None:
@@ -852,7 +1203,15 @@ class Compiler(ABC):
     def compile_final_detectors_from_measurements(
             self, final_checks: Dict[Qubit, Check], round: int, code: Code, add_small_detectors: bool = False):
         final_detectors = []
-        for detector in code.detectors:
+        # Go through the detectors in schedule order, rather than in the
+        # order of the set code.detectors, which depends on where in memory
+        # they happen to live - else the order of the final detectors in
+        # the circuit would change from one compilation to the next.
+        detectors = dict.fromkeys(
+            detector
+            for detectors_at_round in code.detector_schedule
+            for detector in detectors_at_round)
+        for detector in detectors:
 
             # should be round - 1 + n, where n is the number of same measurements that in the regular schedule have been skipped
             # so there are not enough "has open lid"
@@ -23,7 +23,7 @@ import stim
 
 
 class DetectorInitialiser:
-    def __init__(self, code: Code, compiler: Compiler):
+    def __init__(self, code: Code, compiler: Compiler, incremental: bool = True):
         """
         A class for handling the logic around compiling detectors for the
         first round(s) of a code. In the first round(s), checks that are
@@ -44,9 +44,21 @@ class DetectorInitialiser:
             code: the code to be compiled
             compiler: the compiler that will be used to perform the rest of
                 the compilation.
+            incremental: whether to keep a single Stim simulator alive
+                across the initial rounds, feeding it only the ticks added
+                since the previous round. If False, the whole partial circuit
+                is recompiled and replayed into a fresh simulator every
+                round, which makes initialisation quadratic in the number of
+                initial rounds. Both give the same initial detectors.
         """
         self.code = code
         self.compiler = compiler
+        self.incremental = incremental
+        # When simulating incrementally, track the simulator, the circuit it
+        # is simulating, and the first tick it hasn't yet been fed.
+        self._simulator = None
+        self._simulated_circuit = None
+        self._simulated_up_to = 0
         self.stim_pauli_targeters = {
             'X': stim.target_x,
             'Y': stim.target_y,
@@ -168,10 +180,13 @@ class DetectorInitialiser:
         """
         # First peek at the expectation of each potential lid-only
         # detector and see which are deterministic.
-        stim_circuit = circuit.to_stim(
-            idling_noise=None, resonator_idling_noise=None, track_coords=False, track_progress=False)
-        simulator = stim.TableauSimulator()
-        simulator.do(stim_circuit)
+        if self.incremental:
+            simulator = self.advance_simulator(tick, circuit)
+        else:
+            stim_circuit = circuit.to_stim(
+                idling_noise=None, resonator_idling_noise=None, track_coords=False, track_progress=False)
+            simulator = stim.TableauSimulator()
+            simulator.do(stim_circuit)
         round_detectors = self.get_round_detectors(
             round, circuit, simulator)
 
@@ -182,6 +197,33 @@ class DetectorInitialiser:
 
         return round_detectors
 
+    def advance_simulator(
+            self, tick: Tick, circuit: Circuit) -> stim.TableauSimulator:
+        """
+        Bring the persistent simulator up to date with the circuit, by
+        feeding it only the ticks it hasn't yet seen. If the circuit differs
+        from the one last simulated, start again with a fresh simulator.
+
+        Args:
+            tick: the current tick. All ticks strictly before this one are
+                fed into the simulator.
+            circuit: the circuit implementing the code for rounds up to but
+                not including the current round
+
+        Returns:
+            a simulator whose state is that of the circuit just before the
+            given tick.
+        """
+        if self._simulator is None or self._simulated_circuit is not circuit:
+            self._simulator = stim.TableauSimulator()
+            self._simulated_circuit = circuit
+            self._simulated_up_to = 0
+        if tick > self._simulated_up_to:
+            self._simulator.do(
+                circuit.ticks_to_stim(self._simulated_up_to, tick))
+            self._simulated_up_to = tick
+        return self._simulator
+
     def use_stabilizers_as_detectors(
             self, initial_stabilizers: List[Stabilizer], tick: int,
             circuit: Circuit
@@ -1,21 +1,35 @@
-from typing import Callable, List
+from array import array
+from typing import Callable, Iterable, Iterator, List, Tuple, Union
 import stim
 import networkx as nx
 import pymatching
 import numpy as np
 import math
+import scipy.sparse
 
 
 class PymatchingDecoder():
-    def __init__(self, detector_error_model: stim.DetectorErrorModel):
+    def __init__(
+            self,
+            detector_error_model: stim.DetectorErrorModel,
+            use_networkx: bool = False):
         """most of this code is taken from
         https: // github.com/Strilanc/honeycomb-boundaries/blob/main/src/hcb/tools/analysis/decoding.py
 
-        Doesn't work for codes where an error leads to more than 2 symptoms"""
+        Doesn't work for codes where an error leads to more than 2 symptoms
+
+        By default the matching graph is built straight from arrays of
+        edges extracted from the error model. Setting use_networkx to True
+        builds it via an intermediate networkx graph instead, which is
+        much slower for large error models."""
 
         self.detector_error_model = detector_error_model
-        matching_graph = self.detector_error_model_to_nx_graph()
-        self.matcher = self.nx_graph_to_pymatching_graph(matching_graph)
+        if use_networkx:
+            matching_graph = self.detector_error_model_to_nx_graph()
+            self.matcher = self.nx_graph_to_pymatching_graph(matching_graph)
+        else:
+            edges = self.detector_error_model_to_edge_arrays()
+            self.matcher = self.edge_arrays_to_pymatching_graph(*edges)
 
     def eval_model(
             self,
@@ -129,11 +143,204 @@ class PymatchingDecoder():
                        qubit_id=list(range(num_observables)))
         return pymatching.Matching(graph)
 
+    def detector_error_model_to_edge_arrays(
+            self) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+        """Convert a stim error model into arrays describing the edges of
+        its matching graph, without building a graph object.
+
+        Errors with a single symptom become edges to the boundary node,
+        whose index is the number of detectors. Parallel edges are merged
+        the same way as in detector_error_model_to_nx_graph: consecutive
+        errors on the same pair of nodes that flip the same observables
+        have their probabilities combined, while an error that flips
+        different observables replaces whatever came before it.
+
+        Returns:
+            A tuple (nodes_1, nodes_2, probabilities, observables). The
+            first three are 1D arrays with one entry per edge; the last is
+            a 2D bool array with a row per edge saying which observables
+            that edge flips.
+        """
+        num_dets = self.detector_error_model.num_detectors
+        num_obs = self.detector_error_model.num_observables
+        nodes_1, nodes_2, probabilities, flipped_edges, flipped_observables, _ = \
+            self._error_model_edges(self.detector_error_model)
+        nodes_2[nodes_2 == -1] = num_dets
+        observables = np.zeros((len(probabilities), num_obs), dtype=np.bool_)
+        observables[flipped_edges, flipped_observables] = True
+        return self._merge_parallel_edges(
+            nodes_1, nodes_2, probabilities, observables)
+
+    @staticmethod
+    def _error_model_edges(model: stim.DetectorErrorModel) -> Tuple[
+            np.ndarray, np.ndarray, np.ndarray, np.ndarray, np.ndarray, int]:
+        # Returns the edges of the model as arrays (nodes_1, nodes_2,
+        # probabilities), using -1 in nodes_2 for the boundary, plus the
+        # (edge, observable) pairs saying which observables each edge
+        # flips, plus the total detector shift of the model. The body of a
+        # repeat block is only interpreted once; it's then tiled, which is
+        # much cheaper than flattening the model.
+        parts = []
+        # Raw arrays rather than lists, to avoid creating a Python object
+        # per entry.
+        nodes_1 = array('q')
+        nodes_2 = array('q')
+        probabilities = array('d')
+        flipped_edges = array('q')
+        flipped_observables = array('q')
+        det_offset = 0
+
+        def add_edge(p: float, dets: List[int], frames: List[int]):
+            if p == 0 or len(dets) == 0:
+                # See detector_error_model_to_nx_graph.
+                return
+            if len(dets) > 2:
+                raise NotImplementedError(
+                    f"Error with more than 2 symptoms can't become an edge or boundary edge: {dets!r}.")
+            for frame in frames:
+                flipped_edges.append(len(probabilities))
+                flipped_observables.append(frame)
+            nodes_1.append(dets[0])
+            nodes_2.append(dets[1] if len(dets) == 2 else -1)
+            probabilities.append(p)
+
+        def finish_part():
+            parts.append(tuple(
+                np.frombuffer(part, dtype=part.typecode).copy()
+                for part in [nodes_1, nodes_2, probabilities,
+                             flipped_edges, flipped_observables]))
+            for part in [nodes_1, nodes_2, probabilities,
+                         flipped_edges, flipped_observables]:
+                del part[:]
+
+        for instruction in model:
+            if isinstance(instruction, stim.DemRepeatBlock):
+                finish_part()
+                body_1, body_2, body_probabilities, body_flipped_edges, \
+                    body_flipped_observables, shift = \
+                    PymatchingDecoder._error_model_edges(
+                        instruction.body_copy())
+                repetitions = np.arange(instruction.repeat_count)[:, None]
+                shifts = det_offset + shift * repetitions
+                parts.append((
+                    (body_1 + shifts).flatten(),
+                    np.where(body_2 == -1, -1, body_2 + shifts).flatten(),
+                    np.tile(body_probabilities, instruction.repeat_count),
+                    (body_flipped_edges +
+                     len(body_probabilities) * repetitions).flatten(),
+                    np.tile(body_flipped_observables, instruction.repeat_count)))
+                det_offset += shift * instruction.repeat_count
+            elif instruction.type == "error":
+                p = instruction.args_copy()[0]
+                dets: List[int] = []
+                frames: List[int] = []
+                for t in instruction.targets_copy():
+                    if t.is_relative_detector_id():
+                        dets.append(t.val + det_offset)
+                    elif t.is_logical_observable_id():
+                        frames.append(t.val)
+                    elif t.is_separator():
+                        add_edge(p, dets, frames)
+                        dets = []
+                        frames = []
+                add_edge(p, dets, frames)
+            elif instruction.type == "shift_detectors":
+                det_offset += instruction.targets_copy()[0]
+        finish_part()
+
+        # Edges are numbered within each part, so renumber them.
+        edge_offsets = np.cumsum([0] + [len(part[2]) for part in parts])
+        return (
+            np.concatenate([part[0] for part in parts]),
+            np.concatenate([part[1] for part in parts]),
+            np.concatenate([part[2] for part in parts]),
+            np.concatenate([
+                part[3] + offset for part, offset in zip(parts, edge_offsets)]),
+            np.concatenate([part[4] for part in parts]),
+            det_offset)
+
+    @staticmethod
+    def _merge_parallel_edges(
+            nodes_1: np.ndarray,
+            nodes_2: np.ndarray,
+            probabilities: np.ndarray,
+            observables: np.ndarray,
+    ) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+        if len(probabilities) == 0:
+            return nodes_1, nodes_2, probabilities, observables
+        # Group edges by the pair of nodes they join, keeping them in the
+        # order they were declared within each group.
+        num_nodes = max(nodes_1.max(), nodes_2.max()) + 1
+        keys = np.minimum(nodes_1, nodes_2) * num_nodes + \
+            np.maximum(nodes_1, nodes_2)
+        order = np.argsort(keys, kind='stable')
+        keys = keys[order]
+        probabilities = probabilities[order]
+        observables = observables[order]
+        new_key = np.empty(len(keys), dtype=np.bool_)
+        new_key[0] = True
+        np.not_equal(keys[1:], keys[:-1], out=new_key[1:])
+        new_run = new_key.copy()
+        new_run[1:] |= np.any(observables[1:] != observables[:-1], axis=1)
+        # A run is a maximal sequence of consecutive edges in a group that
+        # flip the same observables. Only the last run in each group is
+        # kept, and its probabilities are combined.
+        group_starts = np.flatnonzero(new_key)
+        group_ends = np.append(group_starts[1:], len(keys))
+        run_starts = np.flatnonzero(new_run)
+        run_starts = run_starts[np.append(new_key[run_starts[1:]], True)]
+        groups = np.cumsum(new_key) - 1
+        in_kept_run = np.arange(len(keys)) >= run_starts[groups]
+        # Two independent errors on the same edge combine to flip it with
+        # probability p(1-q) + q(1-p) = (1 - (1-2p)(1-2q)) / 2.
+        flip_factors = np.where(in_kept_run, 1 - 2 * probabilities, 1)
+        merged = (1 - np.multiply.reduceat(flip_factors, group_starts)) / 2
+        # Don't introduce rounding errors where there's nothing to merge.
+        unmerged = group_ends - run_starts == 1
+        merged[unmerged] = probabilities[run_starts[unmerged]]
+        keys = keys[run_starts]
+        return (
+            keys // num_nodes,
+            keys % num_nodes,
+            merged,
+            observables[run_starts])
+
+    def edge_arrays_to_pymatching_graph(
+            self,
+            nodes_1: np.ndarray,
+            nodes_2: np.ndarray,
+            probabilities: np.ndarray,
+            observables: np.ndarray) -> pymatching.Matching:
+        """Convert the output of detector_error_model_to_edge_arrays into a
+        pymatching graph, via a sparse check matrix with a column per edge.
+
+        The boundary node is kept as an explicit node (rather than using
+        pymatching's virtual boundary) so that the matcher has the same
+        nodes as one built by nx_graph_to_pymatching_graph.
+        """
+        num_nodes = self.detector_error_model.num_detectors + 1
+        num_edges = len(probabilities)
+        columns = np.repeat(np.arange(num_edges), 2)
+        rows = np.stack((nodes_1, nodes_2), axis=1).flatten()
+        check_matrix = scipy.sparse.csc_matrix(
+            (np.ones(2 * num_edges, dtype=np.uint8), (rows, columns)),
+            shape=(num_nodes, num_edges))
+        faults_matrix = scipy.sparse.csc_matrix(
+            observables.T.astype(np.uint8), shape=(observables.shape[1], num_edges))
+        matcher = pymatching.Matching()
+        matcher.load_from_check_matrix(
+            check_matrix,
+            weights=np.log((1 - probabilities) / probabilities),
+            error_probabilities=probabilities,
+            faults_matrix=faults_matrix)
+        matcher.set_boundary_nodes({num_nodes - 1})
+        return matcher
+
     def decode_samples(self, samples):
         num_shots = samples.shape[0]
         num_dets = self.detector_error_model.num_detectors
         num_obs = self.detector_error_model.num_observables
-        predictions = np.zeros(shape=(num_shots, num_obs), dtype=np.bool8)
+        predictions = np.zeros(shape=(num_shots, num_obs), dtype=np.bool_)
         for k in range(num_shots):
             expanded_det = np.resize(samples[k], num_dets + 1)
             expanded_det[-1] = 0
@@ -141,3 +348,78 @@ class PymatchingDecoder():
                 expanded_det, num_neighbours=20, )
 
         return predictions
+
+    def decode_batch(self, samples: np.ndarray, bit_packed: bool = False) -> np.ndarray:
+        """Decode a whole batch of shots at once, without looping over shots
+        in Python.
+
+        Args:
+            samples: detection events, as a (shots, detectors) array of
+                bools or 0s and 1s. If bit_packed is True, this should
+                instead be a (shots, ceil(detectors / 8)) array of uint8s,
+                packed in little-endian order as returned by stim's
+                samplers when called with bit_packed=True.
+            bit_packed: whether the samples are bit-packed.
+
+        Returns:
+            A (shots, observables) array of bools, containing the predicted
+            observable flips for each shot.
+        """
+        num_shots = samples.shape[0]
+        num_obs = self.detector_error_model.num_observables
+        shots = self._pad_samples(samples, bit_packed)
+        matched = self.matcher.decode_batch(
+            shots, bit_packed_shots=bit_packed)
+        predictions = np.zeros(shape=(num_shots, num_obs), dtype=np.bool_)
+        num_fault_ids = min(num_obs, matched.shape[1])
+        predictions[:, :num_fault_ids] = matched[:, :num_fault_ids]
+        return predictions
+
+    def decode_batch_in_chunks(
+            self,
+            samples: Union[np.ndarray, Iterable[np.ndarray]],
+            chunk_size: int = 100_000,
+            bit_packed: bool = False) -> Iterator[np.ndarray]:
+        """Stream predictions for batches of shots too large to decode (or
+        even hold in memory) all at once.
+
+        Args:
+            samples: either a single array of shots (e.g. a np.memmap of
+                samples saved to disk), which is then decoded chunk_size
+                shots at a time, or an iterable of such arrays (e.g. a
+                generator that samples from a stim circuit chunk by chunk),
+                each of which is decoded in turn.
+            chunk_size: number of shots to decode at once, if a single
+                array is given. Ignored otherwise.
+            bit_packed: whether the samples are bit-packed. See
+                decode_batch.
+
+        Yields:
+            The predictions for each chunk of shots, in order.
+        """
+        if isinstance(samples, np.ndarray):
+            chunks = (
+                samples[start:start + chunk_size]
+                for start in range(0, samples.shape[0], chunk_size))
+        else:
+            chunks = samples
+        for chunk in chunks:
+            yield self.decode_batch(np.asarray(chunk), bit_packed)
+
+    def _pad_samples(self, samples: np.ndarray, bit_packed: bool) -> np.ndarray:
+        # The matcher can have more detectors than the error model - e.g.
+        # the spandrel node added by nx_graph_to_pymatching_graph - which
+        # must never be flagged.
+        num_dets = self.detector_error_model.num_detectors
+        num_nodes = self.matcher.num_detectors
+        if bit_packed:
+            width = max(math.ceil(num_nodes / 8), samples.shape[1])
+            shots = np.zeros((samples.shape[0], width), dtype=np.uint8)
+            shots[:, :samples.shape[1]] = samples
+            # Clear any padding bits in the last byte of the given samples.
+            if num_dets % 8 != 0:
+                shots[:, num_dets // 8] &= np.uint8((1 << (num_dets % 8)) - 1)
+        else:
+            shots = np.zeros((samples.shape[0], num_nodes), dtype=np.uint8)
+            shots[:, :num_dets] = samples[:, :num_dets]
+        return shots
@@ -0,0 +1,169 @@
+import itertools
+import multiprocessing
+from concurrent.futures import Future, ProcessPoolExecutor, as_completed
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Union
+
+import sinter
+import stim
+
+
+def _compile_task(
+        build_circuit: Callable[..., stim.Circuit],
+        build_detector_error_model: Union[
+            Callable[..., stim.DetectorErrorModel], None],
+        point: Dict[str, Any],
+) -> sinter.Task:
+    # Lives at module level so that it can be run in another process.
+    detector_error_model = None \
+        if build_detector_error_model is None \
+        else build_detector_error_model(**point)
+    return sinter.Task(
+        circuit=build_circuit(**point),
+        detector_error_model=detector_error_model,
+        json_metadata=point)
+
+
+class Sweep:
+    def __init__(
+            self,
+            build_circuit: Callable[..., stim.Circuit],
+            grid: Dict[str, Iterable[Any]],
+            build_detector_error_model: Callable[
+                ..., stim.DetectorErrorModel] = None,
+    ):
+        """A sweep over a grid of parameters (e.g. codes, distances, noise
+        strengths and numbers of rounds), sampled with sinter.
+
+        Circuits are compiled in a pool of processes, and handed to a single
+        sinter collection in the order they finish compiling. (Sinter
+        versions that read their tasks lazily then start sampling as soon
+        as the first circuit is ready; others, like sinter 1.16, read them
+        all first.) Results are appended to a CSV file as they arrive, and
+        a sweep that's run again skips any grid points already finished.
+
+        Args:
+            build_circuit: function that compiles the circuit for one grid
+                point, called with one keyword argument per key of the
+                grid. It's called in other processes, so must be picklable
+                (e.g. defined at module level). See memory_experiment for
+                an example.
+            grid: the values to sweep over, by parameter name. Each grid
+                point is stored as the json_metadata of its sinter task, so
+                values must be JSON-serialisable.
+            build_detector_error_model: optional function that gives the
+                detector error model of the circuit for one grid point,
+                called in the same way as build_circuit, for sinter to use
+                rather than working it out from the circuit itself. See
+                memory_experiment_detector_error_model for an example.
+        """
+        self.build_circuit = build_circuit
+        self.build_detector_error_model = build_detector_error_model
+        self.grid = {key: list(values) for key, values in grid.items()}
+
+    def points(self) -> List[Dict[str, Any]]:
+        """Every point in the grid, as a dict of parameter values."""
+        keys = list(self.grid)
+        return [
+            dict(zip(keys, values))
+            for values in itertools.product(*self.grid.values())]
+
+    def run(
+            self,
+            csv_path: Union[str, Path],
+            num_workers: int,
+            compile_workers: int = None,
+            max_shots: int = None,
+            max_errors: int = None,
+            decoders: Iterable[str] = ('pymatching',),
+            print_progress: bool = False,
+            **collect_kwargs,
+    ) -> List[sinter.TaskStats]:
+        """Compiles and samples every grid point not yet finished.
+
+        Args:
+            csv_path: file in which to save results, in sinter's CSV format.
+                If it already exists, results are appended to it, and grid
+                points whose results in it already reach max_shots or
+                max_errors aren't compiled again. Points with only some
+                results carry on from where they left off.
+            num_workers: number of processes sinter samples with.
+            compile_workers: number of processes to compile circuits with.
+                Defaults to the number of CPUs.
+            max_shots: as for sinter.collect.
+            max_errors: as for sinter.collect.
+            decoders: as for sinter.collect.
+            print_progress: whether to print sinter's progress messages.
+            collect_kwargs: passed on to sinter.iter_collect.
+
+        Returns:
+            All results in csv_path, including any from previous runs.
+        """
+        if max_shots is None and max_errors is None:
+            raise ValueError(
+                "At least one of max_shots and max_errors must be given, "
+                "else sampling would never finish.")
+        csv_path = Path(csv_path)
+        decoders = list(decoders)
+        existing = sinter.read_stats_from_csv_files(csv_path) \
+            if csv_path.exists() else []
+        points = [
+            point for point in self.points()
+            if not self._finished(point, existing, decoders, max_shots, max_errors)]
+        if not points:
+            return existing
+
+        csv_path.parent.mkdir(parents=True, exist_ok=True)
+        write_header = not csv_path.exists() or csv_path.stat().st_size == 0
+        # Spawn rather than fork, as sinter does, so that compilation
+        # processes don't inherit any state from this one.
+        context = multiprocessing.get_context('spawn')
+        with open(csv_path, 'a') as file, ProcessPoolExecutor(
+                compile_workers, mp_context=context) as executor:
+            if write_header:
+                file.write(sinter.CSV_HEADER + '\n')
+                file.flush()
+            futures = [
+                executor.submit(
+                    _compile_task,
+                    self.build_circuit,
+                    self.build_detector_error_model,
+                    point)
+                for point in points]
+            for progress in sinter.iter_collect(
+                    num_workers=num_workers,
+                    tasks=self._compiled_tasks(futures),
+                    hint_num_tasks=len(points),
+                    additional_existing_data=existing,
+                    max_shots=max_shots,
+                    max_errors=max_errors,
+                    decoders=decoders,
+                    **collect_kwargs):
+                for stats in progress.new_stats:
+                    file.write(stats.to_csv_line() + '\n')
+                file.flush()
+                if print_progress:
+                    print(progress.status_message, flush=True)
+
+        return sinter.read_stats_from_csv_files(csv_path)
+
+    @staticmethod
+    def _compiled_tasks(futures: List[Future]) -> Iterator[sinter.Task]:
+        # Each task as soon as it's compiled, whatever order that's in.
+        for future in as_completed(futures):
+            yield future.result()
+
+    @staticmethod
+    def _finished(
+            point: Dict[str, Any],
+            existing: List[sinter.TaskStats],
+            decoders: List[str],
+            max_shots: Union[int, None],
+            max_errors: Union[int, None],
+    ) -> bool:
+        finished_decoders = {
+            stats.decoder for stats in existing
+            if stats.json_metadata == point and (
+                (max_shots is not None and stats.shots >= max_shots) or
+                (max_errors is not None and stats.errors >= max_errors))}
+        return all(decoder in finished_decoders for decoder in decoders)
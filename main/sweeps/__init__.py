@@ -0,0 +1,3 @@
+from .Sweep import Sweep
+from .memory_experiment import memory_experiment, \
+    memory_experiment_detector_error_model
@@ -0,0 +1,125 @@
+from functools import lru_cache
+
+import stim
+
+from main.building_blocks.pauli.Pauli import Pauli
+from main.building_blocks.pauli.PauliLetter import PauliLetter
+from main.codes.RotatedSurfaceCode import RotatedSurfaceCode
+from main.codes.tic_tac_toe.FloquetColourCode import FloquetColourCode
+from main.codes.tic_tac_toe.HoneycombCode import HoneycombCode
+from main.compiling.NoiseTemplate import NoiseTemplate
+from main.compiling.StructuralDetectorErrorModel import \
+    StructuralDetectorErrorModel
+from main.compiling.compilers.AncillaPerCheckCompiler import AncillaPerCheckCompiler
+from main.compiling.noise.models import CircuitLevelNoise
+from main.compiling.syndrome_extraction.controlled_gate_orderers.RotatedSurfaceCodeOrderer import \
+    RotatedSurfaceCodeOrderer
+from main.compiling.syndrome_extraction.extractors.ancilla_per_check.mixed.CxCyCzExtractor import CxCyCzExtractor
+from main.utils.enums import State
+
+codes = {
+    'RotatedSurfaceCode': RotatedSurfaceCode,
+    'HoneycombCode': HoneycombCode,
+    'FloquetColourCode': FloquetColourCode,
+}
+
+
+def memory_experiment(
+        code: str, distance: int, noise: float, rounds: int
+) -> stim.Circuit:
+    """Compiles a Z-basis memory experiment under uniform circuit-level
+    noise. Intended for use with a Sweep, whose grid then has keys 'code',
+    'distance', 'noise' and 'rounds'.
+
+    Each code, distance and number of rounds is only compiled once per
+    process, as a noise template, which is then instantiated with each
+    noise strength asked for.
+
+    Args:
+        code: the name of the code - one of the keys of `codes`.
+        distance: the distance of the code.
+        noise: the strength of every noise channel.
+        rounds: the number of rounds of checks to compile.
+
+    Returns:
+        The compiled stim circuit.
+    """
+    if code not in codes:
+        raise ValueError(
+            f"Unknown code {code}. Expected one of {list(codes)}.")
+    template = _memory_experiment_template(code, distance, rounds)
+    return template.instantiate(_noise_model(noise))
+
+
+def memory_experiment_detector_error_model(
+        code: str, distance: int, noise: float, rounds: int
+) -> stim.DetectorErrorModel:
+    """The detector error model of the circuit memory_experiment compiles,
+    as sinter would work it out for pymatching. Intended for use as a
+    Sweep's build_detector_error_model, alongside memory_experiment.
+
+    Each code, distance and number of rounds is only analysed once per
+    process, as a structural detector error model, which is then
+    instantiated with each noise strength asked for. This is approximate
+    in a few places - see StructuralDetectorErrorModel.
+
+    Args:
+        code: the name of the code - one of the keys of `codes`.
+        distance: the distance of the code.
+        noise: the strength of every noise channel.
+        rounds: the number of rounds of checks to compile.
+
+    Returns:
+        The detector error model.
+    """
+    if code not in codes:
+        raise ValueError(
+            f"Unknown code {code}. Expected one of {list(codes)}.")
+    model = _memory_experiment_structural_model(code, distance, rounds)
+    return model.instantiate(_noise_model(noise))
+
+
+def _noise_model(noise: float) -> CircuitLevelNoise:
+    return CircuitLevelNoise(noise, noise, noise, noise, noise)
+
+
+@lru_cache(maxsize=None)
+def _memory_experiment_template(
+        code: str, distance: int, rounds: int
+) -> NoiseTemplate:
+    code = codes[code](distance)
+    data_qubits = list(code.data_qubits.values())
+    initial_states = {qubit: State.Zero for qubit in data_qubits}
+    # Only the shape of the noise model matters for the template, not the
+    # strength of the noise.
+    noise_model = _noise_model(0.001)
+    if isinstance(code, RotatedSurfaceCode):
+        compiler = AncillaPerCheckCompiler(
+            noise_model, CxCyCzExtractor(RotatedSurfaceCodeOrderer()))
+        final_measurements = [
+            Pauli(qubit, PauliLetter('Z')) for qubit in data_qubits]
+        observables = [code.logical_qubits[0].z]
+    else:
+        compiler = AncillaPerCheckCompiler(noise_model, CxCyCzExtractor())
+        # For tic-tac-toe codes, the compiler figures out the final
+        # measurements itself.
+        final_measurements = None
+        observables = [code.logical_qubits[1].z]
+    return compiler.compile_noise_template(
+        code=code,
+        total_rounds=rounds,
+        initial_states=initial_states,
+        final_measurements=final_measurements,
+        observables=observables)
+
+
+@lru_cache(maxsize=None)
+def _memory_experiment_structural_model(
+        code: str, distance: int, rounds: int
+) -> StructuralDetectorErrorModel:
+    # The same arguments sinter uses to get a detector error model for
+    # pymatching.
+    return StructuralDetectorErrorModel.from_noise_template(
+        _memory_experiment_template(code, distance, rounds),
+        decompose_errors=True,
+        approximate_disjoint_errors=True)
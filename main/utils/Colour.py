@@ -9,6 +9,14 @@ class Colour(NiceRepr):
         self.rgb = rgb
         super().__init__(['name'])
 
+    # Colours are shared constants, compared by identity, so copying one
+    # (e.g. when deep-copying a code) should just give back the same colour.
+    def __copy__(self):
+        return self
+
+    def __deepcopy__(self, memo):
+        return self
+
 
 Red = Colour('red', (255, 0, 0))
 Green = Colour('green', (0, 255, 0))
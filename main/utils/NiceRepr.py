@@ -2,6 +2,10 @@ from typing import List
 
 
 class NiceRepr:
+    # Subclasses can declare __slots__ of their own (plus 'repr_keys') to
+    # avoid every instance carrying a __dict__.
+    __slots__ = ()
+
     def __init__(self, repr_keys: List[str]):
         """Small base class to make it easy to set up nice string
         representations of classes.
@@ -20,7 +24,7 @@ class NiceRepr:
         result = {}
         for key in self.repr_keys:
             parts = key.split('.')
-            item = vars(self)[parts[0]]
+            item = getattr(self, parts[0])
             for part in parts[1:]:
                 item = vars(item)[part] \
                     if hasattr(item, '__dict__') \
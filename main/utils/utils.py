@@ -3,6 +3,8 @@ from statistics import mean
 from typing import List, Tuple, Hashable, Union
 from pathlib import Path
 
+import stim
+
 from main.utils.types import Coordinates
 
 
@@ -128,3 +130,34 @@ def embed_coords(
 
 def coords_length(coords: Coordinates):
     return len(coords) if isinstance(coords, tuple) else 1
+
+
+def stim_circuit_to_text(circuit: stim.Circuit) -> str:
+    """Writes a stim circuit in stim's text format, without losing any
+    precision in instructions' arguments. (str(circuit) rounds them to
+    a handful of significant figures, so can't be used to faithfully
+    store a circuit.)
+    """
+    lines = []
+    for instruction in circuit:
+        if isinstance(instruction, stim.CircuitRepeatBlock):
+            body = stim_circuit_to_text(instruction.body_copy())
+            lines.append(f'REPEAT {instruction.repeat_count} {{')
+            lines.extend(f'    {line}' for line in body.splitlines())
+            lines.append('}')
+            continue
+        # Stim writes targets exactly, but rounds arguments, so write
+        # any arguments out again in full.
+        line = str(instruction)
+        args = instruction.gate_args_copy()
+        if args:
+            # Only newer versions of stim support tags.
+            tag = getattr(instruction, 'tag', '')
+            name = f'{instruction.name}[{tag}]' if tag \
+                else instruction.name
+            rest = line[len(name):]
+            targets = rest[rest.index(')') + 1:]
+            line = name + \
+                '(' + ','.join(repr(arg) for arg in args) + ')' + targets
+        lines.append(line)
+    return '\n'.join(lines) + '\n'
@@ -229,3 +229,18 @@ def test_drum_repr():
             'floor': floor,
             'lid': lid}
         assert str(drum) == str(expected)
+
+
+def test_drum_skips_validation_when_told_to():
+    qubit = Qubit(0)
+    floor = [(-1, Check([Pauli(qubit, PauliLetter('X'))]))]
+    lid = [(0, Check([Pauli(qubit, PauliLetter('Z'))]))]
+    expected_error = "Can't create a Drum where the floor and lid don't"
+    with pytest.raises(ValueError, match=expected_error):
+        _ = Drum(floor, lid, 0)
+    # Products aren't worked out until they're needed if not validating.
+    drum = Drum(floor, lid, 0, validate=False)
+    assert drum._floor_product is None
+    assert drum._lid_product is None
+    assert drum.floor_product.word.word == 'X'
+    assert drum.lid_product.word.word == 'Z'
@@ -0,0 +1,102 @@
+import random
+
+import pytest
+
+from main.building_blocks.Qubit import Qubit
+from main.building_blocks.pauli import Pauli
+from main.building_blocks.pauli.PauliLetter import PauliLetter
+from main.building_blocks.pauli.PauliProduct import PauliProduct
+from main.building_blocks.pauli.QubitIndex import QubitIndex
+from main.building_blocks.pauli.SymplecticPauliProduct import \
+    SymplecticPauliProduct
+from main.building_blocks.pauli.utils import compose
+from tests.building_blocks.pauli.utils_paulis import random_paulis
+from tests.utils.utils_numbers import default_test_repeats_medium
+
+
+def random_overlapping_paulis(num_qubits: int, num_paulis: int):
+    qubits = [Qubit(i) for i in range(num_qubits)]
+    letters = random_paulis(num_paulis, int_coords=True, dimension=1)
+    return [
+        Pauli(random.choice(qubits), pauli.letter) for pauli in letters]
+
+
+def test_qubit_index_indexes_in_order_of_appearance():
+    qubits = [Qubit(i) for i in range(3)]
+    index = QubitIndex([qubits[2], qubits[0]])
+    assert index.index(qubits[0]) == 1
+    assert index.index(qubits[1]) == 2
+    assert index.index(qubits[2]) == 0
+    assert index.qubits == [qubits[2], qubits[0], qubits[1]]
+    assert len(index) == 3
+
+
+def test_symplectic_pauli_product_matches_compose():
+    for _ in range(default_test_repeats_medium):
+        paulis = random_overlapping_paulis(
+            random.randint(1, 10), random.randint(0, 50))
+        product = SymplecticPauliProduct.from_paulis(paulis)
+        assert product.to_pauli_product() == PauliProduct(paulis)
+        # Letters should match exactly; signs only overall.
+        expected = compose(paulis)
+        assert [pauli.qubit for pauli in product.paulis()] == \
+            [pauli.qubit for pauli in expected]
+        assert [pauli.letter.letter for pauli in product.paulis()] == \
+            [pauli.letter.letter for pauli in expected]
+
+
+def test_symplectic_pauli_product_multiplication():
+    for _ in range(default_test_repeats_medium):
+        num_qubits = random.randint(1, 10)
+        left = random_overlapping_paulis(num_qubits, random.randint(0, 20))
+        right = random_overlapping_paulis(num_qubits, random.randint(0, 20))
+        index = QubitIndex()
+        product = \
+            SymplecticPauliProduct.from_paulis(left, index) * \
+            SymplecticPauliProduct.from_paulis(right, index)
+        assert product == SymplecticPauliProduct.from_paulis(
+            left + right, index)
+
+
+def test_symplectic_pauli_product_commutes_with():
+    for _ in range(default_test_repeats_medium):
+        num_qubits = random.randint(1, 10)
+        index = QubitIndex()
+        a = SymplecticPauliProduct.from_paulis(
+            random_overlapping_paulis(num_qubits, 10), index)
+        b = SymplecticPauliProduct.from_paulis(
+            random_overlapping_paulis(num_qubits, 10), index)
+        ab, ba = a * b, b * a
+        assert ab.equal_up_to_sign(ba)
+        assert a.commutes_with(b) == (ab == ba)
+
+
+def test_symplectic_pauli_product_is_hermitian():
+    qubit = Qubit(0)
+    for first in 'IXYZ':
+        for second in 'IXYZ':
+            product = SymplecticPauliProduct.from_paulis([
+                Pauli(qubit, PauliLetter(first)),
+                Pauli(qubit, PauliLetter(second))])
+            expected = 'I' in [first, second] or first == second
+            assert product.is_hermitian == expected
+
+
+def test_symplectic_pauli_product_is_identity():
+    qubit = Qubit(0)
+    paulis = [Pauli(qubit, PauliLetter(letter)) for letter in 'XYZ']
+    # XYZ = i.
+    product = SymplecticPauliProduct.from_paulis(paulis)
+    assert product.sign == 1j
+    assert not product.is_identity
+    product.multiply_by_pauli(Pauli(qubit, PauliLetter('I', -1j)))
+    assert product.is_identity
+
+
+def test_symplectic_pauli_product_fails_on_different_indexes():
+    a = SymplecticPauliProduct.from_paulis([Pauli(Qubit(0), PauliLetter('X'))])
+    b = SymplecticPauliProduct.from_paulis([Pauli(Qubit(0), PauliLetter('X'))])
+    with pytest.raises(ValueError, match="different qubit indexes"):
+        a * b
+    with pytest.raises(ValueError, match="different qubit indexes"):
+        a.commutes_with(b)
@@ -1,3 +1,5 @@
+import copy
+import pickle
 import random
 from statistics import mean
 
@@ -619,3 +621,68 @@ def test_check_repr():
         'paulis': {0: paulis[0], 1: paulis[1]}}
     assert str(check) == str(expected)
 
+
+
+def test_check_skips_validation_when_told_to():
+    # Paulis whose product isn't Hermitian don't make a valid check...
+    qubits = [Qubit(0), Qubit(1)]
+    paulis = [
+        Pauli(qubits[0], PauliLetter('X', 1j)),
+        Pauli(qubits[1], PauliLetter('Z'))]
+    with pytest.raises(ValueError):
+        _ = Check(paulis)
+    # ... but aren't checked if validation is turned off.
+    check = Check(paulis, validate=False)
+    assert check.weight == 2
+    assert not check.product.is_hermitian
+
+
+def test_check_product_same_with_and_without_validation():
+    for _ in range(default_test_repeats_medium):
+        dimension = random.randint(1, 10)
+        max_paulis = random.randint(1, 10)
+        num_paulis = min(max_paulis, default_max_unique_sample_size(dimension))
+        paulis = random_paulis(
+            num_paulis,
+            unique_qubits=True,
+            int_coords=True,
+            dimension=dimension,
+            from_letters=['X', 'Y', 'Z'],
+            from_signs=[1, -1])
+        validated = Check(paulis)
+        trusted = Check(paulis, validate=False)
+        assert trusted == validated
+        assert hash(trusted) == hash(validated)
+        assert trusted.product == validated.product
+        assert trusted.product.word == validated.product.word
+
+
+def test_check_hash_changes_when_anchor_or_colour_changes():
+    qubits = [Qubit(0), Qubit(1)]
+    paulis = [Pauli(qubits[0], PauliLetter('X')), Pauli(qubits[1], PauliLetter('X'))]
+    check = Check(paulis, anchor=0)
+    other = Check(paulis, anchor=0)
+    assert hash(check) == hash(other)
+    # The frozen Paulis are remembered, but anchors and colours are read
+    # afresh, since some codes move their checks.
+    check.anchor = 1
+    other.anchor = 1
+    assert hash(check) == hash(other)
+    assert hash(check) != hash(Check(paulis, anchor=0))
+    check.colour = random_colour()
+    assert hash(check) != hash(other)
+    other.colour = check.colour
+    assert hash(check) == hash(other)
+
+
+def test_check_hash_not_kept_by_copies():
+    qubits = [Qubit(0), Qubit(1)]
+    paulis = [Pauli(qubits[0], PauliLetter('X')), Pauli(qubits[1], PauliLetter('X'))]
+    check = Check(paulis, anchor=0)
+    hash(check)
+    # Copies have new qubits, so must work out their own hashes.
+    for copied in [copy.deepcopy(check), pickle.loads(pickle.dumps(check))]:
+        rebuilt = Check(list(copied.paulis.values()), anchor=0)
+        assert copied == rebuilt
+        assert hash(copied) == hash(rebuilt)
+        assert rebuilt in {copied}
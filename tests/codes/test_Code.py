@@ -9,6 +9,7 @@ from main.building_blocks.logical.LogicalQubit import LogicalQubit
 from main.building_blocks.pauli import Pauli
 from main.building_blocks.pauli.PauliLetter import PauliLetter
 from main.codes.Code import Code
+from tests.building_blocks.utils_checks import specific_check
 
 
 def test_code_fails_if_no_data_qubits():
@@ -137,7 +138,9 @@ def test_code_set_schedules_detectors_auto_created_when_expected(
     check_schedule = [checks]
 
     # Mock up a Drum constructor so we can check it gets called correctly.
-    mock_drum_init = mocker.Mock(return_value=None)
+    drum = mocker.Mock(spec=Drum)
+    drum.timed_checks = []
+    mock_drum_init = mocker.Mock(return_value=drum)
     monkeypatch.setattr('main.codes.Code.Drum', mock_drum_init)
 
     code = Code([])
@@ -148,7 +151,7 @@ def test_code_set_schedules_detectors_auto_created_when_expected(
         for check in checks]
     mock_drum_init.assert_has_calls(expected_calls)
 
-    assert code.detector_schedule == [[None for _ in checks]]
+    assert code.detector_schedule == [[drum for _ in checks]]
 
 
 def test_code_set_schedules_fails_if_schedule_lengths_differ(
@@ -199,6 +202,69 @@ def test_code_set_schedules_fails_if_detector_contains_unknown_check(
         code.set_schedules(check_schedule, detector_schedule)
 
 
+def test_code_set_schedules_creates_detectors_lazily_when_given_function(
+        mocker: MockerFixture, monkeypatch: MonkeyPatch):
+    monkeypatch.setattr(
+        Code, '_assert_data_qubits_valid', mocker.Mock(return_value=True))
+    monkeypatch.setattr(
+        Code, '_assert_check_schedule_valid', mocker.Mock(return_value=True))
+    mock_assert_detector_schedule_valid = mocker.Mock(return_value=True)
+    monkeypatch.setattr(
+        Code, '_assert_detector_schedule_valid',
+        mock_assert_detector_schedule_valid)
+
+    checks = [mocker.Mock(spec=Check) for _ in range(3)]
+    detectors = [mocker.Mock(spec=Drum) for _ in range(3)]
+    for detector in detectors:
+        detector.timed_checks = []
+    check_schedule = [checks, checks]
+    detector_schedule = [detectors[:1], detectors[1:]]
+    create_detector_schedule = mocker.Mock(return_value=detector_schedule)
+
+    code = Code([])
+    code.set_schedules(check_schedule, create_detector_schedule)
+    # Detectors shouldn't be created (or validated) until they're needed...
+    create_detector_schedule.assert_not_called()
+    mock_assert_detector_schedule_valid.assert_not_called()
+    assert code.schedule_length == 2
+
+    # ... and then only once.
+    assert code.detectors == set(detectors)
+    assert code.detector_schedule == detector_schedule
+    create_detector_schedule.assert_called_once_with()
+    mock_assert_detector_schedule_valid.assert_called_once_with(
+        detector_schedule)
+
+
+def test_code_set_schedules_assigns_ids(
+        mocker: MockerFixture, monkeypatch: MonkeyPatch):
+    monkeypatch.setattr(
+        Code, '_assert_data_qubits_valid', mocker.Mock(return_value=True))
+    monkeypatch.setattr(
+        Code, '_assert_check_schedule_valid', mocker.Mock(return_value=True))
+    monkeypatch.setattr(
+        Code, '_assert_detector_schedule_valid',
+        mocker.Mock(return_value=True))
+
+    check_1 = specific_check(['X', 'X'])
+    check_2 = specific_check(['Z', 'Z'])
+    # Equal to check_2, so should get the same id.
+    check_3 = Check(list(check_2.paulis.values()))
+    check_schedule = [[check_1, check_2], [check_1]]
+    create_detector_schedule = mocker.Mock(return_value=[
+        [Drum([(-2, check_1)], [(0, check_3)], 0, validate=False)],
+        [Drum([(-1, check_2)], [(0, check_1)], 1, validate=False)]])
+
+    code = Code([])
+    code.set_schedules(check_schedule, create_detector_schedule)
+    assert (check_1.check_id, check_2.check_id) == (0, 1)
+    # Detectors, and any checks only they use, get ids once they're made.
+    assert check_3.check_id is None
+    assert sorted(
+        detector.detector_id for detector in code.detectors) == [0, 1]
+    assert check_3.check_id == 1
+
+
 def test_code_attributes_all_initialised(mocker: MockerFixture, monkeypatch: MonkeyPatch):
     # Assume all validations pass
     monkeypatch.setattr(
@@ -211,6 +277,8 @@ def test_code_attributes_all_initialised(mocker: MockerFixture, monkeypatch: Mon
     data_qubits = [mocker.Mock(spec=Qubit) for _ in range(3)]
     checks = [mocker.Mock(spec=Check) for _ in range(3)]
     detectors = [mocker.Mock(spec=Drum) for _ in range(3)]
+    for detector in detectors:
+        detector.timed_checks = []
 
     schedule_length = 2
     check_schedule = [checks for _ in range(schedule_length)]
@@ -0,0 +1,90 @@
+from main.building_blocks.pauli.utils import compose
+from main.codes.tic_tac_toe.FloquetColourCode import FloquetColourCode
+from main.codes.tic_tac_toe.HoneycombCode import HoneycombCode
+from main.codes.tic_tac_toe.gauge.GaugeFloquetColourCode import GaugeFloquetColourCode
+
+
+def codes():
+    return [
+        HoneycombCode(4),
+        HoneycombCode(8),
+        FloquetColourCode(8),
+        GaugeFloquetColourCode(4, [2, 3])]
+
+
+def operators(code):
+    return [
+        operator
+        for logical_qubit in code.logical_qubits
+        for operator in [logical_qubit.x, logical_qubit.z]
+        if operator is not None]
+
+
+def test_tic_tac_toe_logical_operator_is_consistent_with_checks_multiplied_in():
+    # At every round, the operator should be exactly the previous operator
+    # multiplied by whatever checks were multiplied in - including long
+    # after it's started being looked up modulo its period.
+    for code in codes():
+        for operator in operators(code):
+            for round in list(range(300)) + [1000, 5001]:
+                checks = operator.update(round)
+                paulis = [
+                    pauli for check in checks
+                    for pauli in check.paulis.values()]
+                expected = compose(
+                    paulis + operator.at_round(round - 1),
+                    identities_removed=True)
+                assert operator.at_round(round) == expected
+
+
+def test_tic_tac_toe_logical_operator_random_access():
+    # Asking for a far away round first should give the same answers as
+    # stepping through every round in order. (Qubits are only equal to
+    # themselves, so compare the two codes' operators by their reprs.)
+    for code, other_code in zip(codes(), codes()):
+        for operator, other in zip(operators(code), operators(other_code)):
+            far = other.at_round(10001)
+            for round in range(10002):
+                operator.update(round)
+            assert repr(operator.at_round(10001)) == repr(far)
+            assert repr(operator.at_round(-1)) == repr(other.at_round(-1))
+            for round in [0, 17, 500, 10001]:
+                assert repr(operator.at_round(round)) == \
+                    repr(other.at_round(round))
+                assert repr(operator.update(round)) == \
+                    repr(other.update(round))
+
+
+def test_tic_tac_toe_logical_operator_memory_stays_flat():
+    code = HoneycombCode(8)
+    operator = code.logical_qubits[0].x
+    operator.at_round(100)
+    assert operator.period is not None
+    stored = len(operator._at_round)
+    for round in range(20000):
+        operator.update(round)
+    operator.at_round(10**6)
+    assert len(operator._at_round) == stored
+    assert len(operator._checks_at_round) == stored - 1
+    position_period = operator.schedule_position(-1) + 1
+    assert operator.period % position_period == 0
+
+
+def test_tic_tac_toe_logical_operator_multiplies_in_all_intersecting_checks():
+    # Looking checks up by qubit should find exactly the checks that
+    # asking every check whether it intersects the operator would.
+    for code in codes():
+        for operator in operators(code):
+            for round in range(100):
+                checks = operator.update(round)
+                if not checks:
+                    continue
+                ungauged_round = operator.round_to_ungauged_round(round)
+                check_type = operator.logical_qubit.code.tic_tac_toe_route[
+                    ungauged_round % operator.logical_qubit.code.schedule_length]
+                expected = [
+                    check
+                    for check in operator.logical_qubit.code.checks_by_type[check_type]
+                    if operator.intersects(check, round) and not (
+                        operator.is_vertical and operator.is_horizontal(check))]
+                assert checks == expected
@@ -1,6 +1,8 @@
+import json
 from typing import List, Literal
 from main.building_blocks.detectors.Stabilizer import Stabilizer
 from main.codes.tic_tac_toe.gauge.GaugeFloquetColourCode import GaugeFloquetColourCode
+from main.codes.tic_tac_toe.gauge.GaugeTicTacToeCode import load_timelike_distance_data
 from main.compiling.compilers.AncillaPerCheckCompiler import AncillaPerCheckCompiler
 from main.compiling.compilers.NativePauliProductMeasurementsCompiler import NativePauliProductMeasurementsCompiler
 from main.compiling.noise.models import EM3
@@ -245,3 +247,40 @@ def test_get_number_of_rounds_for_stability_experiment(gauge_factors):
                 gauge_factors, r-1, 4, 'stability_x', noise_model)
             x_circ_dist = circ_distance(circuit)
             assert z_circ_dist < distance or x_circ_dist < distance
+
+
+def linear_search_for_rounds(code, desired_distance, letters, noise_model):
+    # The straightforward way of finding the number of rounds needed.
+    n_rounds = len(code.tic_tac_toe_route)
+    while any(
+            code.get_timelike_distance(n_rounds, letter, noise_model) < desired_distance
+            for letter in letters):
+        n_rounds += 1
+    return n_rounds
+
+
+@pytest.mark.parametrize("gauge_factors", [[1, 3], [3, 1], [2, 2], [1, 1], [3, 2]])
+def test_get_minimum_rounds_for_timelike_distance_matches_linear_search(gauge_factors):
+    code = GaugeFloquetColourCode(4, gauge_factors)
+    for noise_model in code.timelike_distance_data_files:
+        for letters in [['X'], ['Z'], ['X', 'Z']]:
+            for distance in range(1, 25):
+                assert code.get_minimum_rounds_for_timelike_distance(distance, letters, noise_model) == \
+                    linear_search_for_rounds(code, distance, letters, noise_model)
+
+
+def test_timelike_distance_data_only_loaded_once(mocker):
+    load_timelike_distance_data.cache_clear()
+    spy = mocker.spy(json, 'load')
+    code = GaugeFloquetColourCode(4, [2, 2])
+    for n_rounds in range(12, 100):
+        code.get_timelike_distance(n_rounds, 'X', 'EM3')
+    code.get_number_of_rounds_for_timelike_distance(20, noise_model='EM3')
+    GaugeFloquetColourCode(4, [1, 1]).get_timelike_distance(12, 'Z', 'EM3')
+    assert spy.call_count == 1
+
+
+def test_get_timelike_distance_fails_on_unknown_noise_model():
+    code = GaugeFloquetColourCode(4, [1, 1])
+    with pytest.raises(ValueError, match="No timelike distance data"):
+        code.get_timelike_distance(12, 'X', 'phenomenological')
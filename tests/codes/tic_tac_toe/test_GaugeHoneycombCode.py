@@ -202,3 +202,17 @@ def test_get_number_of_rounds_for_stability_experiment_graphlike(gauge_factors,
 
     assert get_graphlike_distance(
         circ_x_short) < timelike_distance or get_graphlike_distance(circ_z_short) < timelike_distance
+
+
+@pytest.mark.parametrize("gauge_factors", [[1, 1, 1], [1, 2, 1], [2, 2, 2], [2, 1, 2], [3, 1, 2]])
+def test_get_number_of_rounds_for_single_timelike_distance_is_minimal(gauge_factors):
+    code = GaugeHoneycombCode(4, gauge_factors)
+    for noise_model in code.timelike_distance_data_files:
+        for letter in ['X', 'Z']:
+            for distance in range(1, 20):
+                rounds = code.get_number_of_rounds_for_single_timelike_distance(
+                    distance, letter, noise_model)
+                assert code.get_timelike_distance(rounds, letter, noise_model) >= distance
+                assert all(
+                    code.get_timelike_distance(r, letter, noise_model) < distance
+                    for r in range(len(code.tic_tac_toe_route), rounds))
@@ -1,4 +1,10 @@
+import copy
 import random
+from main.building_blocks.Check import Check
+from main.building_blocks.detectors.Drum import Drum
+from main.codes.tic_tac_toe.gauge.GaugeHoneycombCode import GaugeHoneycombCode
+from main.codes.tic_tac_toe.FloquetColourCode import FloquetColourCode
+from main.codes.tic_tac_toe.HoneycombCode import HoneycombCode
 from main.codes.tic_tac_toe.TicTacToeCode import TicTacToeCode
 from main.utils.Colour import Red, Green, Blue
 from main.building_blocks.pauli.PauliLetter import PauliLetter
@@ -252,3 +258,47 @@ def test_get_init_logical_qubits():
 #
 # def test_create_detectors():
 #     assert False
+
+
+def test_index_checks_by_qubit():
+    for code in [HoneycombCode(4), FloquetColourCode(8)]:
+        index = code.check_indices_by_qubit
+        assert set(index) == set(code.checks_by_type)
+        for check_type, checks in code.checks_by_type.items():
+            for qubit in code.data_qubits.values():
+                expected = [
+                    i for i, check in enumerate(checks)
+                    if any(pauli.qubit == qubit for pauli in check.paulis.values())]
+                assert index[check_type].get(qubit, []) == expected
+
+
+def test_checks_and_detectors_built_without_validation_are_valid():
+    # Codes build their checks and detectors without validating them, for
+    # speed - so check here that they would all pass validation.
+    codes = [
+        HoneycombCode(4),
+        FloquetColourCode(4),
+        GaugeHoneycombCode(4, [2, 3, 2])]
+    for code in codes:
+        for check in code.checks:
+            validated = Check(check.paulis, check.anchor, check.colour)
+            assert validated == check
+            assert validated.product == check.product
+        for detectors in code.detector_schedule:
+            for drum in detectors:
+                validated = Drum(drum.floor, drum.lid, drum.end, drum.anchor)
+                assert validated.product == drum.product
+
+
+def test_detectors_only_created_when_needed():
+    code = GaugeHoneycombCode(4, [2, 3, 2])
+    # Neither the gauge code's detectors nor those of the ungauged code it
+    # builds on should have been created yet.
+    assert code._create_detector_schedule is not None
+    assert code.ungauged_code._create_detector_schedule is not None
+    # Copies of the code should create the same detectors as the original.
+    copied = copy.deepcopy(code)
+    assert [len(detectors) for detectors in copied.detector_schedule] == \
+        [len(detectors) for detectors in code.detector_schedule]
+    assert code._create_detector_schedule is None
+    assert code.ungauged_code._create_detector_schedule is not None
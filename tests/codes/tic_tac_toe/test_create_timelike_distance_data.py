@@ -0,0 +1,113 @@
+import json
+
+import pytest
+from pytest_mock import MockerFixture
+
+from main.codes.tic_tac_toe.gauge import create_timelike_distance_data
+from main.codes.tic_tac_toe.gauge.create_timelike_distance_data import \
+    generate_data, generate_circuit, generate_circuits, get_distance, \
+    get_distances, get_bulk_length
+
+
+def fake_distance(gauge_factors, rounds, letter, noise_model, graphlike, code_name, cache_dir=None):
+    # Something that depends on every input, so we can tell results apart.
+    return rounds // sum(gauge_factors) + (letter == 'Z') + len(noise_model)
+
+
+def failing_distance(*args, **kwargs):
+    raise AssertionError("Shouldn't need to compute any distances!")
+
+
+def expected_data(code, noise_model):
+    # Mirrors the way this data has always been built: the bulk timelike
+    # distance from circuits of one and two bulk lengths, and the boundary
+    # one from each offset in between.
+    data = {"X": {}, "Z": {}}
+    for gauge_factors in create_timelike_distance_data.get_gauge_factor_combinations(code):
+        for letter in ["X", "Z"]:
+            bulk_length = get_bulk_length(code, gauge_factors)
+
+            def distance(rounds):
+                return fake_distance(
+                    gauge_factors, rounds, letter, noise_model, True, code)
+
+            data[letter][str(gauge_factors)] = {
+                "td_bulk": distance(2*bulk_length) - distance(bulk_length),
+                "td_boundary": {
+                    i: distance(bulk_length + i) for i in range(bulk_length)}}
+    return data
+
+
+@pytest.mark.parametrize("workers", [1, 2])
+def test_generate_data(workers, tmp_path, mocker: MockerFixture):
+    mocker.patch.object(
+        create_timelike_distance_data, 'get_distance', fake_distance)
+    code = 'GaugeFloquetColourCode'
+    checkpoint_path = tmp_path / 'checkpoint.json'
+    data = generate_data(
+        'phenomenological', code, workers=workers,
+        checkpoint_path=checkpoint_path)
+    expected = expected_data(code, 'phenomenological')
+    assert json.dumps(data, indent=4) == json.dumps(expected, indent=4)
+
+    # Running again should resume entirely from the checkpoint.
+    mocker.patch.object(
+        create_timelike_distance_data, 'get_distance', failing_distance)
+    resumed = generate_data(
+        'phenomenological', code, workers=workers,
+        checkpoint_path=checkpoint_path)
+    assert resumed == data
+
+
+def test_generate_data_resumes_partial_checkpoint(tmp_path, mocker: MockerFixture):
+    code = 'GaugeFloquetColourCode'
+    checkpoint_path = tmp_path / 'checkpoint.json'
+    mocker.patch.object(
+        create_timelike_distance_data, 'get_distance', fake_distance)
+    generate_data(
+        'phenomenological', code, checkpoint_path=checkpoint_path)
+    with open(checkpoint_path) as file:
+        distances = json.load(file)
+    # Forget half the distances, as if the run had been interrupted.
+    keys = sorted(distances)
+    partial = {key: distances[key] for key in keys[::2]}
+    with open(checkpoint_path, 'w') as file:
+        json.dump(partial, file)
+
+    spy = mocker.spy(create_timelike_distance_data, 'get_distance')
+    data = generate_data(
+        'phenomenological', code, checkpoint_path=checkpoint_path)
+    assert spy.call_count == len(keys) - len(partial)
+    assert data == expected_data(code, 'phenomenological')
+
+
+def test_get_distance():
+    # Agrees with the stored data for the gauge FCC with gauge factors
+    # (1, 1), whose bulk length is 12.
+    distances = [
+        get_distance(
+            (1, 1), rounds, 'X', 'phenomenological', True,
+            'GaugeFloquetColourCode')
+        for rounds in [12, 24]]
+    assert distances == [3, 6]
+
+
+def test_get_distances():
+    assert get_distances(
+        (1, 1), [12, 24], 'X', 'phenomenological', True,
+        'GaugeFloquetColourCode') == {12: 3, 24: 6}
+
+
+@pytest.mark.parametrize("code_name, gauge_factors, letter", [
+    ('GaugeFloquetColourCode', (1, 2), 'X'),
+    ('GaugeHoneycombCode', (1, 2, 1), 'Z')])
+def test_generate_circuits(code_name, gauge_factors, letter):
+    # Each number of rounds needs different final measurements, so this
+    # checks they're taken per number of rounds.
+    rounds = [18, 19, 21, 24]
+    circuits = generate_circuits(
+        gauge_factors, rounds, 4, letter, 'phenomenological', code_name)
+    assert list(circuits) == rounds
+    for r in rounds:
+        assert circuits[r] == generate_circuit(
+            gauge_factors, r, 4, letter, 'phenomenological', code_name)
@@ -21,6 +21,7 @@ from main.compiling.compilers.AncillaPerCheckCompiler import AncillaPerCheckComp
 from main.QPUs.SquareLatticeQPU import SquareLatticeQPU
 from main.codes.RepetitionCode import RepetitionCode
 from main.codes.RotatedSurfaceCode import RotatedSurfaceCode
+from main.codes.tic_tac_toe.HoneycombCode import HoneycombCode
 from main.compiling.compilers.Compiler import Compiler
 from main.compiling.compilers.DetectorInitialiser import DetectorInitialiser
 from main.compiling.noise.models import CircuitLevelNoise, CodeCapacityBitFlipNoise, PhenomenologicalNoise
@@ -451,6 +452,7 @@ def test_compiler_compile_initialisation_adds_ancilla_qubits(
 
     # Set up data to pass to method
     code = mocker.Mock(spec=Code)
+    code.schedule_length = 1
     code.data_qubits = {}
     initial_states = {}
     initial_stabilizers = None
@@ -473,6 +475,7 @@ def test_compiler_compile_initialisation_gets_initial_states_if_stabilizers_give
 
     # Pass 'None' as initial states: instead use a list of stabilizers
     code = mocker.Mock(spec=Code)
+    code.schedule_length = 1
     code.data_qubits = {}
     initial_states = None
     initial_stabilizers = []
@@ -497,6 +500,7 @@ def test_compiler_compile_initialisation_raises_error_if_initial_states_wrong(
         mocker.Mock(return_value=detector_initialiser))
 
     code = mocker.Mock(spec=Code)
+    code.schedule_length = 1
     # Make initial states different to code's data qubits
     code.data_qubits = {0: Qubit(0)}
     initial_states = {}
@@ -519,6 +523,7 @@ def test_compiler_compile_initialisation_initialises_qubits(
     compiler.initialize_qubits = mocker.Mock()
     detector_initialiser = mocker.Mock(spec=DetectorInitialiser)
     circuit = mocker.Mock(spec=Circuit)
+    circuit.measurer = mocker.Mock(spec=Measurer)
     monkeypatch.setattr(
         'main.compiling.compilers.Compiler.DetectorInitialiser',
         mocker.Mock(return_value=detector_initialiser))
@@ -527,6 +532,7 @@ def test_compiler_compile_initialisation_initialises_qubits(
         mocker.Mock(return_value=circuit))
 
     code = mocker.Mock(spec=Code)
+    code.schedule_length = 1
     code.data_qubits = {}
     initial_states = {}
     initial_stabilizers = None
@@ -549,6 +555,7 @@ def test_compiler_compile_initialisation_gets_initial_detectors(
 
     # Set up data to pass to method
     code = mocker.Mock(spec=Code)
+    code.schedule_length = 1
     code.data_qubits = {}
     initial_states = {}
     initial_stabilizers = None
@@ -578,12 +585,14 @@ def test_compiler_compile_initialisation_returns_correct_data(
         mocker.Mock(return_value=detector_initialiser))
 
     circuit = mocker.Mock(spec=Circuit)
+    circuit.measurer = mocker.Mock(spec=Measurer)
     monkeypatch.setattr(
         'main.compiling.compilers.Compiler.Circuit',
         mocker.Mock(return_value=circuit))
 
     # Set up data to pass to method
     code = mocker.Mock(spec=Code)
+    code.schedule_length = 1
     code.data_qubits = {}
     initial_states = {}
     initial_stabilizers = None
@@ -819,6 +828,7 @@ def test_compiler_compile_round_adds_start_of_round_noise(
     # Add some mock data, as well as mock methods on them
     circuit = mocker.Mock(spec=Circuit)
     circuit.measurer = mocker.Mock(spec=Measurer)
+    circuit.round_templates = {}
     circuit.measurer.add_detectors = mocker.Mock
 
     code = mocker.Mock(spec=Code)
@@ -875,7 +885,9 @@ def test_compiler_compile_round_calls_extract_checks_correctly(
     relative_round = round % code.schedule_length
     observables = None
 
-    # Call the method!
+    # Call the method! Not in template mode, in which the extractor compiles
+    # onto a RoundTemplate rather than straight onto the circuit.
+    compiler.use_round_templates = False
     compiler.compile_round(
         round, relative_round, detector_schedule, observables, tick, circuit, code)
 
@@ -883,6 +895,40 @@ def test_compiler_compile_round_calls_extract_checks_correctly(
         code.check_schedule[relative_round], round, tick, circuit, compiler)
 
 
+def test_compiler_extract_checks_runs_extractor_once_per_relative_round(
+        mocker: MockerFixture):
+    code = HoneycombCode(4)
+    compiler = AncillaPerCheckCompiler(noise_model, CxCyCzExtractor())
+    extract_checks = mocker.spy(compiler.syndrome_extractor, 'extract_checks')
+    initial_states = {
+        qubit: State.Zero for qubit in code.data_qubits.values()}
+    compiler.compile_to_circuit(
+        code, 4 * code.schedule_length, initial_states,
+        observables=[code.logical_qubits[1].z])
+    assert extract_checks.call_count == code.schedule_length
+    # A new compilation starts with new templates.
+    compiler.compile_to_circuit(
+        code, 2 * code.schedule_length, initial_states,
+        observables=[code.logical_qubits[1].z])
+    assert extract_checks.call_count == 2 * code.schedule_length
+
+
+def test_compiler_compile_to_circuit_same_with_and_without_round_templates():
+    code = HoneycombCode(4)
+    initial_states = {
+        qubit: State.Zero for qubit in code.data_qubits.values()}
+    circuits = []
+    for use_round_templates in [True, False]:
+        compiler = AncillaPerCheckCompiler(noise_model, CxCyCzExtractor())
+        compiler.use_round_templates = use_round_templates
+        circuit = compiler.compile_to_circuit(
+            code, 5 * code.schedule_length, initial_states,
+            observables=[code.logical_qubits[1].z])
+        circuits.append(circuit.to_stim(
+            noise_model.idling, track_progress=False))
+    assert circuits[0] == circuits[1]
+
+
 def test_compiler_compile_round_calls_add_detectors_correctly(
         monkeypatch: MonkeyPatch, mocker: MockerFixture):
     # Patch over the abstract methods so that we can instantiate a Compiler
@@ -899,6 +945,7 @@ def test_compiler_compile_round_calls_add_detectors_correctly(
     # Add some mock data, as well as mock methods on them
     circuit = mocker.Mock(spec=Circuit)
     circuit.measurer = mocker.Mock(spec=Measurer)
+    circuit.round_templates = {}
     circuit.measurer.add_detectors = mocker.Mock()
 
     code = mocker.Mock(spec=Code)
@@ -939,6 +986,7 @@ def test_compiler_compile_round_calls_multiply_observable_correctly(
     # Add some mock data, as well as mock methods on them
     circuit = mocker.Mock(spec=Circuit)
     circuit.measurer = mocker.Mock(spec=Measurer)
+    circuit.round_templates = {}
     circuit.measurer.add_detectors = mocker.Mock()
     circuit.measurer.multiply_observable = mocker.Mock()
 
@@ -985,6 +1033,7 @@ def test_compiler_compile_round_returns_correct_tick(
     # Add some mock data, as well as mock methods on them
     circuit = mocker.Mock(spec=Circuit)
     circuit.measurer = mocker.Mock(spec=Measurer)
+    circuit.round_templates = {}
     circuit.measurer.add_detectors = mocker.Mock()
     circuit.measurer.multiply_observable = mocker.Mock()
 
@@ -1349,6 +1398,7 @@ def test_compiler_compile_final_detectors_from_measurements_returns_empty_list_w
     detector = mocker.Mock(spec=Drum)
     detector.has_open_lid = mocker.Mock(return_value=(False, None))
     code.detectors = [detector]
+    code.detector_schedule = [[detector]]
 
     # Imagine we measure data qubits in Z basis at the end
     qubits = [Qubit(0), Qubit(1)]
@@ -1378,6 +1428,7 @@ def test_compiler_compile_final_detectors_from_measurements_returns_empty_list_w
     detector_checks = [(-1, detector_check)]
     detector.has_open_lid = mocker.Mock(return_value=(True, detector_checks))
     code.detectors = [detector]
+    code.detector_schedule = [[detector]]
 
     # Imagine we measure data qubits in Z basis at the end
     final_checks = {
@@ -1416,6 +1467,7 @@ def test_compiler_compile_final_detectors_from_measurements_builds_detector_othe
     detector_checks = [(-4, detector_check)]
     detector.has_open_lid = mocker.Mock(return_value=(True, detector_checks))
     code.detectors = [detector]
+    code.detector_schedule = [[detector]]
 
     # Imagine we measure data qubits in Z basis at the end
     final_checks = {
@@ -1898,3 +1950,152 @@ def test_compile_code(code, distance, num_detectors, num_measurements):
     # 8 + 8 + 17 = 3
     assert rsc_circuit.num_measurements == num_measurements
     assert len(rsc_circuit.shortest_graphlike_error()) == distance
+
+
+def test_compile_code_with_compression():
+    # Extracting checks one at a time leaves lots of idle time to remove.
+    syndrome_extractor = CxCyCzExtractor(
+        RotatedSurfaceCodeOrderer(), parallelize=False)
+    compiler = AncillaPerCheckCompiler(
+        CircuitLevelNoise(0.01, 0.01, 0.01, 0.01, 0.01), syndrome_extractor)
+    code = RotatedSurfaceCode(3)
+    qubits = list(code.data_qubits.values())
+    circuits = [
+        compiler.compile_to_stim(
+            code,
+            3,
+            initial_states={qubit: State.Zero for qubit in qubits},
+            final_measurements=[Pauli(qubit, PauliLetter('Z')) for qubit in qubits],
+            observables=[code.logical_qubits[0].z],
+            compress=compress)
+        for compress in [False, True]]
+    uncompressed, compressed = circuits
+    assert compressed.num_ticks < uncompressed.num_ticks
+    assert compressed.num_detectors == uncompressed.num_detectors
+    assert compressed.num_measurements == uncompressed.num_measurements
+    dem = compressed.detector_error_model(
+        decompose_errors=True, approximate_disjoint_errors=True)
+    assert len(dem.shortest_graphlike_error()) == 3
+    # Less idle time means fewer noise instructions.
+    assert len(compressed.flattened()) < len(uncompressed.flattened())
+
+
+def test_compile_code_with_repeat_block():
+    compiler = AncillaPerCheckCompiler(
+        CircuitLevelNoise(0.01, 0.01, 0.01, 0.01, 0.01),
+        CxCyCzExtractor(RotatedSurfaceCodeOrderer()))
+    code = RotatedSurfaceCode(3)
+    qubits = list(code.data_qubits.values())
+    # More rounds than are compiled when looking for the period of the
+    # bulk, so that the bulk has to be extrapolated.
+    total_rounds = 3 * compiler.repeat_block_probe_layers + 1
+    circuits = [
+        compiler.compile_to_stim(
+            code,
+            total_rounds,
+            initial_states={qubit: State.Zero for qubit in qubits},
+            final_measurements=[Pauli(qubit, PauliLetter('Z')) for qubit in qubits],
+            observables=[code.logical_qubits[0].z],
+            use_repeat_block=use_repeat_block)
+        for use_repeat_block in [False, True]]
+    unrolled, repeated = circuits
+    repeat_blocks = [
+        instruction for instruction in repeated
+        if isinstance(instruction, stim.CircuitRepeatBlock)]
+    assert len(repeat_blocks) == 1
+    assert repeated.flattened() == unrolled.flattened()
+
+
+def test_compile_tic_tac_toe_code_with_repeat_block():
+    compiler = AncillaPerCheckCompiler(
+        CircuitLevelNoise(0.01, 0.01, 0.01, 0.01, 0.01), CxCyCzExtractor())
+    code = HoneycombCode(4)
+    qubits = list(code.data_qubits.values())
+    # The observable's final measurement basis depends on the number of
+    # rounds, so this shouldn't be a multiple of the schedule length.
+    total_rounds = compiler.repeat_block_probe_layers * code.schedule_length + 7
+    circuits = [
+        compiler.compile_to_stim(
+            code,
+            total_rounds,
+            initial_states={qubit: State.Zero for qubit in qubits},
+            observables=[code.logical_qubits[1].z],
+            use_repeat_block=use_repeat_block)
+        for use_repeat_block in [False, True]]
+    unrolled, repeated = circuits
+    assert len(repeated) < len(unrolled)
+    assert repeated.flattened() == unrolled.flattened()
+
+
+@pytest.mark.parametrize("compress", [False, True])
+def test_compile_to_stims_matches_compile_to_stim(compress):
+    compiler = AncillaPerCheckCompiler(
+        CircuitLevelNoise(0.01, 0.01, 0.01, 0.01, 0.01), CxCyCzExtractor())
+    code = HoneycombCode(4)
+    qubits = list(code.data_qubits.values())
+    kwargs = {
+        'initial_states': {qubit: State.Zero for qubit in qubits},
+        'observables': [code.logical_qubits[1].z]}
+    # Not in order, and with both the final measurements and the
+    # observable's final basis depending on the number of rounds.
+    total_rounds = [13, 6, 7, 12]
+    circuits = compiler.compile_to_stims(
+        code, total_rounds, compress=compress, **kwargs)
+    assert list(circuits) == sorted(total_rounds)
+    for rounds, circuit in circuits.items():
+        assert circuit == compiler.compile_to_stim(
+            code, rounds, compress=compress, **kwargs)
+
+
+def test_compile_to_stims_takes_final_measurements_per_number_of_rounds():
+    compiler = AncillaPerCheckCompiler(
+        CircuitLevelNoise(0.01, 0.01, 0.01, 0.01, 0.01),
+        CxCyCzExtractor(RotatedSurfaceCodeOrderer()))
+    code = RotatedSurfaceCode(3)
+    qubits = list(code.data_qubits.values())
+    final_measurements = {
+        rounds: [Pauli(qubit, PauliLetter(letter)) for qubit in qubits]
+        for rounds, letter in [(2, 'X'), (3, 'Z')]}
+    circuits = compiler.compile_to_stims(
+        code,
+        [2, 3],
+        initial_states={qubit: State.Zero for qubit in qubits},
+        final_measurements=final_measurements)
+    for rounds, circuit in circuits.items():
+        assert circuit == compiler.compile_to_stim(
+            code,
+            rounds,
+            initial_states={qubit: State.Zero for qubit in qubits},
+            final_measurements=final_measurements[rounds])
+
+
+def test_compile_to_circuits_matches_compile_to_circuit():
+    compiler = AncillaPerCheckCompiler(
+        CircuitLevelNoise(0.01, 0.01, 0.01, 0.01, 0.01), CxCyCzExtractor())
+    code = HoneycombCode(4)
+    kwargs = {
+        'initial_states': {
+            qubit: State.Zero for qubit in code.data_qubits.values()},
+        'observables': [code.logical_qubits[1].z]}
+    circuits = compiler.compile_to_circuits(code, [6, 9], **kwargs)
+    for rounds, circuit in circuits.items():
+        expected = compiler.compile_to_circuit(code, rounds, **kwargs)
+        assert circuit.to_stim(None, None, track_progress=False) == \
+            expected.to_stim(None, None, track_progress=False)
+
+
+def test_compiling_twice_gives_the_same_circuit():
+    # The final detectors used to come out in an order that depended on
+    # where in memory the code's detectors lived.
+    compiler = AncillaPerCheckCompiler(
+        CircuitLevelNoise(0.01, 0.01, 0.01, 0.01, 0.01), CxCyCzExtractor())
+    circuits = []
+    for _ in range(2):
+        code = HoneycombCode(4)
+        circuits.append(compiler.compile_to_stim(
+            code,
+            7,
+            initial_states={
+                qubit: State.Zero for qubit in code.data_qubits.values()},
+            observables=[code.logical_qubits[1].z]))
+    assert circuits[0] == circuits[1]
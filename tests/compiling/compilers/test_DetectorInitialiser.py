@@ -15,10 +15,18 @@ from main.building_blocks.pauli import Pauli
 from main.building_blocks.pauli.PauliLetter import PauliLetter
 from main.building_blocks.pauli.PauliProduct import PauliProduct
 from main.codes.Code import Code
+from main.codes.RotatedSurfaceCode import RotatedSurfaceCode
+from main.codes.tic_tac_toe.HoneycombCode import HoneycombCode
+from main.codes.tic_tac_toe.gauge.GaugeFloquetColourCode import GaugeFloquetColourCode
+from main.codes.tic_tac_toe.gauge.GaugeHoneycombCode import GaugeHoneycombCode
 from main.compiling.Circuit import Circuit
 from main.compiling.Instruction import Instruction
+from main.compiling.compilers.AncillaPerCheckCompiler import AncillaPerCheckCompiler
 from main.compiling.compilers.Compiler import Compiler
 from main.compiling.compilers.DetectorInitialiser import DetectorInitialiser
+from main.compiling.noise.models import PhenomenologicalNoise
+from main.compiling.syndrome_extraction.extractors.ancilla_per_check.mixed.CxCyCzExtractor import CxCyCzExtractor
+from main.utils.enums import State
 from tests.building_blocks.pauli.utils_paulis import random_paulis
 from tests.building_blocks.utils_checks import random_check, specific_check
 from tests.compiling.utils_instructions import MockInstruction
@@ -429,3 +437,54 @@ def test_detector_initialiser_get_initial_detectors_given_initial_stabilizers(mo
         i: detectors
         for i, detectors in enumerate(expected_initial_detectors)}
     initialiser.split_schedule.assert_called_with(expected)
+
+
+def test_detector_initialiser_advance_simulator_only_feeds_new_ticks(mocker: MockerFixture):
+    code = mocker.Mock(spec=Code)
+    compiler = mocker.Mock(spec=Compiler)
+    initialiser = DetectorInitialiser(code, compiler)
+
+    circuit = Circuit()
+    qubit = Qubit(0)
+    circuit.initialise(0, Instruction([qubit], 'R'))
+    circuit.add_instruction(2, Instruction([qubit], 'H'))
+    circuit.ticks_to_stim = mocker.Mock(wraps=circuit.ticks_to_stim)
+
+    simulator = initialiser.advance_simulator(2, circuit)
+    circuit.ticks_to_stim.assert_called_with(0, 2)
+    assert simulator.peek_z(0) == 1
+
+    # Same tick again - nothing new to feed in.
+    circuit.ticks_to_stim.reset_mock()
+    assert initialiser.advance_simulator(2, circuit) is simulator
+    circuit.ticks_to_stim.assert_not_called()
+
+    simulator = initialiser.advance_simulator(4, circuit)
+    circuit.ticks_to_stim.assert_called_with(2, 4)
+    assert simulator.peek_x(0) == 1
+
+    # A different circuit means starting again from scratch.
+    other_circuit = Circuit()
+    other_circuit.initialise(0, Instruction([qubit], 'R'))
+    other_simulator = initialiser.advance_simulator(2, other_circuit)
+    assert other_simulator is not simulator
+    assert other_simulator.peek_z(0) == 1
+
+
+def test_detector_initialiser_incremental_matches_full_replay():
+    codes = [
+        RotatedSurfaceCode(3),
+        HoneycombCode(4),
+        GaugeHoneycombCode(4, [2, 3, 2]),
+        GaugeFloquetColourCode(4, [2, 1])]
+    for code in codes:
+        compiler = AncillaPerCheckCompiler(
+            PhenomenologicalNoise(0.1, 0.1), CxCyCzExtractor())
+        compiler.add_ancilla_qubits(code)
+        initial_states = {
+            qubit: State.Zero for qubit in code.data_qubits.values()}
+        schedules = [
+            DetectorInitialiser(code, compiler, incremental).get_initial_detectors(
+                initial_states, None)
+            for incremental in [False, True]]
+        assert repr(schedules[0]) == repr(schedules[1])
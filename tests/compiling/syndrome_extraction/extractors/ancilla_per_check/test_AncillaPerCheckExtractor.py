@@ -13,6 +13,7 @@ from main.compiling.syndrome_extraction.controlled_gate_orderers.TrivialOrderer
 from main.compiling.syndrome_extraction.extractors.ancilla_per_check.AncillaPerCheckExtractor import \
     AncillaPerCheckExtractor
 from main.utils.enums import State
+from tests.compiling.utils_instructions import MockInstruction
 from tests.utils.utils_numbers import default_test_repeats_small
 from tests.utils.utils_strings import random_strings
 
@@ -183,10 +184,11 @@ def test_ancilla_per_check_extractor_do_controlled_gate_when_non_trivial(mocker:
     extractor.do_controlled_gate(pauli, check, 0, circuit, compiler)
 
     # Check that this has had the desired effect on the circuit
+    expected_controlled_gate = MockInstruction(qubits, 'CONTROLLED_GATE')
     expected = {
         0: {
-            qubits[0]: [mock_controlled_gate],
-            qubits[1]: [mock_controlled_gate]}}
+            qubits[0]: [expected_controlled_gate],
+            qubits[1]: [expected_controlled_gate]}}
     assert circuit.instructions == expected
 
 
@@ -246,8 +248,8 @@ def test_ancilla_per_check_extractor_pre_rotate_pauli(mocker: MockerFixture):
 
     # Check this has had the desired effect on the circuit
     expected = {
-        0: {qubit: [mock_pre_rotations[0]]},
-        2: {qubit: [mock_pre_rotations[1]]}}
+        0: {qubit: [MockInstruction([qubit], 'PRE_ROTATE_1')]},
+        2: {qubit: [MockInstruction([qubit], 'PRE_ROTATE_2')]}}
     assert circuit.instructions == expected
     assert next_tick == 4
 
@@ -271,7 +273,7 @@ def test_ancilla_per_check_extractor_pre_rotate_pauli(mocker: MockerFixture):
 
         # Check this has had the desired effect on the circuit
         expected = {
-            2*i: {qubit: [mock_pre_rotations[i]]}
+            2*i: {qubit: [MockInstruction([qubit], pre_rotation_names[i])]}
             for i in range(num_pre_rotations)}
         assert circuit.instructions == expected
         assert next_tick == 2 * num_pre_rotations
@@ -333,8 +335,8 @@ def test_ancilla_per_check_extractor_post_rotate_pauli(mocker: MockerFixture):
 
     # Check this has had the desired effect on the circuit
     expected = {
-        0: {qubit: [mock_post_rotations[0]]},
-        2: {qubit: [mock_post_rotations[1]]}}
+        0: {qubit: [MockInstruction([qubit], 'POST_ROTATE_1')]},
+        2: {qubit: [MockInstruction([qubit], 'POST_ROTATE_2')]}}
     assert circuit.instructions == expected
     assert next_tick == 4
 
@@ -358,7 +360,7 @@ def test_ancilla_per_check_extractor_post_rotate_pauli(mocker: MockerFixture):
 
         # Check this has had the desired effect on the circuit
         expected = {
-            2*i: {qubit: [mock_post_rotations[i]]}
+            2*i: {qubit: [MockInstruction([qubit], post_rotation_names[i])]}
             for i in range(num_post_rotations)}
         assert circuit.instructions == expected
         assert next_tick == 2 * num_post_rotations
@@ -1,3 +1,5 @@
+import gzip
+import io
 import random
 from collections import defaultdict
 import copy
@@ -21,6 +23,7 @@ from main.compiling.syndrome_extraction.controlled_gate_orderers.RotatedSurfaceC
     RotatedSurfaceCodeOrderer,
 )
 from main.compiling.syndrome_extraction.extractors.ancilla_per_check.mixed.CxCyCzExtractor import CxCyCzExtractor
+from tests.compiling.utils_instructions import MockInstruction
 from main.utils.enums import State
 
 single_qubit_circuit = Circuit()
@@ -57,6 +60,15 @@ circuit_with_resonator_idle.add_instruction(
     6, Instruction([qubit_1], "MZ", is_measurement=True))
 
 
+def mock(instruction: Instruction) -> MockInstruction:
+    # Most instructions are rebuilt when read back from a circuit, so
+    # compare them by content.
+    return MockInstruction(
+        instruction.qubits, instruction.name, instruction.params,
+        instruction.is_measurement, instruction.is_noise,
+        instruction.targets)
+
+
 def create_rsc_circuit():
     code = RotatedSurfaceCode(3)
     syndrome_extractor = CxCyCzExtractor(RotatedSurfaceCodeOrderer())
@@ -167,6 +179,7 @@ def test_measure():
 
     m_instruction = Instruction([qubit_1, qubit_2], "M")
 
+    m_instruction.is_measurement = True
     m_instruction.params = ()
     check = Check([Pauli(qubit_1, PauliLetter('Z')),
                   Pauli(qubit_2, PauliLetter('Z'))])
@@ -222,7 +235,7 @@ def test_circuit_add_instruction_fails_if_conflicting_instructions(
     instruction = Instruction([qubit], 'Some instruction')
     conflicting_instruction = Instruction([qubit], 'Some other instruction')
 
-    circuit.instructions = {tick: {qubit: [instruction]}}
+    circuit.add_instruction(tick, instruction)
     with pytest.raises(ValueError, match=expected_error):
         circuit.add_instruction(tick, conflicting_instruction)
 
@@ -234,7 +247,19 @@ def test_circuit_add_instruction_succeeds_otherwise(
     qubit = mocker.Mock(spec=Qubit)
     instruction = Instruction([qubit], 'Some instruction')
     circuit.add_instruction(tick, instruction)
-    assert circuit.instructions[tick][qubit] == [instruction]
+    assert circuit.instructions[tick][qubit] == [mock(instruction)]
+
+
+def test_circuit_add_instruction_skips_checks_when_told_to(
+        mocker: MockerFixture):
+    circuit = Circuit()
+    tick = random.choice(range(-20, 20, 2))
+    qubit = mocker.Mock(spec=Qubit)
+    instruction = Instruction([qubit], 'Some instruction')
+    # Wouldn't normally be allowed at an odd tick...
+    circuit.add_instruction(tick + 1, instruction, validate=False)
+    assert circuit.instructions[tick + 1][qubit] == [mock(instruction)]
+    assert circuit.qubits == {qubit}
 
 
 def test_circuit_add_repeat_block_fails_if_block_empty():
@@ -328,6 +353,41 @@ def test__to_stim():
     assert stim_rsc_circuit_one_layer.num_detectors == 8
 
 
+
+def test_circuit_write_stim_matches_to_stim():
+    circuit = create_rsc_circuit()
+    expected = circuit.to_stim(None, None, track_progress=False)
+    file = io.StringIO()
+    circuit.write_stim(file, None)
+    assert stim.Circuit(file.getvalue()) == expected
+    # Measurer should be reset afterwards, just as for to_stim.
+    assert circuit.measurer.measurement_numbers == {}
+    assert circuit.measurer.total_measurements == 0
+
+
+def test_circuit_write_stim_with_repeat_blocks_to_gzip_file(tmp_path):
+    code = RotatedSurfaceCode(3)
+    compiler = AncillaPerCheckCompiler(
+        CodeCapacityBitFlipNoise(0.123456789),
+        CxCyCzExtractor(RotatedSurfaceCodeOrderer()))
+    data_qubits = list(code.data_qubits.values())
+    circuit = compiler.compile_to_circuit_for_loop(
+        code, 5, {qubit: State.Zero for qubit in data_qubits},
+        final_measurements=[
+            Pauli(qubit, PauliLetter('Z')) for qubit in data_qubits],
+        observables=[code.logical_qubits[0].z])
+    expected = circuit.to_stim(None, None, track_progress=False)
+
+    path = tmp_path / 'circuit.stim.gz'
+    circuit.write_stim(path, None, free_instructions=True)
+    with gzip.open(path, 'rt') as file:
+        text = file.read()
+    assert 'REPEAT' in text
+    assert stim.Circuit(text) == expected
+    # Everything should have been freed as it was written.
+    assert len(circuit.instructions) == 0
+    assert len(circuit.measurer.measurement_checks) == 0
+
 def test_add_idling_noise():
     single_qubit_circuit.add_idling_noise(None, None)
     n_idling_gates = single_qubit_circuit.number_of_instructions(
@@ -358,15 +418,14 @@ def test_add_idling_noise():
     assert n_idling_errors == 3
 
 
-def test_circuit_add_idling_noise_does_not_add_idling_noise_after_identity_gate(
-        mocker: MockerFixture):
+def test_circuit_add_idling_noise_does_not_add_idling_noise_after_identity_gate():
     circuit = Circuit()
-    qubit = mocker.Mock(spec=Qubit)
+    qubit = Qubit(0)
     identity = Instruction([qubit], 'I')
-    circuit.instructions = {0: {qubit: [identity]}}
+    circuit.add_instruction(0, identity)
     circuit.add_idling_noise(OneQubitNoise.uniform(0.1), None)
     # Assert that nothing has happened!
-    assert circuit.instructions == {0: {qubit: [identity]}}
+    assert circuit.instructions == {0: {qubit: [mock(identity)]}}
 
 
 def test_circuit_get_idle_qubits(mocker: MockerFixture):
@@ -379,17 +438,139 @@ def test_circuit_get_idle_qubits(mocker: MockerFixture):
         circuit.init_ticks[qubit].append(0)
     # Let only qubit 1 have non-trivial instructions, so this qubit also
     # shouldn't be idle.
-    circuit.instructions = {0: {
-        qubits[0]: [Instruction([qubits[0]], 'I')],
-        qubits[1]: [Instruction([qubits[1]], 'X')],
-        qubits[2]: [Instruction([qubits[2]], 'I')],
-        qubits[3]: []}}
+    circuit.add_instruction(0, Instruction([qubits[0]], 'I'))
+    circuit.add_instruction(0, Instruction([qubits[1]], 'X'))
+    circuit.add_instruction(0, Instruction([qubits[2]], 'I'))
 
     idle_qubits = circuit.get_idle_qubits(0)
     # Only the last two qubits should be idle.
     assert idle_qubits == set(qubits[2:])
 
 
+def test_circuit_initialised_qubits_by_tick():
+    circuit = Circuit()
+    qubits = [Qubit(i) for i in range(3)]
+    circuit.initialise(0, Instruction([qubits[0]], "R"))
+    circuit.initialise(2, Instruction([qubits[1]], "RX"))
+    circuit.measure(Instruction([qubits[0]], "M"), None, 0, 4)
+    circuit.initialise(6, Instruction([qubits[0]], "R"))
+    circuit.measure(Instruction([qubits[1]], "MX"), None, 0, 6)
+    # Histories needn't be in tick order.
+    circuit.initialise(4, Instruction([qubits[2]], "R"))
+    circuit.initialise(0, Instruction([qubits[2]], "R"))
+
+    ticks = [8, 0, 2, 4, 6]
+    initialised = {
+        tick: set(qubits)
+        for tick, qubits in circuit.initialised_qubits_by_tick(ticks)}
+    assert list(initialised.keys()) == sorted(ticks)
+    for tick in ticks:
+        expected = {
+            qubit for qubit in qubits if circuit.is_initialised(tick, qubit)}
+        assert initialised[tick] == expected
+    assert initialised[4] == {qubits[1], qubits[2]}
+    assert initialised[6] == {qubits[0], qubits[2]}
+
+
+def test_circuit_compress_moves_instructions_earlier():
+    circuit = Circuit()
+    qubits = [Qubit(i) for i in range(3)]
+    resets = [Instruction([qubit], "R") for qubit in qubits]
+    for reset in resets:
+        circuit.initialise(0, reset)
+    x = Instruction([qubits[0]], "X")
+    circuit.add_instruction(2, x)
+    noise = OneQubitNoise(0.1, 0.1, 0.1).instruction([qubits[0]])
+    circuit.add_instruction(3, noise)
+    hadamards = [Instruction([qubit], "H") for qubit in qubits[1:]]
+    circuit.add_instruction(8, hadamards[0])
+    cnot = Instruction(qubits[:2], "CNOT")
+    circuit.add_instruction(12, cnot)
+    measurement = Instruction([qubits[1]], "M", is_measurement=True)
+    circuit.measure(measurement, None, 0, 16)
+    circuit.add_instruction(18, hadamards[1])
+
+    compressed, savings = circuit.compress()
+    assert compressed.instructions == {
+        0: {qubit: [mock(reset)] for qubit, reset in zip(qubits, resets)},
+        2: {
+            qubits[0]: [mock(x)],
+            qubits[1]: [mock(hadamards[0])],
+            qubits[2]: [mock(hadamards[1])]},
+        3: {qubits[0]: [mock(noise)]},
+        4: {qubits[0]: [mock(cnot)], qubits[1]: [mock(cnot)]},
+        6: {qubits[1]: [measurement]}}
+    assert compressed.init_ticks == {qubit: [0] for qubit in qubits}
+    assert compressed.measure_ticks == {qubits[1]: [6]}
+    assert compressed.measurer is circuit.measurer
+    assert savings == {
+        'ticks': 2,
+        'idle_locations':
+            circuit.number_of_idle_locations() -
+            compressed.number_of_idle_locations()}
+    assert savings['idle_locations'] > 0
+    # The original circuit should be untouched.
+    assert sorted(circuit.instructions) == [0, 2, 3, 8, 12, 16, 18]
+
+
+def test_circuit_compress_respects_round_boundaries():
+    circuit = Circuit()
+    qubits = [Qubit(i) for i in range(2)]
+    for qubit in qubits:
+        circuit.initialise(0, Instruction([qubit], "R"))
+    circuit.add_instruction(2, Instruction([qubits[0]], "X"))
+    circuit.add_instruction(4, Instruction([qubits[0]], "X"))
+    circuit.end_round(4)
+    circuit.add_instruction(8, Instruction([qubits[1]], "X"))
+    circuit.end_round(10)
+
+    compressed, _ = circuit.compress()
+    # The second qubit's gate could happen at tick 2 if not for the end of
+    # the first round.
+    assert sorted(compressed.instructions) == [0, 2, 4, 6]
+    assert qubits[1] in compressed.instructions[6]
+    # Second round's boundary has no instructions, so isn't compiled.
+    assert compressed.shift_ticks == [4]
+
+
+def test_circuit_compress_respects_repeat_blocks():
+    circuit = Circuit()
+    qubits = [Qubit(i) for i in range(2)]
+    for qubit in qubits:
+        circuit.initialise(0, Instruction([qubit], "R"))
+    circuit.add_instruction(4, Instruction([qubits[0]], "X"))
+    circuit.add_instruction(8, Instruction([qubits[1]], "X"))
+    circuit.add_instruction(12, Instruction([qubits[0]], "X"))
+    circuit.add_repeat_block(4, 10, 5)
+
+    compressed, _ = circuit.compress()
+    assert sorted(compressed.instructions) == [0, 2, 4]
+    # Block starts straight after the first tick, so can include noise.
+    assert compressed.repeat_blocks[1] == (1, 3, 5)
+    assert compressed.repeat_blocks[2] == (1, 3, 5)
+    assert compressed.repeat_blocks[4] is None
+
+
+def test_circuit_compress_does_not_initialise_qubits_earlier():
+    circuit = Circuit()
+    qubits = [Qubit(i) for i in range(2)]
+    circuit.initialise(0, Instruction([qubits[0]], "R"))
+    circuit.add_instruction(2, Instruction([qubits[0]], "X"))
+    circuit.add_instruction(4, Instruction([qubits[0]], "X"))
+    circuit.initialise(4, Instruction([qubits[1]], "R"))
+    noise = OneQubitNoise(0.1, 0.1, 0.1).instruction([qubits[1]])
+    circuit.add_instruction(5, noise)
+    circuit.add_instruction(6, Instruction(qubits, "CNOT"))
+
+    compressed, savings = circuit.compress()
+    # Could initialise the second qubit at tick 0, but it would then sit
+    # idle for longer.
+    assert qubits[1] in compressed.instructions[4]
+    assert qubits[1] in compressed.instructions[5]
+    assert compressed.init_ticks[qubits[1]] == [4]
+    assert savings == {'ticks': 0, 'idle_locations': 0}
+
+
 def test_circuit_entered_repeat_block():
     circuit = Circuit()
     circuit.repeat_blocks = {
@@ -424,3 +605,123 @@ def test_circuit_left_repeat_block():
         tick = i
         last_tick = i - 1
         assert circuit.left_repeat_block(tick, last_tick) == 10
+
+
+def test_circuit_ticks_to_stim():
+    circuit = Circuit()
+    qubit_1 = Qubit(1)
+    qubit_2 = Qubit(2)
+    circuit.initialise(0, Instruction([qubit_1], "R"))
+    circuit.initialise(0, Instruction([qubit_2], "R"))
+    circuit.add_instruction(1, OneQubitNoise(0.1, 0.1, 0.1).instruction([qubit_1]))
+    circuit.add_instruction(2, Instruction([qubit_1, qubit_2], "CNOT"))
+    circuit.add_instruction(6, Instruction([qubit_2], "H"))
+
+    assert circuit.ticks_to_stim(0, 2) == stim.Circuit("""
+        R 0 1
+        PAULI_CHANNEL_1(0.1, 0.1, 0.1) 0
+    """)
+    assert circuit.ticks_to_stim(2, 7) == stim.Circuit("""
+        CX 0 1
+        H 1
+    """)
+    # Empty ticks shouldn't be created as a side effect.
+    assert 4 not in circuit.instructions
+    assert circuit.ticks_to_stim(7, 10) == stim.Circuit()
+
+
+def test_circuit_split_instructions_according_to_gate():
+    circuit = Circuit()
+    qubits = [Qubit(i) for i in range(5)]
+    for qubit in qubits:
+        circuit.qubit_index(qubit)
+    cnot = Instruction([qubits[3], qubits[1]], "CNOT")
+    measurement = Instruction([qubits[4]], "MZ", is_measurement=True)
+    circuit.add_instruction(2, Instruction([qubits[2]], "H"))
+    circuit.add_instruction(2, cnot)
+    circuit.add_instruction(2, measurement)
+    circuit.add_instruction(2, Instruction([qubits[0]], "H"))
+
+    targets_by_instruction, measurements = \
+        circuit.split_instructions_according_to_gate(2)
+    # Each multi-qubit instruction should only be included once, even
+    # though it's in the list of instructions for every qubit it acts on.
+    assert list(targets_by_instruction.items()) == [
+        (("CNOT", ()), [3, 1]),
+        (("H", ()), [0, 2]),
+        (("MZ", ()), [4])]
+    assert measurements == [measurement]
+
+
+def test_circuit_product_measurement_targets_are_reused_for_same_check():
+    circuit = Circuit()
+    qubits = [Qubit(i) for i in range(2)]
+    check = Check([
+        Pauli(qubits[0], PauliLetter('X')),
+        Pauli(qubits[1], PauliLetter('Z'))])
+    other_check = Check([
+        Pauli(qubits[1], PauliLetter('Y'))])
+
+    targets = circuit.product_measurement_targets(check)
+    assert targets == [
+        stim.target_x(0), stim.target_combiner(), stim.target_z(1)]
+    assert circuit.product_measurement_targets(check) is targets
+    assert circuit.product_measurement_targets(other_check) == [
+        stim.target_y(1)]
+
+
+def test_circuit_copy_is_independent():
+    circuit = create_rsc_circuit()
+    expected = circuit.to_stim(None, None, track_progress=False)
+    copied = circuit.copy()
+    assert copied.measurer is not circuit.measurer
+    qubit = Qubit((100, 100))
+    copied.initialise(max(copied.instructions) + 2, Instruction([qubit], "R"))
+    assert qubit not in circuit.qubits
+    assert circuit.to_stim(None, None, track_progress=False) == expected
+    assert copied.to_stim(None, None, track_progress=False) != expected
+
+
+def test_circuit_to_stim_with_branches_matches_to_stim():
+    circuit = create_rsc_circuit()
+    idling_noise = OneQubitNoise(0.1, 0.1, 0.1)
+    # Each branch is the same as the circuit up to some tick, after which
+    # it measures a qubit once more at the end.
+    qubit = sorted(circuit.qubits, key=lambda qubit: qubit.coords)[0]
+    end = max(circuit.instructions)
+    branches = {}
+    for start in [4, 8, end]:
+        branch = circuit.copy()
+        branch.measure(
+            Instruction([qubit], "MX", is_measurement=True),
+            Check([Pauli(qubit, PauliLetter('X'))]),
+            round=1,
+            tick=end + 2)
+        branches[start] = (branch, start)
+    expected = {
+        start: branch.copy().to_stim(
+            idling_noise, None, track_progress=False)
+        for start, (branch, _) in branches.items()}
+    expected_trunk = circuit.copy().to_stim(
+        idling_noise, None, track_progress=False)
+
+    trunk, stim_branches = circuit.to_stim_with_branches(
+        branches, idling_noise)
+    assert trunk == expected_trunk
+    assert stim_branches == expected
+
+
+def test_circuit_to_stim_with_branches_fails_if_branch_has_new_qubits():
+    circuit = create_rsc_circuit()
+    branch = circuit.copy()
+    branch.initialise(
+        max(branch.instructions) + 2, Instruction([Qubit((100, 100))], "R"))
+    with pytest.raises(ValueError, match="that the circuit it branches off"):
+        circuit.to_stim_with_branches({0: (branch, 4)}, None)
+
+
+def test_circuit_to_stim_with_branches_fails_if_branch_starts_after_end():
+    circuit = create_rsc_circuit()
+    end = max(circuit.instructions)
+    with pytest.raises(ValueError, match="after the last tick"):
+        circuit.to_stim_with_branches({0: (circuit.copy(), end + 2)}, None)
@@ -0,0 +1,184 @@
+import os
+import subprocess
+import sys
+
+import pytest
+import stim
+from pytest_mock import MockerFixture
+
+from main.building_blocks.pauli.Pauli import Pauli
+from main.building_blocks.pauli.PauliLetter import PauliLetter
+from main.codes.RotatedSurfaceCode import RotatedSurfaceCode
+from main.codes.tic_tac_toe.HoneycombCode import HoneycombCode
+from main.compiling import CompilationCache as compilation_cache
+from main.compiling.CompilationCache import CompilationCache
+from main.compiling.compilers.AncillaPerCheckCompiler import AncillaPerCheckCompiler
+from main.compiling.noise.models import CircuitLevelNoise
+from main.compiling.syndrome_extraction.controlled_gate_orderers.RotatedSurfaceCodeOrderer import \
+    RotatedSurfaceCodeOrderer
+from main.compiling.syndrome_extraction.extractors.ancilla_per_check.mixed.CxCyCzExtractor import CxCyCzExtractor
+from main.utils.enums import State
+from main.utils.utils import stim_circuit_to_text
+
+
+def surface_code_inputs(probability: float = 0.01):
+    compiler = AncillaPerCheckCompiler(
+        CircuitLevelNoise(*[probability] * 5),
+        CxCyCzExtractor(RotatedSurfaceCodeOrderer()))
+    code = RotatedSurfaceCode(3)
+    qubits = list(code.data_qubits.values())
+    kwargs = {
+        'initial_states': {qubit: State.Zero for qubit in qubits},
+        'final_measurements': [
+            Pauli(qubit, PauliLetter('Z')) for qubit in qubits],
+        'observables': [code.logical_qubits[0].z]}
+    return compiler, code, kwargs
+
+
+def key_of(cache: CompilationCache, compiler, code, rounds, kwargs):
+    return cache.key(
+        compiler, code, rounds, kwargs['initial_states'],
+        kwargs['final_measurements'], kwargs['observables'])
+
+
+def test_compilation_cache_key_same_for_equal_inputs(tmp_path):
+    cache = CompilationCache(tmp_path)
+    key = key_of(cache, *surface_code_inputs()[:2], 3, surface_code_inputs()[2])
+    compiler, code, kwargs = surface_code_inputs()
+    assert key_of(cache, compiler, code, 3, kwargs) == key
+    # Key shouldn't depend on order of dicts.
+    kwargs['initial_states'] = dict(reversed(kwargs['initial_states'].items()))
+    assert key_of(cache, compiler, code, 3, kwargs) == key
+
+
+def test_compilation_cache_key_differs_for_different_inputs(tmp_path):
+    cache = CompilationCache(tmp_path)
+    compiler, code, kwargs = surface_code_inputs()
+    key = key_of(cache, compiler, code, 3, kwargs)
+    assert key_of(cache, compiler, code, 4, kwargs) != key
+    other_compiler, _, _ = surface_code_inputs(0.02)
+    assert key_of(cache, other_compiler, code, 3, kwargs) != key
+    other_code = RotatedSurfaceCode(5)
+    assert cache.key(compiler, other_code, 3) != cache.key(compiler, code, 3)
+    kwargs['initial_states'] = {
+        qubit: State.Plus for qubit in code.data_qubits.values()}
+    assert key_of(cache, compiler, code, 3, kwargs) != key
+
+
+def test_compilation_cache_key_changes_when_source_changes(
+        tmp_path, monkeypatch: pytest.MonkeyPatch):
+    source = tmp_path / 'source'
+    (source / 'compiling').mkdir(parents=True)
+    module = source / 'compiling' / 'Compiler.py'
+    module.write_text('x = 1\n')
+    monkeypatch.setattr(compilation_cache, '_source_directory', source)
+    cache = CompilationCache(tmp_path / 'cache')
+
+    def key():
+        compilation_cache._source_fingerprint.cache_clear()
+        return cache.key(3)
+
+    original = key()
+    assert key() == original
+    module.write_text('x = 2\n')
+    assert key() != original
+    compilation_cache._source_fingerprint.cache_clear()
+
+
+def test_compilation_cache_key_stable_across_processes(tmp_path):
+    script = (
+        "from main.codes.tic_tac_toe.HoneycombCode import HoneycombCode\n"
+        "from main.compiling.CompilationCache import CompilationCache\n"
+        "from main.compiling.compilers.AncillaPerCheckCompiler import AncillaPerCheckCompiler\n"
+        "code = HoneycombCode(4)\n"
+        f"cache = CompilationCache({str(tmp_path)!r})\n"
+        "print(cache.key(AncillaPerCheckCompiler(), code, code.logical_qubits[1].z))\n")
+    keys = set()
+    for seed in ['1', '2']:
+        env = dict(os.environ, PYTHONHASHSEED=seed)
+        result = subprocess.run(
+            [sys.executable, '-c', script], env=env, capture_output=True,
+            text=True, check=True)
+        keys.add(result.stdout.strip())
+    code = HoneycombCode(4)
+    cache = CompilationCache(tmp_path)
+    keys.add(cache.key(
+        AncillaPerCheckCompiler(), code, code.logical_qubits[1].z))
+    assert len(keys) == 1
+
+
+def test_compilation_cache_describe_fails_on_cycles():
+    cycle = []
+    cycle.append(cycle)
+    with pytest.raises(ValueError, match="Can't describe an object"):
+        CompilationCache.describe(cycle)
+
+
+def test_compile_to_stim_with_cache_only_compiles_once(
+        tmp_path, mocker: MockerFixture):
+    cache = CompilationCache(tmp_path)
+    compiler, code, kwargs = surface_code_inputs()
+    spy = mocker.spy(AncillaPerCheckCompiler, 'compile_to_circuit')
+    expected = compiler.compile_to_stim(code, 3, **kwargs)
+    circuits = [
+        compiler.compile_to_stim(code, 3, **kwargs, cache=cache)
+        for _ in range(3)]
+    # Once without the cache, once to fill the cache.
+    assert spy.call_count == 2
+    assert all(circuit == expected for circuit in circuits)
+
+    # A fresh cache object pointing at the same place should still find it.
+    other_compiler, other_code, other_kwargs = surface_code_inputs()
+    circuit = other_compiler.compile_to_stim(
+        other_code, 3, **other_kwargs, cache=CompilationCache(tmp_path))
+    assert spy.call_count == 2
+    assert circuit == expected
+
+
+def test_compilation_cache_detector_error_model(tmp_path):
+    cache = CompilationCache(tmp_path)
+    circuit = stim.Circuit.generated(
+        'repetition_code:memory', distance=3, rounds=3,
+        after_clifford_depolarization=0.01)
+    key = cache.key('repetition code')
+    model = cache.detector_error_model(key, circuit, decompose_errors=True)
+    assert model == circuit.detector_error_model(decompose_errors=True)
+    # Should now come from the cache rather than the circuit.
+    assert cache.detector_error_model(
+        key, stim.Circuit(), decompose_errors=True) == model
+    # But different arguments give a different model.
+    assert cache.detector_error_model(
+        key, stim.Circuit(), decompose_errors=False) != model
+
+
+def test_compilation_cache_evicts_least_recently_used(tmp_path):
+    circuit = stim.Circuit.generated(
+        'repetition_code:memory', distance=3, rounds=3)
+    size = len(stim_circuit_to_text(circuit))
+    cache = CompilationCache(tmp_path, max_size=2 * size)
+    cache.put_circuit('a', circuit)
+    cache.put_circuit('b', circuit)
+    # Make sure 'a' and 'b' have distinct access times, then use 'a'.
+    os.utime(tmp_path / 'a.stim', (0, 0))
+    os.utime(tmp_path / 'b.stim', (1, 1))
+    assert cache.get_circuit('a') == circuit
+    cache.put_circuit('c', circuit)
+    assert cache.get_circuit('b') is None
+    assert cache.get_circuit('a') == circuit
+    assert cache.get_circuit('c') == circuit
+    assert cache.size() == 2 * size
+
+
+def test_compilation_cache_invalidate_and_clear(tmp_path):
+    circuit = stim.Circuit.generated(
+        'repetition_code:memory', distance=3, rounds=3)
+    cache = CompilationCache(tmp_path)
+    cache.put_circuit('a', circuit)
+    cache.put_circuit('b', circuit)
+    cache.invalidate('a')
+    assert cache.get_circuit('a') is None
+    assert cache.get_circuit('b') == circuit
+    cache.clear()
+    assert cache.get_circuit('b') is None
+    assert cache.size() == 0
+
@@ -3,7 +3,7 @@ import random
 import pytest
 
 from main.building_blocks.Qubit import Qubit
-from main.compiling.Instruction import Instruction
+from main.compiling.Instruction import Instruction, _intern_params
 from tests.utils.utils_numbers import default_test_repeats_small
 from tests.building_blocks.utils_qubits import random_qubits
 
@@ -37,3 +37,36 @@ def test_instruction_fails_if_qubits_not_unique():
             Instruction(non_unique_qubits, 'SOME_INSTRUCTION')
 
 
+def test_instruction_copy():
+    qubits = [Qubit(0), Qubit(1)]
+    instruction = Instruction(
+        qubits, 'MPP', (0.1,), is_measurement=True, targets=[])
+    copy = instruction.copy()
+    assert copy is not instruction
+    assert copy.qubits == qubits
+    assert copy.name == 'MPP'
+    assert copy.params == (0.1,)
+    assert copy.is_measurement
+    assert not copy.is_noise
+    assert copy.targets == []
+    assert repr(copy) == repr(instruction)
+
+
+def test_instruction_params_interned_but_not_kept_forever():
+    qubit = Qubit(0)
+    first = Instruction([qubit], 'X_ERROR', (0.125,))
+    second = Instruction([qubit], 'X_ERROR', tuple([0.125]))
+    assert second.params is first.params
+    # Distinct parameters (e.g. from a long sweep) don't pile up.
+    for i in range(2 * _intern_params.cache_info().maxsize):
+        Instruction([qubit], 'X_ERROR', (i / 10**6,))
+    info = _intern_params.cache_info()
+    assert info.currsize <= info.maxsize
+
+
+def test_instruction_params_interned_by_type():
+    qubit = Qubit(0)
+    integer = Instruction([qubit], 'X_ERROR', (1,))
+    floating = Instruction([qubit], 'X_ERROR', (1.0,))
+    assert type(integer.params[0]) is int
+    assert type(floating.params[0]) is float
@@ -0,0 +1,103 @@
+from main.building_blocks.Qubit import Qubit
+from main.compiling.Instruction import Instruction
+from main.compiling.InstructionTable import InstructionTable
+from main.compiling.noise.noises.OneQubitNoise import OneQubitNoise
+from tests.compiling.utils_instructions import MockInstruction
+
+
+def test_instruction_table_add_and_rebuild():
+    table = InstructionTable()
+    qubits = [Qubit(i) for i in range(3)]
+    cnot = Instruction(qubits[:2], 'CNOT')
+    hadamard = Instruction([qubits[2]], 'H')
+    assert table.add(0, cnot) == 0
+    assert table.add(0, hadamard) == 1
+
+    rebuilt = table.instruction(0)
+    assert rebuilt == MockInstruction(qubits[:2], 'CNOT')
+    assert rebuilt is not cnot
+    assert table.qubit_instructions(0) == {0: [0], 1: [0], 2: [1]}
+    at_tick = table[0]
+    assert at_tick == {
+        qubits[0]: [MockInstruction(qubits[:2], 'CNOT')],
+        qubits[1]: [MockInstruction(qubits[:2], 'CNOT')],
+        qubits[2]: [MockInstruction([qubits[2]], 'H')]}
+    # A multi-qubit instruction is rebuilt once, not once per qubit.
+    assert at_tick[qubits[0]][0] is at_tick[qubits[1]][0]
+
+
+def test_instruction_table_keeps_measurements_whole():
+    table = InstructionTable()
+    qubit = Qubit(0)
+    measurement = Instruction([qubit], 'M', is_measurement=True)
+    index = table.add(0, measurement)
+    assert table.instruction(index) is measurement
+    assert table[0] == {qubit: [measurement]}
+
+
+def test_instruction_table_shares_opcodes_params_and_qubits():
+    table = InstructionTable()
+    qubit = Qubit(0)
+    noise = OneQubitNoise(0.1, 0.1, 0.1)
+    for tick in range(1, 20, 2):
+        table.add(tick, noise.instruction([qubit]))
+    assert len(table.opcode_keys) == 1
+    assert len(table.params) == 1
+    assert table.qubits == [qubit]
+    assert len(table) == 10
+
+
+def test_instruction_table_params_kept_apart_by_type():
+    table = InstructionTable()
+    qubit = Qubit(0)
+    table.add(1, Instruction([qubit], 'X_ERROR', (1,), is_noise=True))
+    table.add(3, Instruction([qubit], 'X_ERROR', (1.0,), is_noise=True))
+    assert type(table.instruction(0).params[0]) is int
+    assert type(table.instruction(1).params[0]) is float
+
+
+def test_instruction_table_clash():
+    table = InstructionTable()
+    qubits = [Qubit(0), Qubit(1)]
+    table.add(0, Instruction([qubits[0]], 'H'))
+    table.add(1, Instruction([qubits[0]], 'X_ERROR', (0.1,), is_noise=True))
+    table.add(2, Instruction(qubits, 'MPP', is_measurement=True))
+
+    # Gates can't share a qubit with anything.
+    assert table.clash(0, Instruction([qubits[0]], 'X')) == qubits[0]
+    assert table.clash(0, Instruction([qubits[1]], 'X')) is None
+    # Noise can share with noise, and product measurements with each other.
+    noise = Instruction([qubits[0]], 'Z_ERROR', (0.1,), is_noise=True)
+    assert table.clash(1, noise) is None
+    product = Instruction([qubits[1]], 'MPP', is_measurement=True)
+    assert table.clash(2, product) is None
+    assert table.clash(2, Instruction([qubits[1]], 'M')) == qubits[1]
+    # Nothing clashes at an empty tick.
+    assert table.clash(4, Instruction([qubits[0]], 'X')) is None
+
+
+def test_instruction_table_free():
+    table = InstructionTable()
+    qubit = Qubit(0)
+    measurement = Instruction([qubit], 'M', is_measurement=True)
+    index = table.add(0, measurement)
+    table.add(2, Instruction([qubit], 'H'))
+    table.free(0)
+    assert 0 not in table
+    assert index not in table.kept
+    assert list(table.indices()) == [1]
+    assert list(table.at_tick(0)) == []
+
+
+def test_instruction_table_copy():
+    table = InstructionTable()
+    qubit = Qubit(0)
+    table.add(0, Instruction([qubit], 'H'))
+    copied = table.copy()
+    copied.add(2, Instruction([qubit], 'X'))
+    copied.add(0, Instruction([Qubit(1)], 'X'))
+    assert list(table) == [0]
+    assert list(table.at_tick(0)) == [0]
+    assert len(table.ticks) == 1
+    assert table.qubits == [qubit]
+    assert list(copied) == [0, 2]
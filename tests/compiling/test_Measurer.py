@@ -12,11 +12,14 @@ from main.building_blocks.detectors.Detector import Detector
 from main.building_blocks.logical.LogicalOperator import LogicalOperator
 from main.building_blocks.pauli import Pauli
 from main.building_blocks.pauli.PauliLetter import PauliLetter
+from main.codes.tic_tac_toe.HoneycombCode import HoneycombCode
 from main.compiling.Instruction import Instruction
 from main.compiling.Measurer import Measurer
+from main.compiling.compilers.AncillaPerCheckCompiler import AncillaPerCheckCompiler
 from tests.building_blocks.detectors.utils_detectors import random_detectors
 from tests.building_blocks.logical.utils_logical_operators import random_logical_operator
 from tests.building_blocks.utils_checks import specific_check, random_checks
+from main.utils.enums import State
 from tests.utils.utils_numbers import default_test_repeats_small, default_test_repeats_medium
 
 
@@ -43,7 +46,7 @@ def test_measurer_add_detectors():
 
     round = 10
     measurer.add_detectors([detector], round)
-    expected = {(check_2, round): [detector]}
+    expected = {(measurer.check_id(check_2), round): [detector]}
     assert measurer.triggers == expected
 
     # Random tests:
@@ -65,7 +68,7 @@ def test_measurer_add_detectors():
         expected = defaultdict(list)
         for detector, final_checks in zip(detectors, final_checkss):
             for check in final_checks:
-                expected[(check, round)].append(detector)
+                expected[(measurer.check_id(check), round)].append(detector)
         assert measurer.triggers == expected
 
 
@@ -78,14 +81,33 @@ def test_measurer_multiply_observable(mocker: MockerFixture):
 
     measurer.multiply_observable(checks, observable, round)
 
-    expected = {(check, round): [observable] for check in checks}
+    expected = {
+        (measurer.check_id(check), round): [observable] for check in checks}
     assert measurer.triggers == expected
 
 
+def test_measurer_check_id():
+    measurer = Measurer()
+    # Checks that are part of a code use the id the code gave them.
+    check = specific_check(['X', 'X'])
+    check.check_id = 3
+    assert measurer.check_id(check) == 3
+
+    # Others get a negative id, shared by equal checks.
+    check_1 = specific_check(['Z', 'Z'])
+    check_2 = Check(list(check_1.paulis.values()))
+    check_3 = specific_check(['Y', 'Y'])
+    assert measurer.check_id(check_1) == -1
+    assert measurer.check_id(check_2) == -1
+    assert measurer.check_id(check_3) == -2
+    # Copies of the measurer share these ids.
+    assert measurer.copy().check_id(check_3) == -2
+
+
 def test_measurer_reset_compilation(mocker: MockerFixture):
     measurer = Measurer()
     measurer.measurement_numbers = mocker.Mock(
-        spec=Dict[Tuple[Check, int], int])
+        spec=Dict[Tuple[int, int], int])
     measurer.detectors_compiled = mocker.Mock(spec=Dict[Tuple[int], bool])
     measurer.total_measurements = random.randint(0, 100)
 
@@ -124,7 +146,8 @@ def test_measurer_measurement_target_succeeds_otherwise(mocker: MockerFixture):
     round = random.randint(0, 100)
 
     measurement_number = random.randint(0, 100)
-    measurer.measurement_numbers[(check, round)] = measurement_number
+    measurer.measurement_numbers[(measurer.check_id(check), round)] = \
+        measurement_number
 
     total_measurements = random.randint(measurement_number + 1, 100)
     measurer.total_measurements = total_measurements
@@ -157,7 +180,7 @@ def test_measurer_can_compile_detector_false_if_already_compiled(mocker: MockerF
     # First make it look like these checks have already been measured
     # in this round
     for i, check in enumerate(checks):
-        measurer.measurement_numbers[(check, round)] = i
+        measurer.measurement_numbers[(measurer.check_id(check), round)] = i
     # Now make it look like a detector consisting of these checks has
     # already been compiled.
     measurer.detectors_compiled[tuple(range(num_checks))] = True
@@ -181,7 +204,7 @@ def test_measurer_can_compile_detector_true_otherwise(mocker: MockerFixture):
     # First make it look like these checks have already been measured
     # in this round
     for i, check in enumerate(checks):
-        measurer.measurement_numbers[(check, round)] = i
+        measurer.measurement_numbers[(measurer.check_id(check), round)] = i
 
     # Then make it look like no equivalent detector has been compiled.
     measurer.detectors_compiled = defaultdict(lambda: False)
@@ -269,7 +292,7 @@ def test_measurer_measurement_triggers_to_stim_compiles_detector(mocker: MockerF
         measurement: (check, round)
         for measurement, check in zip(measurements, checks)}
     measurer.triggers = {
-        (check, round): [detector]
+        (measurer.check_id(check), round): [detector]
         for check in checks}
 
     # Get the instructions triggered by these measurements
@@ -302,7 +325,7 @@ def test_measurer_measurement_triggers_to_stim_compiles_observable(mocker: Mocke
         measurement: (check, round)
         for measurement, check in zip(measurements, checks)}
     measurer.triggers = {
-        (check, round): [observable]
+        (measurer.check_id(check), round): [observable]
         for check in checks}
 
     # Get the instructions triggered by these measurements
@@ -315,3 +338,121 @@ def test_measurer_measurement_triggers_to_stim_compiles_observable(mocker: Mocke
         "OBSERVABLE_INCLUDE", expected_targets, [0])
     assert triggered == [expected_observable_instruction]
     assert measurer.total_measurements == num_measurements
+
+
+def test_measurer_use_templates_fails_if_period_not_positive():
+    measurer = Measurer()
+    with pytest.raises(ValueError, match="must both be positive"):
+        measurer.use_templates(0)
+    with pytest.raises(ValueError, match="must both be positive"):
+        measurer.use_templates(1, window_periods=0)
+
+
+def test_measurer_templates_reused_and_history_bounded(mocker: MockerFixture):
+    # A repetition-code-like setup: one check measured every round, with
+    # a detector comparing consecutive rounds.
+    check = specific_check(['Z', 'Z'])
+    detector = Detector([(-1, check), (0, check)], end=0)
+    rounds = 100
+    measurements = [mocker.Mock(spec=Instruction) for _ in range(rounds)]
+
+    measurer = Measurer()
+    measurer.use_templates(period=1, window_periods=2)
+    for round, measurement in enumerate(measurements):
+        measurer.add_measurement(measurement, check, round)
+        if round > 0:
+            measurer.add_detectors([detector], round)
+
+    spy = mocker.spy(measurer, 'detector_to_stim')
+    expected = stim.CircuitInstruction(
+        'DETECTOR', [stim.target_rec(-2), stim.target_rec(-1)], ())
+    assert measurer.measurement_triggers_to_stim(
+        [measurements[0]], None) == []
+    for measurement in measurements[1:]:
+        triggered = measurer.measurement_triggers_to_stim([measurement], None)
+        assert triggered == [expected]
+        # Only a couple of periods plus the detector's lookback should
+        # ever be remembered.
+        assert len(measurer.measurement_numbers) <= 4
+        assert len(measurer.detectors_compiled) <= 4
+
+    # After the first couple of rounds, detectors should come from templates.
+    assert spy.call_count < 5
+    assert measurer.total_measurements == rounds
+
+
+def test_measurer_templates_give_same_circuit():
+    code = HoneycombCode(4)
+    compiler = AncillaPerCheckCompiler()
+    initial_states = {
+        qubit: State.Zero for qubit in code.data_qubits.values()}
+    circuit = compiler.compile_to_circuit(
+        code, 13, initial_states, observables=[code.logical_qubits[1].z])
+    assert circuit.measurer.period == code.schedule_length
+    with_templates = circuit.to_stim(None, None, track_progress=False)
+    circuit.measurer.period = None
+    without_templates = circuit.to_stim(None, None, track_progress=False)
+    assert with_templates == without_templates
+
+
+def test_measurer_copy_is_independent(mocker: MockerFixture):
+    check = specific_check(['Z', 'Z'])
+    detector = Detector([(-1, check), (0, check)], end=0)
+    measurements = [mocker.Mock(spec=Instruction) for _ in range(3)]
+
+    def measure(measurer: Measurer, rounds: range):
+        for round in rounds:
+            measurer.add_measurement(measurements[round], check, round)
+            if round > 0:
+                measurer.add_detectors([detector], round)
+
+    measurer = Measurer()
+    measure(measurer, range(2))
+    copied = measurer.copy()
+    measure(copied, range(2, 3))
+    assert measurements[2] not in measurer.measurement_checks
+    assert len(measurer.triggers) == 1
+    assert len(copied.triggers) == 2
+
+    # Carrying on from the original, once it's been compiled as far as
+    # they have in common, gives the same as compiling the copy afresh.
+    expected = stim.CircuitInstruction(
+        'DETECTOR', [stim.target_rec(-2), stim.target_rec(-1)], ())
+    for measurement in measurements[:2]:
+        measurer.measurement_triggers_to_stim([measurement], None)
+    copied.continue_compilation(measurer)
+    assert copied.measurement_triggers_to_stim(
+        [measurements[2]], None) == [expected]
+    assert copied.total_measurements == 3
+    # The original's record of what's been compiled is untouched.
+    assert measurer.total_measurements == 2
+    assert len(measurer.detectors_compiled) == 1
+    assert len(copied.detectors_compiled) == 2
+
+
+def test_measurer_extend_lookback_lasts_one_compilation(mocker: MockerFixture):
+    check = specific_check(['Z', 'Z'])
+    detector = Detector([(-1, check), (0, check)], end=0)
+    rounds = 20
+    measurements = [mocker.Mock(spec=Instruction) for _ in range(rounds)]
+    measurer = Measurer()
+    measurer.use_templates(period=1, window_periods=2)
+    for round, measurement in enumerate(measurements):
+        measurer.add_measurement(measurement, check, round)
+        if round > 0:
+            measurer.add_detectors([detector], round)
+    assert measurer.max_lookback == 1
+
+    def compile_all():
+        for measurement in measurements:
+            measurer.measurement_triggers_to_stim([measurement], None)
+        remembered = len(measurer.measurement_numbers)
+        measurer.reset_compilation()
+        return remembered
+
+    assert compile_all() <= 4
+    measurer.extend_lookback(10)
+    assert compile_all() > 10
+    # Only for the one compilation.
+    assert measurer.max_lookback == 1
+    assert compile_all() <= 4
@@ -0,0 +1,131 @@
+import pytest
+import stim
+
+from main.codes.tic_tac_toe.HoneycombCode import HoneycombCode
+from main.compiling.NoiseTemplate import NoiseTemplate
+from main.compiling.compilers.AncillaPerCheckCompiler import AncillaPerCheckCompiler
+from main.compiling.compilers.NativePauliProductMeasurementsCompiler import \
+    NativePauliProductMeasurementsCompiler
+from main.compiling.noise.models import CircuitLevelNoise, EM3, SI1000
+from main.compiling.noise.noises.OneBitNoise import OneBitNoise
+from main.compiling.noise.noises.OneQubitNoise import OneQubitNoise
+from main.compiling.noise.noises.TwoQubitNoise import TwoQubitNoise
+from main.compiling.syndrome_extraction.extractors.ancilla_per_check.mixed.CxCyCzExtractor import CxCyCzExtractor
+from main.utils.enums import State
+
+
+def test_noise_template_with_placeholders():
+    noise_model = CircuitLevelNoise(0.1, 0.2, 0.3, 0.4, 0.5)
+    placeholder_model, placeholders = \
+        NoiseTemplate.with_placeholders(noise_model)
+    # 3 parameters each for initialisation, idling and one qubit gates, 15
+    # for two qubit gates, and 1 for measurements.
+    assert len(placeholders) == 3 + 3 + 3 + 15 + 1
+    assert placeholder_model.resonator_idle is None
+    assert placeholders[placeholder_model.measurement.p] == \
+        ('measurement', 'p')
+    assert placeholders[placeholder_model.two_qubit_gate.pzz] == \
+        ('two_qubit_gate', 'pzz')
+    # Original noise model should be untouched.
+    assert noise_model.measurement.p == 0.5
+
+
+def test_noise_template_shape_of():
+    assert NoiseTemplate.shape_of(EM3(0.1)) == {
+        'initialisation': OneQubitNoise,
+        'idling': OneQubitNoise,
+        'data_qubit_start_round': None,
+        'one_qubit_gate': None,
+        'two_qubit_gate': None,
+        'measurement': OneBitNoise,
+        'resonator_idle': None,
+        'before_mpp_noise': TwoQubitNoise}
+
+
+def test_noise_template_instantiate_fails_if_noise_model_has_different_shape():
+    expected_error = "Can only instantiate a noise template with a noise model"
+    noise_model = CircuitLevelNoise(0.1, 0.2, 0.3, 0.4, 0.5)
+    template = NoiseTemplate(
+        stim.Circuit(), {}, NoiseTemplate.shape_of(noise_model))
+    with pytest.raises(ValueError, match=expected_error):
+        template.instantiate(SI1000(0.1))
+    with pytest.raises(ValueError, match=expected_error):
+        template.instantiate(CircuitLevelNoise(0.1, 0.2, 0.3, 0.4))
+
+
+def test_noise_template_instantiate_substitutes_placeholders():
+    noise_model = CircuitLevelNoise(0.1, 0.2, 0.3, 0.4, 0.5)
+    placeholder_model, placeholders = \
+        NoiseTemplate.with_placeholders(noise_model)
+    measurement = placeholder_model.measurement.p
+    idling = placeholder_model.idling.params
+    body = stim.Circuit()
+    body.append('PAULI_CHANNEL_1', [0], idling)
+    body.append('M', [0], measurement)
+    body.append('DETECTOR', [stim.target_rec(-1)], (0, 0))
+    circuit = stim.Circuit()
+    circuit.append('R', [0])
+    circuit.append(stim.CircuitRepeatBlock(3, body))
+    template = NoiseTemplate(
+        circuit, placeholders, NoiseTemplate.shape_of(noise_model))
+
+    expected_body = stim.Circuit()
+    expected_body.append('PAULI_CHANNEL_1', [0], (0.01, 0.02, 0.03))
+    expected_body.append('M', [0], 0.04)
+    expected_body.append('DETECTOR', [stim.target_rec(-1)], (0, 0))
+    expected = stim.Circuit()
+    expected.append('R', [0])
+    expected.append(stim.CircuitRepeatBlock(3, expected_body))
+    instantiated = template.instantiate(
+        CircuitLevelNoise(0.1, OneQubitNoise(0.01, 0.02, 0.03), 0.2, 0.3, 0.04))
+    assert instantiated == expected
+
+
+def test_noise_template_instantiate_fuses_instructions_with_same_noise():
+    noise_model = CircuitLevelNoise(0.1, 0.2, 0.3, 0.4, 0.5)
+    placeholder_model, placeholders = \
+        NoiseTemplate.with_placeholders(noise_model)
+    circuit = stim.Circuit()
+    circuit.append(
+        'PAULI_CHANNEL_1', [0], placeholder_model.initialisation.params)
+    circuit.append('PAULI_CHANNEL_1', [1], placeholder_model.idling.params)
+    template = NoiseTemplate(
+        circuit, placeholders, NoiseTemplate.shape_of(noise_model))
+    instantiated = template.instantiate(CircuitLevelNoise(0.3, 0.3, 0.3, 0.3, 0.3))
+    assert len(instantiated) == 1
+    assert instantiated[0].targets_copy() == [
+        stim.GateTarget(0), stim.GateTarget(1)]
+
+
+def test_noise_template_gives_same_detector_error_model_as_compiling_directly():
+    code = HoneycombCode(4)
+    initial_states = {
+        qubit: State.Zero for qubit in code.data_qubits.values()}
+    kwargs = {
+        'initial_states': initial_states,
+        'observables': [code.logical_qubits[1].z]}
+    for compiler_class, noise_model in [
+            (AncillaPerCheckCompiler, SI1000),
+            (NativePauliProductMeasurementsCompiler, EM3)]:
+        template = compiler_class(noise_model(0.001)).compile_noise_template(
+            code, 3 * code.schedule_length, **kwargs)
+        for p in [0.001, 0.002]:
+            expected = compiler_class(noise_model(p)).compile_to_stim(
+                code, 3 * code.schedule_length, **kwargs)
+            circuit = template.instantiate(noise_model(p))
+            assert circuit.num_measurements == expected.num_measurements
+            assert circuit.detector_error_model(
+                approximate_disjoint_errors=True) == \
+                expected.detector_error_model(approximate_disjoint_errors=True)
+
+
+def test_compile_noise_template_leaves_compiler_noise_model_alone():
+    code = HoneycombCode(4)
+    noise_model = CircuitLevelNoise(0.1, 0.2, 0.3, 0.4, 0.5)
+    compiler = AncillaPerCheckCompiler(noise_model, CxCyCzExtractor())
+    compiler.compile_noise_template(
+        code, 2 * code.schedule_length,
+        {qubit: State.Zero for qubit in code.data_qubits.values()},
+        observables=[code.logical_qubits[1].z])
+    assert compiler.noise_model is noise_model
+    assert noise_model.two_qubit_gate.pzz == 0.4 / 15
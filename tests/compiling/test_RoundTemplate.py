@@ -0,0 +1,68 @@
+import pytest
+from pytest_mock import MockerFixture
+
+from main.building_blocks.Check import Check
+from main.building_blocks.Qubit import Qubit
+from main.compiling.Circuit import Circuit
+from main.compiling.Instruction import Instruction
+from main.compiling.RoundTemplate import RoundTemplate
+
+
+def record_round(circuit: Circuit, check: Check, tick: int):
+    # Record a round in which a single ancilla is initialised, noisily
+    # rotated and then measured.
+    ancilla = Qubit(0)
+    template = RoundTemplate(circuit, [check], tick)
+    template.initialise(tick, Instruction([ancilla], 'RZ'))
+    template.add_instruction(tick + 2, Instruction([ancilla], 'H'))
+    template.add_instruction(
+        tick + 3, Instruction([ancilla], 'PAULI_CHANNEL_1', (0.1,) * 3, is_noise=True))
+    template.measure(
+        Instruction([ancilla], 'MZ', is_measurement=True), check, 0, tick + 4)
+    template.finish(tick + 6)
+    return template, ancilla
+
+
+def test_round_template_passes_everything_on_while_recording(
+        mocker: MockerFixture):
+    circuit = Circuit()
+    check = mocker.Mock(spec=Check)
+    template, ancilla = record_round(circuit, check, 10)
+    assert template.length == 6
+    assert [instruction.name for tick in [10, 12, 13, 14]
+            for instruction in circuit.instructions[tick][ancilla]] == \
+        ['RZ', 'H', 'PAULI_CHANNEL_1', 'MZ']
+    assert circuit.init_ticks[ancilla] == [10]
+    assert circuit.measure_ticks[ancilla] == [14]
+    assert list(circuit.measurer.measurement_checks.values()) == [(check, 0)]
+    # Anything else is just read from the circuit.
+    template = RoundTemplate(circuit, [check], 16)
+    assert template.qubits is circuit.qubits
+
+
+def test_round_template_stamps_copies_at_later_ticks(mocker: MockerFixture):
+    circuit = Circuit()
+    check = mocker.Mock(spec=Check)
+    template, ancilla = record_round(circuit, check, 10)
+    next_tick = template.stamp(3, 16, circuit)
+    assert next_tick == 22
+    for tick in [10, 12, 13, 14]:
+        original, = circuit.instructions[tick][ancilla]
+        copy, = circuit.instructions[tick + 6][ancilla]
+        assert copy is not original
+        assert repr(copy) == repr(original)
+    assert circuit.init_ticks[ancilla] == [10, 16]
+    assert circuit.measure_ticks[ancilla] == [14, 20]
+    measurement, = circuit.instructions[20][ancilla]
+    assert circuit.measurer.measurement_checks[measurement] == (check, 3)
+
+
+def test_round_template_still_validates_stamps_onto_busy_ticks(
+        mocker: MockerFixture):
+    expected_error = "Tried to compile conflicting instructions"
+    circuit = Circuit()
+    check = mocker.Mock(spec=Check)
+    template, ancilla = record_round(circuit, check, 10)
+    # Stamping the round over itself should fail.
+    with pytest.raises(ValueError, match=expected_error):
+        template.stamp(1, 10, circuit)
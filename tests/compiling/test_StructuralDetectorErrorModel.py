@@ -0,0 +1,141 @@
+import numpy as np
+import pytest
+import stim
+
+from main.codes.tic_tac_toe.HoneycombCode import HoneycombCode
+from main.compiling.NoiseTemplate import NoiseTemplate
+from main.compiling.StructuralDetectorErrorModel import \
+    StructuralDetectorErrorModel
+from main.compiling.compilers.AncillaPerCheckCompiler import AncillaPerCheckCompiler
+from main.compiling.compilers.NativePauliProductMeasurementsCompiler import \
+    NativePauliProductMeasurementsCompiler
+from main.compiling.noise.models import CircuitLevelNoise, EM3, SI1000
+from main.decoding.PymatchingDecoder import PymatchingDecoder
+from main.utils.enums import State
+
+# As sinter uses to get a detector error model for pymatching.
+kwargs = {'decompose_errors': True, 'approximate_disjoint_errors': True}
+
+
+def compile_kwargs(code: HoneycombCode):
+    return {
+        'total_rounds': 3 * code.schedule_length,
+        'initial_states': {
+            qubit: State.Zero for qubit in code.data_qubits.values()},
+        'observables': [code.logical_qubits[1].z]}
+
+
+def test_structural_detector_error_model_matches_fresh_detector_error_model():
+    code = HoneycombCode(4)
+    for compiler_class, noise_model in [
+            (AncillaPerCheckCompiler, lambda p: CircuitLevelNoise(*[p] * 5)),
+            (AncillaPerCheckCompiler, SI1000),
+            (NativePauliProductMeasurementsCompiler, EM3)]:
+        template = compiler_class(noise_model(0.001)).compile_noise_template(
+            code, **compile_kwargs(code))
+        structural = StructuralDetectorErrorModel.from_noise_template(
+            template, **kwargs)
+        for p in [0.001, 0.005]:
+            expected = compiler_class(noise_model(p)).compile_to_stim(
+                code, **compile_kwargs(code)).detector_error_model(**kwargs)
+            model = structural.instantiate(noise_model(p))
+            assert model.num_detectors == expected.num_detectors
+            assert model.num_observables == expected.num_observables
+            assert model.num_errors == expected.num_errors
+            # Only approximate where errors of the same noise instruction
+            # have the same symptoms, by around a tenth of the noise.
+            assert StructuralDetectorErrorModel.max_relative_error(
+                model, expected) < p
+
+
+def test_structural_detector_error_model_is_exact_without_disjoint_errors():
+    circuit = stim.Circuit.generated(
+        'repetition_code:memory',
+        distance=5,
+        rounds=5,
+        before_measure_flip_probability=NoiseTemplate.placeholder_unit,
+        after_reset_flip_probability=2 * NoiseTemplate.placeholder_unit)
+    noise_model = CircuitLevelNoise(0.1, 0.2, 0.3, 0.4, 0.5)
+    template = NoiseTemplate(
+        circuit,
+        {NoiseTemplate.placeholder_unit: ('measurement', 'p'),
+         2 * NoiseTemplate.placeholder_unit: ('initialisation', 'px')},
+        NoiseTemplate.shape_of(noise_model))
+    structural = StructuralDetectorErrorModel.from_noise_template(
+        template, **kwargs)
+    model = structural.instantiate(noise_model)
+    expected = template.instantiate(noise_model).detector_error_model(**kwargs)
+    assert StructuralDetectorErrorModel.max_relative_error(
+        model, expected) < 1e-12
+
+
+def test_structural_detector_error_model_fails_on_unsupported_noise():
+    circuit = stim.Circuit('''
+        R 0
+        DEPOLARIZE1(0.1) 0
+        M 0
+        DETECTOR rec[-1]
+    ''')
+    template = NoiseTemplate(circuit, {}, {})
+    with pytest.raises(ValueError, match="containing DEPOLARIZE1"):
+        StructuralDetectorErrorModel.from_noise_template(template)
+
+
+def test_structural_detector_error_model_fails_if_noise_model_has_different_shape():
+    code = HoneycombCode(4)
+    template = AncillaPerCheckCompiler(SI1000(0.001)).compile_noise_template(
+        code, **compile_kwargs(code))
+    structural = StructuralDetectorErrorModel.from_noise_template(
+        template, **kwargs)
+    with pytest.raises(
+            ValueError, match="Can only instantiate a noise template"):
+        structural.instantiate(EM3(0.001))
+
+
+def test_structural_detector_error_model_independent_probabilities():
+    assert StructuralDetectorErrorModel.independent_probabilities(
+        'X_ERROR', [0.1]) == [0.1]
+    # Stim turns the disjoint X, Y and Z errors of a PAULI_CHANNEL_1 into
+    # independent ones exactly...
+    assert StructuralDetectorErrorModel.independent_probabilities(
+        'PAULI_CHANNEL_1', [0.01, 0.02, 0.03]) == pytest.approx(
+        [0.009875, 0.020530, 0.030732], rel=1e-4)
+    # ...but leaves those of a PAULI_CHANNEL_2 as they are.
+    args = [0.001 * (i + 1) for i in range(15)]
+    assert StructuralDetectorErrorModel.independent_probabilities(
+        'PAULI_CHANNEL_2', args) == pytest.approx(args)
+
+
+def test_structural_detector_error_model_max_relative_error():
+    model = stim.DetectorErrorModel('''
+        error(0.1) D0
+        error(0.2) D0 D1
+    ''')
+    assert StructuralDetectorErrorModel.max_relative_error(model, model) == 0
+    other = stim.DetectorErrorModel('''
+        error(0.1) D0
+        error(0.25) D0 D1
+    ''')
+    assert StructuralDetectorErrorModel.max_relative_error(
+        model, other) == pytest.approx(0.2)
+    missing = stim.DetectorErrorModel('''
+        error(0.1) D0
+    ''')
+    assert StructuralDetectorErrorModel.max_relative_error(
+        model, missing) == 1
+
+
+@pytest.mark.filterwarnings("ignore::UserWarning")
+def test_structural_detector_error_model_can_be_decoded():
+    code = HoneycombCode(4)
+    template = AncillaPerCheckCompiler(SI1000(0.001)).compile_noise_template(
+        code, **compile_kwargs(code))
+    structural = StructuralDetectorErrorModel.from_noise_template(
+        template, **kwargs)
+    circuit = template.instantiate(SI1000(0.002))
+    decoder = PymatchingDecoder(structural.instantiate(SI1000(0.002)))
+    expected_decoder = PymatchingDecoder(circuit.detector_error_model(**kwargs))
+    samples = circuit.compile_detector_sampler(seed=0).sample(100)
+    assert np.array_equal(
+        decoder.decode_samples(samples),
+        expected_decoder.decode_samples(samples))
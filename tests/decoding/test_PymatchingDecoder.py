@@ -0,0 +1,97 @@
+import numpy as np
+import pytest
+import stim
+
+from main.decoding.PymatchingDecoder import PymatchingDecoder
+
+
+@pytest.fixture(scope='module')
+def circuit():
+    return stim.Circuit.generated(
+        "repetition_code:memory",
+        distance=5,
+        rounds=5,
+        after_clifford_depolarization=0.05,
+        before_measure_flip_probability=0.05)
+
+
+@pytest.mark.filterwarnings("ignore::UserWarning")
+@pytest.mark.parametrize("bit_packed", [False, True])
+def test_pymatching_decoder_decode_batch_matches_decode_samples(circuit, bit_packed):
+    decoder = PymatchingDecoder(circuit.detector_error_model())
+    sampler = circuit.compile_detector_sampler(seed=0)
+    samples = sampler.sample(200)
+    expected = decoder.decode_samples(samples)
+
+    if bit_packed:
+        samples = np.packbits(samples, axis=1, bitorder='little')
+    predictions = decoder.decode_batch(samples, bit_packed=bit_packed)
+    assert predictions.dtype == np.bool_
+    assert np.array_equal(predictions, expected)
+
+
+@pytest.mark.filterwarnings("ignore::UserWarning")
+def test_pymatching_decoder_decode_batch_in_chunks(circuit):
+    decoder = PymatchingDecoder(circuit.detector_error_model())
+    sampler = circuit.compile_detector_sampler(seed=1)
+    samples = sampler.sample(250)
+    expected = decoder.decode_batch(samples)
+
+    # From a single array...
+    chunks = list(decoder.decode_batch_in_chunks(samples, chunk_size=100))
+    assert [len(chunk) for chunk in chunks] == [100, 100, 50]
+    assert np.array_equal(np.concatenate(chunks), expected)
+
+    # ...or from a stream of arrays.
+    stream = (samples[i:i + 50] for i in range(0, 250, 50))
+    chunks = list(decoder.decode_batch_in_chunks(stream))
+    assert np.array_equal(np.concatenate(chunks), expected)
+
+
+def test_pymatching_decoder_detector_error_model_to_edge_arrays():
+    dem = stim.DetectorErrorModel("""
+        error(0.1) D0 D1
+        error(0.2) D1 D0
+        error(0.1) D1 L0
+        error(0.3) D2 D3
+        error(0.4) D2 D3 L0
+        error(0) D3
+        repeat 2 {
+            error(0.1) D4 ^ D5 D6
+            shift_detectors 1
+        }
+    """)
+    decoder = PymatchingDecoder(dem)
+    nodes_1, nodes_2, probabilities, observables = \
+        decoder.detector_error_model_to_edge_arrays()
+    edges = {
+        (u, v): (p, tuple(obs))
+        for u, v, p, obs in
+        zip(nodes_1, nodes_2, probabilities, observables)}
+    # Node 8 is the boundary.
+    assert edges == {
+        (0, 1): (pytest.approx(0.1 * 0.8 + 0.2 * 0.9), (False,)),
+        (1, 8): (0.1, (True,)),
+        # The second error flips a different observable so replaces the first.
+        (2, 3): (0.4, (True,)),
+        (4, 8): (0.1, (False,)),
+        (5, 6): (0.1, (False,)),
+        (5, 8): (0.1, (False,)),
+        (6, 7): (0.1, (False,)),
+    }
+
+
+@pytest.mark.filterwarnings("ignore::UserWarning")
+def test_pymatching_decoder_edge_arrays_match_networkx(circuit):
+    dem = circuit.detector_error_model()
+    expected = PymatchingDecoder(dem, use_networkx=True).matcher
+    actual = PymatchingDecoder(dem).matcher
+
+    def edges(matcher):
+        return {
+            (min(u, v), max(u, v)):
+                (pytest.approx(data['weight']), data['fault_ids'])
+            for u, v, data in matcher.edges()}
+
+    assert edges(actual) == edges(expected)
+    assert actual.boundary == expected.boundary
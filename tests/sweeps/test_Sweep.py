@@ -0,0 +1,133 @@
+import pytest
+import sinter
+import stim
+from pytest_mock import MockerFixture
+
+from main.compiling.compilers.AncillaPerCheckCompiler import AncillaPerCheckCompiler
+from main.compiling.StructuralDetectorErrorModel import \
+    StructuralDetectorErrorModel
+from main.sweeps import Sweep, memory_experiment, \
+    memory_experiment_detector_error_model
+from main.sweeps.memory_experiment import _memory_experiment_template
+
+
+def repetition_code(distance: int, noise: float) -> stim.Circuit:
+    return stim.Circuit.generated(
+        'repetition_code:memory',
+        distance=distance,
+        rounds=distance,
+        before_round_data_depolarization=noise)
+
+
+def failing_builder(distance: int, noise: float) -> stim.Circuit:
+    raise AssertionError("Shouldn't need to compile anything!")
+
+
+def test_sweep_points():
+    sweep = Sweep(repetition_code, {'distance': [3, 5], 'noise': [0.1]})
+    assert sweep.points() == [
+        {'distance': 3, 'noise': 0.1},
+        {'distance': 5, 'noise': 0.1}]
+
+
+def test_sweep_run_fails_if_no_stopping_condition(tmp_path):
+    sweep = Sweep(repetition_code, {'distance': [3], 'noise': [0.1]})
+    with pytest.raises(ValueError, match="At least one of max_shots"):
+        sweep.run(tmp_path / 'results.csv', num_workers=1)
+
+
+def test_sweep_run_saves_and_resumes(tmp_path):
+    csv_path = tmp_path / 'results.csv'
+    grid = {'distance': [3, 5], 'noise': [0.05, 0.1]}
+    sweep = Sweep(repetition_code, grid)
+    stats = sweep.run(
+        csv_path, num_workers=1, compile_workers=2, max_shots=200)
+    assert sorted(
+        (s.json_metadata['distance'], s.json_metadata['noise'])
+        for s in stats) == [(3, 0.05), (3, 0.1), (5, 0.05), (5, 0.1)]
+    assert all(s.shots == 200 for s in stats)
+    assert all(s.decoder == 'pymatching' for s in stats)
+    assert sinter.read_stats_from_csv_files(csv_path) == stats
+
+    # Running again should skip every grid point, since all are finished.
+    resumed = Sweep(failing_builder, grid).run(
+        csv_path, num_workers=1, max_shots=200)
+    assert resumed == stats
+
+    # Growing the grid should only compile and sample the new points.
+    bigger = Sweep(repetition_code, {'distance': [3, 5, 7], 'noise': [0.1]})
+    stats = bigger.run(csv_path, num_workers=1, max_shots=200)
+    assert len(stats) == 5
+    assert all(s.shots == 200 for s in stats)
+
+
+def test_sweep_run_samples_every_point_in_one_collection(
+        tmp_path, mocker: MockerFixture):
+    spy = mocker.spy(sinter, 'iter_collect')
+    grid = {'distance': [3, 5, 7], 'noise': [0.1]}
+    stats = Sweep(repetition_code, grid).run(
+        tmp_path / 'results.csv', num_workers=1, compile_workers=2,
+        max_shots=100)
+    assert len(stats) == 3
+    assert spy.call_count == 1
+    assert spy.call_args.kwargs['hint_num_tasks'] == 3
+
+
+def test_sweep_run_with_detector_error_models(tmp_path):
+    grid = {
+        'code': ['RotatedSurfaceCode'],
+        'distance': [3],
+        'noise': [0.01, 0.02],
+        'rounds': [3]}
+    sweep = Sweep(
+        memory_experiment, grid, memory_experiment_detector_error_model)
+    stats = sweep.run(tmp_path / 'results.csv', num_workers=1, max_shots=200)
+    assert len(stats) == 2
+    assert all(s.shots == 200 for s in stats)
+
+
+def test_memory_experiment():
+    for code, distance, rounds in [
+            ('RotatedSurfaceCode', 3, 3),
+            ('HoneycombCode', 4, 6),
+            ('FloquetColourCode', 4, 6)]:
+        circuit = memory_experiment(code, distance, 0.001, rounds)
+        assert circuit.num_observables == 1
+        # Should be decodable.
+        circuit.detector_error_model(
+            decompose_errors=True, approximate_disjoint_errors=True)
+
+
+def test_memory_experiment_only_compiles_once_per_code(
+        mocker: MockerFixture):
+    _memory_experiment_template.cache_clear()
+    spy = mocker.spy(AncillaPerCheckCompiler, 'compile_to_stim')
+    circuits = [
+        memory_experiment('RotatedSurfaceCode', 3, noise, 3)
+        for noise in [0.001, 0.002, 0.001]]
+    assert spy.call_count == 1
+    assert circuits[0] == circuits[2]
+    assert circuits[0] != circuits[1]
+    assert circuits[0].num_detectors == circuits[1].num_detectors
+
+
+def test_memory_experiment_fails_on_unknown_code():
+    with pytest.raises(ValueError, match="Unknown code"):
+        memory_experiment('NotACode', 3, 0.001, 3)
+    with pytest.raises(ValueError, match="Unknown code"):
+        memory_experiment_detector_error_model('NotACode', 3, 0.001, 3)
+
+
+def test_memory_experiment_detector_error_model():
+    for code, distance, rounds in [
+            ('RotatedSurfaceCode', 3, 3),
+            ('HoneycombCode', 4, 6)]:
+        for noise in [0.001, 0.002]:
+            model = memory_experiment_detector_error_model(
+                code, distance, noise, rounds)
+            expected = memory_experiment(
+                code, distance, noise, rounds).detector_error_model(
+                decompose_errors=True, approximate_disjoint_errors=True)
+            assert model.num_errors == expected.num_errors
+            assert StructuralDetectorErrorModel.max_relative_error(
+                model, expected) < noise
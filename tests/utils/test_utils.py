@@ -1,11 +1,13 @@
 import random
 import statistics
 import pytest
+import stim
 from collections import Counter
 from typing import Callable, Iterable, List
 
 from main.utils.types import Coordinates
-from main.utils.utils import modulo_duplicates, coords_mid, coords_sum, coords_minus, embed_coords
+from main.utils.utils import modulo_duplicates, coords_mid, coords_sum, coords_minus, embed_coords, \
+    stim_circuit_to_text
 from tests.utils.utils_coordinates import random_coordss, random_coords
 from tests.utils.utils_numbers import default_test_repeats_medium
 
@@ -285,3 +287,22 @@ def test_embed_coords_if_hyperplane_is_None():
         expected = tuple(expected)
 
         assert result == expected
+
+
+def test_stim_circuit_to_text_is_lossless():
+    circuit = stim.Circuit("""
+        QUBIT_COORDS(0.5, 1) 0
+        R 0 1 2
+        X_ERROR(0.1234567891234) 0
+        MPP !X0*Z1 Y2
+        REPEAT 3 {
+            PAULI_CHANNEL_1(0.001, 0.0001, 0.00001) 0 1
+            CX 0 1 rec[-1] 2
+            DETECTOR(1, 2, 0) rec[-1] rec[-2]
+            SHIFT_COORDS(0, 0, 1)
+        }
+        M !0 1
+        OBSERVABLE_INCLUDE(0) rec[-1]
+    """)
+    text = stim_circuit_to_text(circuit)
+    assert stim.Circuit(text) == circuit